@@ -0,0 +1,94 @@
+"""Benchmarks the hospital existence check on a large table.
+
+Compares the field by field filtered query used with uuid1 ids
+against the primary key read that content addressed ids allow:
+
+    python -m benchmarks.bench_existence_check --rows 200000
+
+The table lives in an in-memory SQLite database, and like the
+M3O tables it has no index on the queried fields.
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import time
+
+from registrations.domain.hospital.registration import HospitalEntryAggregate
+
+IDENTITY_FIELDS = ("name", "ownership_type", "street", "city", "state", "country")
+
+
+def build_table(rows: int) -> sqlite3.Connection:
+    connection = sqlite3.connect(":memory:")
+    connection.execute(
+        f"CREATE TABLE hospital (id TEXT PRIMARY KEY, {', '.join(IDENTITY_FIELDS)})"
+    )
+    connection.executemany(
+        "INSERT INTO hospital VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((content_id(idx),) + hospital_fields(idx) for idx in range(rows)),
+    )
+    return connection
+
+
+def content_id(idx: int) -> str:
+    return HospitalEntryAggregate.build_content_id(
+        HospitalEntryAggregate.build_identity_key(*hospital_fields(idx))
+    ).hex
+
+
+def hospital_fields(idx: int) -> tuple[str, ...]:
+    return (
+        f"Hospital {idx}",
+        "private",
+        f"{idx} Main Road",
+        f"City {idx % 500}",
+        f"State {idx % 30}",
+        "IN",
+    )
+
+
+def time_lookups(connection: sqlite3.Connection, query: str, params: list) -> float:
+    """Mean seconds per lookup."""
+    started = time.perf_counter()
+    for param in params:
+        connection.execute(query, param).fetchone()
+    return (time.perf_counter() - started) / len(params)
+
+
+def main(rows: int, lookups: int) -> None:
+    connection = build_table(rows)
+    step = max(1, rows // lookups)
+    sample = range(0, rows, step)
+    filtered_query = "SELECT 1 FROM hospital WHERE " + " AND ".join(
+        f"{field} = ?" for field in IDENTITY_FIELDS
+    )
+    filtered = time_lookups(
+        connection, filtered_query, [hospital_fields(idx) for idx in sample]
+    )
+    by_primary_key = time_lookups(
+        connection,
+        "SELECT 1 FROM hospital WHERE id = ?",
+        [(content_id(idx),) for idx in sample],
+    )
+    derive_id = time_content_ids(len(sample))
+    print(f"rows: {rows}, lookups: {len(sample)}")
+    print(f"filtered query:        {filtered * 1e6:12.1f} us/lookup")
+    print(f"primary key read:      {by_primary_key * 1e6:12.1f} us/lookup")
+    print(f"content id derivation: {derive_id * 1e6:12.1f} us/id")
+
+
+def time_content_ids(count: int) -> float:
+    """Mean seconds to derive a content id from the identity fields."""
+    started = time.perf_counter()
+    for idx in range(count):
+        content_id(idx)
+    return (time.perf_counter() - started) / count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+    main(args.rows, args.lookups)
@@ -0,0 +1,110 @@
+"""Benchmarks nearest and within radius queries on the geo hospital index.
+
+    python -m benchmarks.bench_geo_nearby --sizes 100000 1000000
+
+Hospitals are scattered over the bounding box of India, denser around
+a few hundred city centres. Entries are built with construct(),
+skipping validation, since only the index is measured.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from registrations.domain.hospital.registration import UnclaimedHospital
+from registrations.domain.location.location import AddressGeoLocation
+from registrations.infrastructure.adapters.search.geo_index import GeoHospitalIndex
+
+# South, north, west and east edges of India.
+BOUNDING_BOX = (8.0, 37.0, 68.0, 97.0)
+CITY_CENTRES = 300
+
+
+def random_point(rng: random.Random) -> tuple[float, float]:
+    south, north, west, east = BOUNDING_BOX
+    return rng.uniform(south, north), rng.uniform(west, east)
+
+
+def build_hospitals(size: int, seed: int = 13) -> list[UnclaimedHospital]:
+    rng = random.Random(seed)
+    city_centres = [random_point(rng) for _ in range(CITY_CENTRES)]
+    hospitals = []
+    for idx in range(size):
+        if idx % 3:
+            latitude, longitude = rng.choice(city_centres)
+            latitude += rng.gauss(0, 0.15)
+            longitude += rng.gauss(0, 0.15)
+        else:
+            latitude, longitude = random_point(rng)
+        hospitals.append(
+            UnclaimedHospital.construct(
+                hospital_id=uuid.uuid4(),
+                hospital_name=f"Hospital {idx}",
+                geo_location=AddressGeoLocation.construct(
+                    latitude=latitude, longitude=longitude
+                ),
+            )
+        )
+    return hospitals
+
+
+def report(kind: str, timings: list[float]) -> None:
+    timings.sort()
+    print(
+        f"  {kind:<22} mean {statistics.mean(timings) * 1e3:6.2f} ms"
+        f"  p50 {timings[len(timings) // 2] * 1e3:6.2f} ms"
+        f"  p99 {timings[int(len(timings) * 0.99)] * 1e3:6.2f} ms"
+    )
+
+
+def time_queries(query, points: list[tuple[float, float]]) -> list[float]:
+    timings = []
+    for point in points:
+        started = time.perf_counter()
+        query(point)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main(sizes: list[int], queries: int, batch_size: int) -> None:
+    rng = random.Random(7)
+    points = [random_point(rng) for _ in range(queries)]
+    for size in sizes:
+        hospitals = build_hospitals(size)
+        geo_index = GeoHospitalIndex()
+        started = time.perf_counter()
+        geo_index.extend(hospitals)
+        build_seconds = time.perf_counter() - started
+        print(f"entries: {size}, index built in {build_seconds:.1f} s")
+        report(
+            "nearest 10",
+            time_queries(lambda point: geo_index.nearest(*point, 10), points),
+        )
+        report(
+            "nearest 10 within 25km",
+            time_queries(lambda point: geo_index.nearest(*point, 10, 25), points),
+        )
+        report(
+            "within 5km",
+            time_queries(lambda point: geo_index.within(*point, 5), points),
+        )
+        started = time.perf_counter()
+        for idx in range(0, len(points), batch_size):
+            geo_index.nearest_many(points[idx : idx + batch_size], 10)
+        batch_seconds = time.perf_counter() - started
+        print(
+            f"  nearest 10, batches of {batch_size}:"
+            f" {batch_seconds / len(points) * 1e3:6.2f} ms/point"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    main(args.sizes, args.queries, args.batch_size)
@@ -0,0 +1,114 @@
+"""Benchmarks look ahead searches on the in-memory hospital index.
+
+    python -m benchmarks.bench_hospital_search --sizes 100000 1000000
+
+Hospitals get synthetic names, cities and states drawn from fixed
+vocabularies. Entries are built with construct(), skipping validation,
+since only the index is measured.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from registrations.domain.hospital.registration import (
+    OwnershipType,
+    PhoneNumber,
+    UnclaimedHospital,
+    VerificationStatus,
+)
+from registrations.domain.location.location import Address
+from registrations.infrastructure.adapters.search.memory_index import (
+    InMemoryHospitalSearchIndex,
+)
+
+SYLLABLES = ("ra", "ja", "pa", "ma", "vi", "shan", "ti", "ko", "lu", "an", "dhe", "sa")
+KINDS = ("Hospital", "Clinic", "Medical Centre", "Nursing Home", "Health Care")
+
+
+def build_words(rng: random.Random, count: int) -> list[str]:
+    words: set[str] = set()
+    while len(words) < count:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))).title())
+    return sorted(words)
+
+
+def build_hospitals(size: int, seed: int = 13) -> list[UnclaimedHospital]:
+    rng = random.Random(seed)
+    name_words = build_words(rng, 10_000)
+    addresses = [
+        Address.construct(street="Main Road", city=city, state=state, country="IN")
+        for city, state in zip(build_words(rng, 2000), rng.choices(name_words, k=2000))
+    ]
+    phone_number = PhoneNumber.construct(number="+919425411234")
+    return [
+        UnclaimedHospital.construct(
+            hospital_id=uuid.uuid4(),
+            hospital_name=f"{rng.choice(name_words)} {rng.choice(name_words)} "
+            f"{rng.choice(KINDS)}",
+            ownership_type=OwnershipType.Private,
+            address=rng.choice(addresses),
+            phone_number=phone_number,
+            geo_location=None,
+            verified_status=VerificationStatus.Unverified,
+        )
+        for _ in range(size)
+    ]
+
+
+def build_queries(
+    hospitals: list[UnclaimedHospital], count: int, seed: int = 7
+) -> dict[str, list[str]]:
+    rng = random.Random(seed)
+    sample = rng.sample(hospitals, count)
+    return {
+        "prefix": [hospital.hospital_name[:3] for hospital in sample],
+        "word + prefix": [
+            " ".join(hospital.hospital_name.split()[:2])[:-2] for hospital in sample
+        ],
+        "name + city": [
+            f"{hospital.hospital_name.split()[0]} {hospital.address.city[:4]}"
+            for hospital in sample
+        ],
+        "misspelt": [
+            misspell(rng, hospital.hospital_name.split()[0]) for hospital in sample
+        ],
+    }
+
+
+def misspell(rng: random.Random, word: str) -> str:
+    idx = rng.randrange(1, len(word) - 1)
+    return word[:idx] + word[idx + 1] + word[idx] + word[idx + 2 :]
+
+
+def main(sizes: list[int], queries: int) -> None:
+    for size in sizes:
+        hospitals = build_hospitals(size)
+        search_index = InMemoryHospitalSearchIndex()
+        started = time.perf_counter()
+        search_index.extend(hospitals)
+        build_seconds = time.perf_counter() - started
+        print(f"entries: {size}, index built in {build_seconds:.1f} s")
+        for kind, search_queries in build_queries(hospitals, queries).items():
+            timings = []
+            for search_query in search_queries:
+                started = time.perf_counter()
+                search_index.search(search_query, 10)
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            print(
+                f"  {kind:<14} mean {statistics.mean(timings) * 1e3:6.2f} ms"
+                f"  p50 {timings[len(timings) // 2] * 1e3:6.2f} ms"
+                f"  p99 {timings[int(len(timings) * 0.99)] * 1e3:6.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+    main(args.sizes, args.queries)
@@ -0,0 +1,218 @@
+"""Micro benchmarks of each stage of the registration hot path.
+
+    python -m benchmarks.bench_hot_path --save baseline.json
+    python -m benchmarks.bench_hot_path --compare baseline.json --threshold 0.1
+
+Each stage runs in batches sized to take at least --min-batch-seconds,
+and the best of --repeat batches is reported in microseconds per call.
+--compare exits with status 1 when a stage got slower than the baseline
+by more than --threshold, e.g. 0.1 for 10%. Baselines are only
+comparable when taken on the same host and Python.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from typing import Any, Awaitable, Callable
+
+from fastapi.responses import JSONResponse, UJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_cloned_field, create_response_field
+
+from benchmarks.bench_registration_pipeline import (
+    REQUEST_BODIES,
+    EntityHospitalRepo,
+    build_uow_factory,
+)
+from registrations.domain.dto import RegisteredHospital, ToHospitalRegistrationEntry
+from registrations.domain.hospital.registration import HospitalEntryAggregate
+from registrations.domain.services.application_services import (
+    HospitalRegistrationApplicationService,
+)
+from registrations.infrastructure.adapters.repos.postgres_m3o import m3o_dto
+
+# One sample per format supported by _parse_datetime.
+ADDED_SINCE_SAMPLES = {
+    "date": "2022-01-01",
+    "date time": "2022-01-01 10:30:00",
+    "date time offset": "2022-01-01 10:30:00 +0530",
+    "iso utc": "2022-01-01T10:30:00Z",
+}
+
+M3O_TABLES = {"unverified": "unverified_hospital", "unclaimed": "unclaimed_hospital"}
+
+# The field FastAPI validates a response_model=ToHospitalRegistrationEntry with.
+ECHO_RESPONSE_FIELD = create_cloned_field(
+    create_response_field(name="echo_response", type_=ToHospitalRegistrationEntry)
+)
+
+BatchRunner = Callable[[int], float]
+
+
+def sync_batch(func: Callable[[], Any]) -> BatchRunner:
+    def run_batch(number: int) -> float:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        return time.perf_counter() - started
+
+    return run_batch
+
+
+def async_batch(
+    loop: asyncio.AbstractEventLoop, func: Callable[[], Awaitable[Any]]
+) -> BatchRunner:
+    async def run(number: int) -> float:
+        started = time.perf_counter()
+        for _ in range(number):
+            await func()
+        return time.perf_counter() - started
+
+    return lambda number: loop.run_until_complete(run(number))
+
+
+async def render_validated_echo(
+    registration_entry: ToHospitalRegistrationEntry,
+) -> bytes:
+    """The echo as FastAPI rendered it through its response_model."""
+    content = await serialize_response(
+        field=ECHO_RESPONSE_FIELD, response_content=registration_entry
+    )
+    return JSONResponse(content).body
+
+
+def measure(run_batch: BatchRunner, repeat: int, min_batch_seconds: float) -> float:
+    """Best microseconds per call over repeat batches."""
+    number = 1
+    while (elapsed := run_batch(number)) < min_batch_seconds:
+        number *= 2 if elapsed * 10 > min_batch_seconds else 10
+    return min(run_batch(number) for _ in range(repeat)) / number * 1e6
+
+
+def build_stages(loop: asyncio.AbstractEventLoop) -> dict[str, BatchRunner]:
+    stages: dict[str, BatchRunner] = {}
+    uow_factory = build_uow_factory(EntityHospitalRepo())
+    for kind, request_body in REQUEST_BODIES.items():
+        registration_entry = ToHospitalRegistrationEntry.parse_raw(request_body)
+        hospital_entry_dict = registration_entry.build_hospital_entity_dict()
+        hospital_entry = HospitalEntryAggregate.build_factory(**hospital_entry_dict)
+        stages[f"parse entry/{kind}"] = sync_batch(
+            lambda request_body=request_body: ToHospitalRegistrationEntry.parse_raw(
+                request_body
+            )
+        )
+        stages[f"build entity dict/{kind}"] = sync_batch(
+            registration_entry.build_hospital_entity_dict
+        )
+        stages[f"build factory/{kind}"] = sync_batch(
+            lambda hospital_entry_dict=hospital_entry_dict: HospitalEntryAggregate.build_factory(
+                **hospital_entry_dict
+            )
+        )
+        stages[f"m3o parse_to_dict/{kind}"] = sync_batch(
+            lambda hospital_entry=hospital_entry, table=M3O_TABLES[
+                kind
+            ]: m3o_dto.parse_to_dict(table, hospital_entry)
+        )
+        stages[f"response validated echo/{kind}"] = async_batch(
+            loop,
+            lambda registration_entry=registration_entry: render_validated_echo(
+                registration_entry
+            ),
+        )
+        stages[f"response ujson echo/{kind}"] = sync_batch(
+            lambda registration_entry=registration_entry: UJSONResponse(
+                registration_entry.dict()
+            ).body
+        )
+        stages[f"response lean/{kind}"] = sync_batch(
+            lambda hospital_entry=hospital_entry: UJSONResponse(
+                RegisteredHospital.from_hospital_entry(hospital_entry).to_dict()
+            ).body
+        )
+        stages[f"register hospital/{kind}"] = async_batch(
+            loop,
+            lambda request_body=request_body: HospitalRegistrationApplicationService.register_hospital(
+                uow_factory, ToHospitalRegistrationEntry.parse_raw(request_body)
+            ),
+        )
+    for kind, added_since in ADDED_SINCE_SAMPLES.items():
+        stages[f"parse datetime/{kind}"] = sync_batch(
+            lambda added_since=added_since: ToHospitalRegistrationEntry._parse_datetime(
+                added_since
+            )
+        )
+    return stages
+
+
+def compare(
+    results: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[str]:
+    """Print each stage against the baseline; return the regressed stages."""
+    regressions = []
+    for stage, us_per_call in results.items():
+        if (baseline_us := baseline.get(stage)) is None:
+            print(f"{stage:<36} {us_per_call:10.2f} us   (no baseline)")
+            continue
+        change = us_per_call / baseline_us - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(stage)
+        print(
+            f"{stage:<36} {us_per_call:10.2f} us  {baseline_us:10.2f} us"
+            f"  {change:+7.1%}{'  REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def main(args: argparse.Namespace) -> int:
+    loop = asyncio.new_event_loop()
+    try:
+        stages = build_stages(loop)
+        results = {
+            stage: measure(run_batch, args.repeat, args.min_batch_seconds)
+            for stage, run_batch in stages.items()
+            if not args.stages or any(name in stage for name in args.stages)
+        }
+    finally:
+        loop.close()
+    if args.save:
+        with open(args.save, "w") as baseline_file:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "us_per_call": results,
+                },
+                baseline_file,
+                indent=2,
+            )
+    if not args.compare:
+        for stage, us_per_call in results.items():
+            print(f"{stage:<36} {us_per_call:10.2f} us")
+        return 0
+    with open(args.compare) as baseline_file:
+        baseline = json.load(baseline_file)
+    print(f"{'stage':<36} {'current':>13} {'baseline':>13}  change")
+    regressions = compare(results, baseline["us_per_call"], args.threshold)
+    if regressions:
+        print(f"{len(regressions)} stage(s) regressed by over {args.threshold:.0%}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", help="compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-batch-seconds", type=float, default=0.2)
+    parser.add_argument(
+        "--stages", nargs="+", help="only run stages containing one of these names"
+    )
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,142 @@
+"""Benchmarks the CPU spent per registration from request body to repo.
+
+    python -m benchmarks.bench_registration_pipeline --requests 5000
+
+Runs the same registrations through a repo taking the validated entity
+and through one taking its fields, which rebuilds and validates the
+entity again like repos did before. Neither repo does any I/O, so only
+parsing and validation are measured, in process CPU time. The best of
+--rounds rounds is reported, as other load on the host only adds to it.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Any, Callable
+
+import ujson
+
+from registrations.domain.dto import ToHospitalRegistrationEntry
+from registrations.domain.hospital import registration
+from registrations.domain.services.application_services import (
+    HospitalRegistrationApplicationService,
+)
+
+REQUEST_BODIES = {
+    "unverified": ujson.dumps(
+        {
+            "name": "Rajajayah Paramvir Hospital",
+            "ownership_type": "public",
+            "hospital_contact_number": "+919425411234",
+            "verified_status": "unverified",
+            "key_contact": {
+                "name": "Radhe Shyam",
+                "mobile": "+919425416789",
+                "email": "radhe.shyam@hospital.org",
+            },
+            "address": {
+                "street": "Rajaji marg",
+                "city": "Newark",
+                "state": "MP",
+                "country": "IN",
+            },
+            "geo_location": {"latitude": 22.7196, "longitude": 75.8577},
+            "added_since": "2022-01-01T00:00:00Z",
+        }
+    ),
+    "unclaimed": ujson.dumps(
+        {
+            "name": "A Private hospital",
+            "ownership_type": "private",
+            "hospital_contact_number": "+919425411234",
+            "verified_status": "verified",
+            "address": {
+                "street": "Rajaji marg",
+                "city": "Newark",
+                "state": "MP",
+                "country": "IN",
+            },
+        }
+    ),
+}
+
+
+class FieldsHospitalRepo:
+    """Takes the fields of a hospital and builds it again."""
+
+    async def save_unverified_hospital(
+        self, **kwargs: Any
+    ) -> registration.HospitalEntityType:
+        return registration.HospitalEntryAggregate.build_factory(**kwargs)
+
+    async def save_unclaimed_hospital(
+        self, **kwargs: Any
+    ) -> registration.HospitalEntityType:
+        return registration.HospitalEntryAggregate.build_factory(**kwargs)
+
+
+class EntityHospitalRepo(FieldsHospitalRepo):
+    """Takes the validated hospital as it is."""
+
+    async def save_hospital(
+        self, hospital_entry: registration.HospitalEntityType
+    ) -> registration.HospitalEntityType:
+        return hospital_entry
+
+
+def build_uow_factory(hospital_repo: FieldsHospitalRepo) -> Callable[[], Any]:
+    class HospitalUOW:
+        def __init__(self) -> None:
+            self.hospital_repo = hospital_repo
+
+        async def __aenter__(self) -> HospitalUOW:
+            return self
+
+        async def __aexit__(self, *exc_info: Any) -> None:
+            return None
+
+        async def commit(self) -> None:
+            return None
+
+    return HospitalUOW
+
+
+async def time_registrations(
+    uow_factory: Callable[[], Any], request_body: str, requests: int
+) -> float:
+    """Mean process CPU seconds per registration."""
+    started = time.process_time()
+    for _ in range(requests):
+        registration_entry = ToHospitalRegistrationEntry.parse_raw(request_body)
+        await HospitalRegistrationApplicationService.register_hospital(
+            uow_factory, registration_entry
+        )
+    return (time.process_time() - started) / requests
+
+
+async def main(requests: int, rounds: int) -> None:
+    for kind, request_body in REQUEST_BODIES.items():
+        print(f"{kind} hospital, {requests} registrations")
+        for repo_kind, hospital_repo in (
+            ("repo taking fields", FieldsHospitalRepo()),
+            ("repo taking entity", EntityHospitalRepo()),
+        ):
+            uow_factory = build_uow_factory(hospital_repo)
+            # Warm up caches, e.g. of phone number verdicts.
+            await time_registrations(uow_factory, request_body, 100)
+            cpu_seconds = min(
+                [
+                    await time_registrations(uow_factory, request_body, requests)
+                    for _ in range(rounds)
+                ]
+            )
+            print(f"  {repo_kind}: {cpu_seconds * 1e6:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.rounds))
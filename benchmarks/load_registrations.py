@@ -0,0 +1,229 @@
+"""Load tests hospital registrations against a running service.
+
+    python -m benchmarks.m3o_stand_in --port 8090 --latency-ms 40 --jitter-ms 20 &
+    ENV=production REPO_BACKEND=m3o M3O_API_TOKEN=local \\
+        M3O_HTTP_API_URL=http://localhost:8090/v1/db EMAIL_VERIFICATION_OFFLINE=true \\
+        hypercorn -k uvloop --bind 127.0.0.1:8080 \\
+        registrations.infrastructure.adapters.api.app:app &
+    python -m benchmarks.load_registrations --url http://localhost:8080 \\
+        --requests 5000 --concurrency 50
+
+Sends --requests registrations from --concurrency clients. A share of
+them, --invalid-rate, are invalid in one of the ways clients get wrong,
+and --duplicate-rate resend a registration already sent. Throughput,
+the status codes and the p50/p95/p99 latency per kind of payload are
+reported.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import random
+import time
+from typing import Callable
+
+import httpx
+
+OWNERSHIP_TYPES = ("government", "public", "private", "public_private", "charitable")
+# City, state and a point in the city.
+CITIES = (
+    ("Indore", "MP", 22.7196, 75.8577),
+    ("Bhopal", "MP", 23.2599, 77.4126),
+    ("New Delhi", "DL", 28.6139, 77.2090),
+    ("Mumbai", "MH", 19.0760, 72.8777),
+    ("Pune", "MH", 18.5204, 73.8567),
+    ("Bengaluru", "KA", 12.9716, 77.5946),
+    ("Chennai", "TN", 13.0827, 80.2707),
+    ("Kolkata", "WB", 22.5726, 88.3639),
+    ("Jaipur", "RJ", 26.9124, 75.7873),
+    ("Lucknow", "UP", 26.8467, 80.9462),
+)
+NAME_PREFIXES = ("City", "Sanjeevani", "Apollo", "Lifeline", "Shri Ram", "Jeevan")
+NAME_SUFFIXES = ("Hospital", "Medical Centre", "Nursing Home", "Multispeciality")
+STREETS = ("MG Road", "Station Road", "Rajaji Marg", "Ring Road", "Civil Lines")
+CONTACT_NAMES = ("Radhe Shyam", "Anita Rao", "Imran Khan", "Priya Nair")
+MOBILE_PREFIXES = ("+919425", "+919826", "+919876", "+917000")
+
+
+def random_mobile(rng: random.Random) -> str:
+    return f"{rng.choice(MOBILE_PREFIXES)}{rng.randrange(10**6):06d}"
+
+
+def random_added_since(rng: random.Random) -> str:
+    day = f"2022-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    return rng.choice(
+        (day, f"{day} 10:30:00", f"{day} 10:30:00 +0530", f"{day}T10:30:00Z")
+    )
+
+
+def build_valid_payload(rng: random.Random) -> dict:
+    city, state, latitude, longitude = rng.choice(CITIES)
+    payload = {
+        "name": (
+            f"{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_SUFFIXES)}"
+            f" {rng.randrange(10**6)}"
+        ),
+        "ownership_type": rng.choice(OWNERSHIP_TYPES),
+        "hospital_contact_number": random_mobile(rng),
+        "address": {
+            "street": f"{rng.randint(1, 300)} {rng.choice(STREETS)}",
+            "city": city,
+            "state": state,
+            "country": "IN",
+        },
+        "geo_location": {
+            "latitude": round(latitude + rng.uniform(-0.1, 0.1), 6),
+            "longitude": round(longitude + rng.uniform(-0.1, 0.1), 6),
+        },
+        "added_since": random_added_since(rng),
+    }
+    if rng.random() < 0.5:
+        contact_name = rng.choice(CONTACT_NAMES)
+        payload["verified_status"] = "unverified"
+        payload["key_contact"] = {
+            "name": contact_name,
+            "mobile": random_mobile(rng),
+            "email": f"{contact_name.split()[0].lower()}@hospital.org",
+        }
+    else:
+        payload["verified_status"] = rng.choice(("verified", "verification_pending"))
+    return payload
+
+
+def without_name(payload: dict) -> dict:
+    return {key: value for key, value in payload.items() if key != "name"}
+
+
+def with_invalid_number(payload: dict) -> dict:
+    return {**payload, "hospital_contact_number": "+91123"}
+
+
+def with_unknown_ownership(payload: dict) -> dict:
+    return {**payload, "ownership_type": "franchise"}
+
+
+def with_invalid_date(payload: dict) -> dict:
+    return {**payload, "added_since": "01/02/2022"}
+
+
+def without_city(payload: dict) -> dict:
+    address = {key: value for key, value in payload["address"].items() if key != "city"}
+    return {**payload, "address": address}
+
+
+def verified_with_key_contact(payload: dict) -> dict:
+    return {
+        **payload,
+        "verified_status": "verified",
+        "key_contact": {"name": "Radhe Shyam", "mobile": "+919425416789"},
+    }
+
+
+INVALIDATIONS: tuple[Callable[[dict], dict], ...] = (
+    without_name,
+    with_invalid_number,
+    with_unknown_ownership,
+    with_invalid_date,
+    without_city,
+    verified_with_key_contact,
+)
+
+
+class PayloadGenerator:
+    """Yields (kind, payload) pairs in the configured proportions."""
+
+    def __init__(
+        self, invalid_rate: float, duplicate_rate: float, seed: int = 7
+    ) -> None:
+        self.invalid_rate = invalid_rate
+        self.duplicate_rate = duplicate_rate
+        self.__random = random.Random(seed)
+        self.__sent: list[dict] = []
+
+    def __call__(self) -> tuple[str, dict]:
+        draw = self.__random.random()
+        if draw < self.invalid_rate:
+            invalidation = self.__random.choice(INVALIDATIONS)
+            return "invalid", invalidation(build_valid_payload(self.__random))
+        if self.__sent and draw < self.invalid_rate + self.duplicate_rate:
+            return "duplicate", self.__random.choice(self.__sent)
+        payload = build_valid_payload(self.__random)
+        self.__sent.append(payload)
+        return "valid", payload
+
+
+def percentile(sorted_timings: list[float], fraction: float) -> float:
+    return sorted_timings[
+        min(int(len(sorted_timings) * fraction), len(sorted_timings) - 1)
+    ]
+
+
+def report(kind: str, timings: list[float]) -> None:
+    timings.sort()
+    print(
+        f"  {kind:<10} {len(timings):7d} requests"
+        f"  p50 {percentile(timings, 0.5) * 1e3:8.2f} ms"
+        f"  p95 {percentile(timings, 0.95) * 1e3:8.2f} ms"
+        f"  p99 {percentile(timings, 0.99) * 1e3:8.2f} ms"
+    )
+
+
+async def run_load(
+    url: str, requests: int, concurrency: int, next_payload: PayloadGenerator
+) -> None:
+    timings: dict[str, list[float]] = collections.defaultdict(list)
+    statuses: collections.Counter = collections.Counter()
+    remaining = iter(range(requests))
+
+    async def client(http_client: httpx.AsyncClient) -> None:
+        for _ in remaining:
+            kind, payload = next_payload()
+            started = time.perf_counter()
+            try:
+                response = await http_client.post("/register-hospital", json=payload)
+                statuses[response.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            timings[kind].append(time.perf_counter() - started)
+
+    async with httpx.AsyncClient(
+        base_url=url,
+        limits=httpx.Limits(max_connections=concurrency),
+        timeout=httpx.Timeout(30.0),
+    ) as http_client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http_client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    print(
+        f"{requests} requests from {concurrency} clients in {elapsed:.1f} s:"
+        f" {requests / elapsed:.1f} requests/s"
+    )
+    print(
+        "  status   "
+        + ", ".join(f"{k}: {v}" for k, v in sorted(statuses.items(), key=str))
+    )
+    report(
+        "all", [timing for kind_timings in timings.values() for timing in kind_timings]
+    )
+    for kind, kind_timings in sorted(timings.items()):
+        report(kind, kind_timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--invalid-rate", type=float, default=0.1)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(
+        run_load(
+            args.url,
+            args.requests,
+            args.concurrency,
+            PayloadGenerator(args.invalid_rate, args.duplicate_rate, args.seed),
+        )
+    )
@@ -0,0 +1,181 @@
+"""A local stand-in of the M3O DB API for load tests.
+
+    python -m benchmarks.m3o_stand_in --port 8090 --latency-ms 40 --error-rate 0.01
+
+Serves Read, Create and Delete under /v1/db from memory, so the M3O
+backend can be load tested without using M3O quota:
+
+    REPO_BACKEND=m3o M3O_API_TOKEN=local \\
+        M3O_HTTP_API_URL=http://localhost:8090/v1/db ...
+
+Read accepts an id, or a query of field == 'value' conditions joined
+by "and", as the repo sends for existence checks; fields of nested
+records are dotted, e.g. address.city. Every request waits the latency
+plus or minus up to the jitter, and fails with --error-status at
+--error-rate, to see how the service copes with a slow or flaky M3O.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import re
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+import fastapi
+
+M3O_DB_PATH = "/v1/db"
+
+QUERY_CONDITION_RGX_COMPILE = re.compile(
+    r"\s*([\w.]+)\s*(==|!=)\s*'((?:[^'\\]|\\.)*)'\s*(?:and\b|$)"
+)
+
+
+class InvalidQueryError(ValueError):
+    """The query is not of the syntax the stand-in supports."""
+
+
+def parse_query(query: str) -> list[tuple[str, str, str]]:
+    """Split a query into (field, operator, value) conditions."""
+    conditions = []
+    position = 0
+    while position < len(query):
+        if not (matched := QUERY_CONDITION_RGX_COMPILE.match(query, position)):
+            raise InvalidQueryError(f"Unsupported query: {query}")
+        field, operator, value = matched.groups()
+        conditions.append((field, operator, re.sub(r"\\(.)", r"\1", value)))
+        position = matched.end()
+    return conditions
+
+
+def record_field(record: dict, field: str) -> Any:
+    value: Any = record
+    for key in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def matches(record: dict, conditions: list[tuple[str, str, str]]) -> bool:
+    return all(
+        (str(record_field(record, field)) == value) is (operator == "==")
+        for field, operator, value in conditions
+    )
+
+
+class M3OStandIn:
+    """In memory tables behind a fastapi app speaking the M3O DB API."""
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0,
+        error_status: int = 500,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.tables: dict[str, dict[str, dict]] = {}
+        self.__random = random.Random(seed)
+
+    async def __delay_or_fail(self) -> Optional[fastapi.responses.JSONResponse]:
+        delay_ms = self.latency_ms + self.__random.uniform(
+            -self.jitter_ms, self.jitter_ms
+        )
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        if self.__random.random() < self.error_rate:
+            return fastapi.responses.JSONResponse(
+                status_code=self.error_status,
+                content={"error": "injected by the M3O stand-in"},
+            )
+        return None
+
+    def read(self, payload: dict) -> dict:
+        table = self.tables.get(payload.get("table") or "default", {})
+        if record_id := payload.get("id"):
+            records = [table[record_id]] if record_id in table else []
+        else:
+            conditions = parse_query(payload.get("query") or "")
+            records = [
+                record for record in table.values() if matches(record, conditions)
+            ]
+        offset = payload.get("offset") or 0
+        limit = payload.get("limit") or 25
+        return {"records": records[offset : offset + limit]}
+
+    def create(self, payload: dict) -> dict:
+        record = dict(payload.get("record") or {})
+        record_id = record.setdefault("id", uuid.uuid4().hex)
+        self.tables.setdefault(payload.get("table") or "default", {})[
+            record_id
+        ] = record
+        return {"id": record_id}
+
+    def delete(self, payload: dict) -> dict:
+        self.tables.get(payload.get("table") or "default", {}).pop(
+            payload.get("id"), None
+        )
+        return {}
+
+    def build_app(self) -> fastapi.FastAPI:
+        app = fastapi.FastAPI(title="M3O DB API stand-in.")
+        for endpoint, handler in (
+            ("Read", self.read),
+            ("Create", self.create),
+            ("Delete", self.delete),
+        ):
+            app.add_api_route(
+                f"{M3O_DB_PATH}/{endpoint}",
+                self.__build_route(handler),
+                methods=["POST"],
+            )
+        return app
+
+    def __build_route(
+        self, handler: Callable[[dict], dict]
+    ) -> Callable[..., Awaitable[Any]]:
+        async def route(
+            payload: dict = fastapi.Body(...),
+            authorization: Optional[str] = fastapi.Header(None),
+        ) -> Any:
+            if not authorization or not authorization.startswith("Bearer "):
+                return fastapi.responses.JSONResponse(
+                    status_code=401, content={"error": "missing bearer token"}
+                )
+            if error_response := await self.__delay_or_fail():
+                return error_response
+            try:
+                return handler(payload)
+            except InvalidQueryError as e:
+                return fastapi.responses.JSONResponse(
+                    status_code=400, content={"error": str(e)}
+                )
+
+        return route
+
+
+if __name__ == "__main__":
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    stand_in = M3OStandIn(
+        args.latency_ms, args.jitter_ms, args.error_rate, args.error_status, args.seed
+    )
+    config = Config()
+    config.bind = [f"{args.host}:{args.port}"]
+    asyncio.run(serve(stand_in.build_app(), config))  # type: ignore[arg-type]
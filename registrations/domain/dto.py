@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import datetime
 import re
-from typing import Optional
+from typing import NamedTuple, Optional
 
 import pydantic
 
@@ -120,18 +120,23 @@ class ToHospitalRegistrationEntry(
 
         :return: dict, the hospital entity dict to register.
         """
-        builder_dict = self.dict()
+        # Fields are taken as they are: address and geo location are
+        # validated already and are not rebuilt from dicts.
+        builder_dict = {
+            field_name: getattr(self, field_name) for field_name in self.__fields__
+        }
         if verified_status := builder_dict.get("verified_status"):
             builder_dict["verified_status"] = registration.VerificationStatus(
                 verified_status
             )
         if key_contact := builder_dict.pop("key_contact", None):
-            builder_dict["key_contact_registrar"] = registration.ContactPerson(
-                name=key_contact.get("name"),
-                mobile_number=registration.PhoneNumber(
-                    number=key_contact.get("mobile")
-                ),
-                email=key_contact.get("email"),
+            # RegisterKeyContact has validated the name and email already.
+            builder_dict[
+                "key_contact_registrar"
+            ] = registration.ContactPerson.build_trusted(
+                name=key_contact.name,
+                mobile_number=registration.PhoneNumber(number=key_contact.mobile),
+                email=key_contact.email,
             )
         if geo_location := builder_dict.pop("geo_location", None):
             builder_dict["geo_location"] = geo_location
@@ -164,9 +169,204 @@ class ToHospitalRegistrationEntry(
                 return datetime.datetime.strptime(matched_group, "%Y-%m-%d %H:%M:%S %z")
             if matched_fmt_len == 2:
                 return datetime.datetime.strptime(matched_group, "%Y-%m-%d %H:%M:%S")
-            _, _, _, penultimate_match, last_match = matched_str.groups()
-            if matched_fmt_len == 1 and (penultimate_match is last_match is None):
+            _, _, iso_utc_match, _, _ = matched_str.groups()
+            if matched_fmt_len == 1 and iso_utc_match:
                 return datetime.datetime.strptime(matched_group, "%Y-%m-%dT%H:%M:%SZ")
             if matched_fmt_len == 1:
                 return datetime.datetime.strptime(matched_group, "%Y-%m-%d")
         raise ValueError(f"Invalid date time format: {added_since}")
+
+
+class BulkRegistrationStatus(enum_utils.EnumWithItems):
+    """Outcome of a single line of a bulk registration."""
+
+    Created = "created"
+    Duplicate = "duplicate"
+    Invalid = "invalid"
+
+
+class BulkRegistrationResult(
+    pydantic.BaseModel,
+    allow_mutation=False,
+):
+    """Result of registering one input line of a bulk registration."""
+
+    line: int
+    status: BulkRegistrationStatus
+    hospital_id: Optional[str]
+    error: Optional[str]
+
+    def to_dict(self) -> dict:
+        """Return the result without the absent fields."""
+        result_dict: dict = {"line": self.line, "status": self.status.value}
+        if self.hospital_id:
+            result_dict["hospital_id"] = self.hospital_id
+        if self.error:
+            result_dict["error"] = self.error
+        return result_dict
+
+
+class RegistrationTicketStatus(enum_utils.EnumWithItems):
+    """Progress of a registration accepted to be stored in the background."""
+
+    Pending = "pending"
+    Created = "created"
+    Duplicate = "duplicate"
+    Failed = "failed"
+
+
+class RegistrationTicket(
+    pydantic.BaseModel,
+    allow_mutation=False,
+):
+    """A registration accepted to be stored in the background."""
+
+    ticket: str
+    status: RegistrationTicketStatus
+    hospital_id: str
+    error: Optional[str]
+
+
+class RegisteredHospitalStatus(enum_utils.EnumWithItems):
+    """Outcome of a registration stored before it was answered."""
+
+    Created = "created"
+
+
+class RegisteredHospital(
+    pydantic.BaseModel,
+    allow_mutation=False,
+):
+    """A stored registration, as answered instead of echoing the entry."""
+
+    hospital_id: str
+    status: RegisteredHospitalStatus
+    added_since: datetime.datetime
+
+    @classmethod
+    def from_hospital_entry(
+        cls, hospital_entry: registration.HospitalEntityType
+    ) -> RegisteredHospital:
+        # Built unvalidated, from an entity that is validated already.
+        return cls.construct(
+            hospital_id=str(hospital_entry.hospital_id),
+            status=RegisteredHospitalStatus.Created,
+            added_since=hospital_entry.added_since,
+        )
+
+    def to_dict(self) -> dict:
+        """Return the result as JSON ready values."""
+        return {
+            "hospital_id": self.hospital_id,
+            "status": self.status.value,
+            "added_since": self.added_since.isoformat(),
+        }
+
+
+class HospitalSearchResult(
+    pydantic.BaseModel,
+    allow_mutation=False,
+):
+    """A registered hospital matching a look ahead search.
+
+    Leaves out contact details, which the search must not expose.
+    """
+
+    hospital_id: str
+    name: str
+    ownership_type: Optional[str]
+    city: str
+    state: str
+    country: str
+
+    @classmethod
+    def from_hospital_entry(
+        cls, hospital_entry: registration.HospitalEntityType
+    ) -> HospitalSearchResult:
+        return cls(
+            hospital_id=str(hospital_entry.hospital_id),
+            name=hospital_entry.hospital_name,
+            ownership_type=hospital_entry.ownership_type
+            and enum_utils.enum_value_of(hospital_entry.ownership_type),
+            city=hospital_entry.address.city,
+            state=hospital_entry.address.state,
+            country=hospital_entry.address.country,
+        )
+
+
+class NearbyHospitalResult(HospitalSearchResult):
+    """A registered hospital near a queried geo location."""
+
+    distance_km: float
+    latitude: float
+    longitude: float
+
+    @classmethod
+    def from_nearby_hospital(
+        cls, hospital_entry: registration.HospitalEntityType, distance_km: float
+    ) -> NearbyHospitalResult:
+        return cls(
+            **HospitalSearchResult.from_hospital_entry(hospital_entry).dict(),
+            distance_km=round(distance_km, 3),
+            latitude=hospital_entry.geo_location.latitude,
+            longitude=hospital_entry.geo_location.longitude,
+        )
+
+
+class HospitalExportFormat(enum_utils.EnumWithItems):
+    """Format of an export of registered hospitals."""
+
+    Ndjson = "ndjson"
+    Csv = "csv"
+
+
+class HospitalExportRow(NamedTuple):
+    """A registered hospital as exported, with the cursor to resume after it.
+
+    Leaves out the key contact registrar, whose details are personal.
+    A tuple rather than a model, as exports build one per stored hospital.
+    """
+
+    cursor: str
+    hospital_id: str
+    verified_status: str
+    name: str
+    ownership_type: Optional[str]
+    street: str
+    street2: Optional[str]
+    city: str
+    state: str
+    country: str
+    phone_number: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    added_since: str
+
+    @classmethod
+    def from_hospital_entry(
+        cls, hospital_entry: registration.HospitalEntityType, cursor: str
+    ) -> HospitalExportRow:
+        address = hospital_entry.address
+        geo_location = hospital_entry.geo_location
+        verified_status = (
+            hospital_entry.verified_status
+            if isinstance(hospital_entry, registration.UnclaimedHospital)
+            else registration.VerificationStatus.Unverified
+        )
+        return cls(
+            cursor=cursor,
+            hospital_id=str(hospital_entry.hospital_id),
+            verified_status=enum_utils.enum_value_of(verified_status),
+            name=hospital_entry.hospital_name,
+            ownership_type=hospital_entry.ownership_type
+            and enum_utils.enum_value_of(hospital_entry.ownership_type),
+            street=address.street,
+            street2=address.street2,
+            city=address.city,
+            state=address.state,
+            country=address.country,
+            phone_number=hospital_entry.phone_number.number,
+            latitude=geo_location and geo_location.latitude,
+            longitude=geo_location and geo_location.longitude,
+            added_since=hospital_entry.added_since.isoformat(),
+        )
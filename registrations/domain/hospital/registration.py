@@ -1,13 +1,13 @@
 from __future__ import annotations
 
+import collections
 import datetime
+import os
 import uuid
 from typing import Any, Dict, Optional, Union
 
-import email_validator  # type: ignore  # Does not have a PEP 561 compliant package.
 import phonenumbers
 import pydantic
-from email_validator import EmailNotValidError
 from phonenumbers import parse as parse_number
 
 from registrations.domain.location.location import Address, AddressGeoLocation
@@ -28,6 +28,20 @@ class OwnershipType(enum_utils.EnumWithItems):
     Charitable = "charitable"
 
 
+# Value Object
+class HospitalIdMode(enum_utils.EnumWithItems):
+    # Random time based uuid1 ids.
+    Time = "time"
+    # uuid5 ids derived from the identity key, so a duplicate
+    # hospital always gets the id of the stored one.
+    Content = "content"
+
+
+# Opt in with HOSPITAL_ID_MODE=content once existing records are migrated.
+HOSPITAL_ID_MODE = HospitalIdMode(os.getenv("HOSPITAL_ID_MODE") or "time")
+HOSPITAL_ID_NAMESPACE = uuid.UUID("97af1775-f0a6-552b-9f8b-2edb44f634b0")
+
+
 # Value Object
 class VerificationStatus(enum_utils.EnumWithItems):
     Verified = "verified"
@@ -35,20 +49,76 @@ class VerificationStatus(enum_utils.EnumWithItems):
     Pending = "verification_pending"
 
 
+# Number of distinct phone numbers whose validation verdict is cached.
+PHONE_NUMBER_CACHE_SIZE = int(os.getenv("PHONE_NUMBER_CACHE_SIZE") or 10_000)
+
+
+class PhoneNumberCache:
+    """Bounded LRU cache of phone number validation verdicts.
+
+    Maps a raw number to its E.164 form, or to None when it is not a
+    valid number. The E.164 form is cached as valid too, so rebuilding
+    a PhoneNumber from a stored number never parses it again.
+    Numbers that fail to parse raise and are not cached.
+    """
+
+    def __init__(self, maxsize: int = PHONE_NUMBER_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__verdicts: collections.OrderedDict[
+            str, Optional[str]
+        ] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__verdicts)
+
+    def normalize(self, phone_number: str) -> Optional[str]:
+        """E.164 form of a valid number, None for an invalid one."""
+        if phone_number in self.__verdicts:
+            self.hits += 1
+            self.__verdicts.move_to_end(phone_number)
+            return self.__verdicts[phone_number]
+        self.misses += 1
+        phonenum_obj: phonenumbers.PhoneNumber = parse_number(phone_number)
+        e164_number = (
+            phonenumbers.format_number(
+                phonenum_obj, phonenumbers.PhoneNumberFormat.E164
+            )
+            if phonenumbers.is_possible_number(phonenum_obj)
+            and phonenumbers.is_valid_number(phonenum_obj)
+            else None
+        )
+        self.__store(phone_number, e164_number)
+        if e164_number is not None:
+            self.__store(e164_number, e164_number)
+        return e164_number
+
+    def clear(self) -> None:
+        self.__verdicts.clear()
+        self.hits = self.misses = 0
+
+    def __store(self, phone_number: str, e164_number: Optional[str]) -> None:
+        self.__verdicts[phone_number] = e164_number
+        self.__verdicts.move_to_end(phone_number)
+        if len(self.__verdicts) > self.maxsize:
+            self.__verdicts.popitem(last=False)
+
+
+phone_number_cache = PhoneNumberCache()
+
+
 # Value Object
 class PhoneNumber(pydantic.BaseModel, allow_mutation=False, validate_assignment=True):
+    # Kept in E.164 form, e.g. +919425411234.
     number: str
 
     @pydantic.validator("number", pre=True)
     @classmethod
     def _validate_number(cls, phone_number: str) -> str:
-        phonenum_obj: phonenumbers.PhoneNumber = parse_number(phone_number)
-        if not (
-            phonenumbers.is_possible_number(phonenum_obj)
-            and phonenumbers.is_valid_number(phonenum_obj)
-        ):
+        if (e164_number := phone_number_cache.normalize(phone_number)) is None:
             raise MissingRegistrationFieldError("Invalid number format.", cls)
-        return phone_number
+        return e164_number
 
 
 # Value Object
@@ -62,16 +132,25 @@ class ContactPerson(
 
     name: str
     mobile_number: PhoneNumber
+    # EmailStr checks the syntax only: whether the domain accepts mail is
+    # checked off the request path, see InterfaceEmailVerificationService.
     email: Optional[pydantic.EmailStr]
 
-    @pydantic.validator("email", pre=True)
     @classmethod
-    def _validate_email(
-        cls, email: Optional[pydantic.EmailStr]
-    ) -> Optional[pydantic.EmailStr]:
-        if email and not email_validator.validate_email(email):
-            raise EmailNotValidError
-        return email
+    def build_trusted(
+        cls,
+        name: str,
+        mobile_number: PhoneNumber,
+        email: Optional[pydantic.EmailStr],
+    ) -> ContactPerson:
+        """Build from fields that are validated already, skipping validation.
+
+        A PhoneNumber is valid by construction; name and email must come
+        from a validated model, e.g. the key contact of a registration.
+        """
+        if not isinstance(mobile_number, PhoneNumber):
+            raise TypeError("mobile_number must be a PhoneNumber.")
+        return cls.construct(name=name, mobile_number=mobile_number, email=email)
 
 
 # ================================================== #
@@ -84,6 +163,7 @@ class ContactPerson(
 # ================================================== #
 HospitalEntryDictType = Union[
     pydantic.UUID1,
+    pydantic.UUID5,
     str,
     Optional[OwnershipType],
     Address,
@@ -102,7 +182,7 @@ class HospitalEntryAggregate(pydantic.BaseModel, validate_assignment=True):
     various entities.
     """
 
-    hospital_id: pydantic.UUID1 = pydantic.Field(
+    hospital_id: Union[pydantic.UUID1, pydantic.UUID5] = pydantic.Field(
         default_factory=uuid.uuid1, allow_mutation=False
     )
     hospital_name: str
@@ -115,13 +195,49 @@ class HospitalEntryAggregate(pydantic.BaseModel, validate_assignment=True):
         default_factory=datetime.datetime.now, allow_mutation=False
     )
 
+    @property
+    def identity_key(self) -> str:
+        """Normalized identity of the hospital used to detect duplicates.
+
+        Built from the same fields as the repo existence checks:
+        name, ownership type and street, city, state and country.
+        """
+        return self.build_identity_key(
+            self.hospital_name,
+            self.ownership_type.value if self.ownership_type else "",
+            self.address.street,
+            self.address.city,
+            self.address.state,
+            self.address.country,
+        )
+
+    @property
+    def content_id(self) -> uuid.UUID:
+        """Deterministic uuid5 id of the hospital."""
+        return self.build_content_id(self.identity_key)
+
+    @staticmethod
+    def build_identity_key(*parts: str | None) -> str:
+        """Identity key from raw field values, e.g. of a stored record."""
+        return "|".join((part or "").strip().casefold() for part in parts)
+
+    @staticmethod
+    def build_content_id(identity_key: str) -> uuid.UUID:
+        return uuid.uuid5(HOSPITAL_ID_NAMESPACE, identity_key)
+
     @classmethod
     def build_factory(cls, **kwargs: HospitalEntryDictType) -> HospitalEntityType:
-        return (
+        hospital_entry = (
             cls._build_unclaimed_hospital_factory(**kwargs)
             if cls._can_be_verified(**kwargs)
             else cls._build_unverified_hospital_factory(**kwargs)
         )
+        # A given id is kept so entries read back or rebuilt keep theirs.
+        if HOSPITAL_ID_MODE is HospitalIdMode.Content and not kwargs.get("hospital_id"):
+            return hospital_entry.copy(
+                update={"hospital_id": hospital_entry.content_id}
+            )
+        return hospital_entry
 
     @classmethod
     def _build_unclaimed_hospital_factory(
@@ -156,9 +272,7 @@ class HospitalEntryAggregate(pydantic.BaseModel, validate_assignment=True):
     @classmethod
     def _check_missing_attributes(cls, **kwargs: str) -> Optional[list]:
         """Check entity attributes if absent in input."""
-        field_attrs = cls.__fields__.keys()
-        kwarg_keys = kwargs.keys()
-        return list(filter(lambda key: key not in kwarg_keys, field_attrs)) or None
+        return [key for key in cls.__fields__ if key not in kwargs] or None
 
     @classmethod
     def _can_be_verified(
@@ -2,13 +2,32 @@ from __future__ import annotations
 
 import abc
 import enum
-from typing import Literal, Protocol
+from typing import (
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Literal,
+    Optional,
+    Protocol,
+    Sequence,
+    TypeVar,
+    runtime_checkable,
+)
 
 from registrations.domain.hospital.registration import (
+    HospitalEntityType,
     UnclaimedHospital,
     UnverifiedRegisteredHospital,
 )
-from registrations.utils.errors import MissingRegistrationFieldError
+from registrations.utils.errors import (
+    InvalidExportCursorError,
+    MissingRegistrationFieldError,
+)
+
+PositionType = TypeVar("PositionType")
+
+# A page of hospitals, each with the cursor resuming a read after it.
+HospitalPageType = list[tuple[HospitalEntityType, str]]
 
 
 class UOWSessionFlag(enum.Enum):
@@ -31,6 +50,148 @@ class InterfaceHospitalRepo(Protocol):
         raise NotImplementedError
 
 
+@runtime_checkable
+class InterfaceEntityHospitalRepo(Protocol):
+    """A repo that saves an already validated hospital entity as it is."""
+
+    @abc.abstractmethod
+    async def save_hospital(
+        self, hospital_entry: HospitalEntityType
+    ) -> HospitalEntityType:
+        """Save the hospital without building it again from its fields."""
+        raise NotImplementedError
+
+
+@runtime_checkable
+class InterfaceBulkHospitalRepo(Protocol):
+    """A repo that can save many hospitals in a single round trip."""
+
+    @abc.abstractmethod
+    async def save_hospitals(
+        self, hospital_entries: Sequence[HospitalEntityType]
+    ) -> list[bool]:
+        """Save hospitals skipping duplicates.
+
+        :return: list[bool], per entry whether it was created or a duplicate.
+        """
+        raise NotImplementedError
+
+
+@runtime_checkable
+class InterfaceHospitalReadRepo(Protocol):
+    """A repo that can read back every stored hospital."""
+
+    @abc.abstractmethod
+    def iter_hospitals(self) -> AsyncIterator[HospitalEntityType]:
+        raise NotImplementedError
+
+    @property
+    @abc.abstractmethod
+    def hospital_tables(self) -> tuple[str, ...]:
+        """The tables hospitals are paged from, in page order."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def iter_hospital_pages(
+        self,
+        page_size: int,
+        cursor: Optional[str] = None,
+        table: Optional[str] = None,
+    ) -> AsyncIterator[HospitalPageType]:
+        """Pages of the hospitals stored after the cursor, in a stable order.
+
+        Reads from the start without a cursor. With a table, only its
+        pages are read. Hospitals stored later are paged after the
+        cursors issued before. Raises InvalidExportCursorError for a
+        cursor it did not issue.
+        """
+        raise NotImplementedError
+
+
+def build_page_cursor(table: str, position: object) -> str:
+    """Cursor of a hospital by its table and position in it, e.g. `table:42`."""
+    return f"{table}:{position}"
+
+
+def parse_offset(position: str) -> int:
+    """The position of a cursor counting the hospitals before it."""
+    if (offset := int(position)) < 0:
+        raise ValueError(f"Negative offset: {offset}.")
+    return offset
+
+
+def parse_page_cursor(
+    cursor: Optional[str],
+    tables: Sequence[str],
+    parse_position: Callable[[str], PositionType],
+) -> tuple[int, Optional[PositionType]]:
+    """The index of the cursor's table and its position, (0, None) for no cursor."""
+    if not cursor:
+        return 0, None
+    table, _, position = cursor.rpartition(":")
+    if table not in tables:
+        raise InvalidExportCursorError(f"Invalid cursor: {cursor}.")
+    try:
+        return tables.index(table), parse_position(position)
+    except ValueError as e:
+        raise InvalidExportCursorError(f"Invalid cursor: {cursor}.") from e
+
+
+def parse_page_range(
+    cursor: Optional[str],
+    tables: Sequence[str],
+    parse_position: Callable[[str], PositionType],
+    table: Optional[str] = None,
+) -> tuple[Sequence[str], Optional[PositionType]]:
+    """The tables left to page and the cursor's position in the first.
+
+    With a table, only that table is paged, from the cursor when it
+    is one of its hospitals, else from its start.
+    """
+    table_no, position = parse_page_cursor(cursor, tables, parse_position)
+    if table is None:
+        return tables[table_no:], position
+    if table not in tables or (cursor and tables[table_no] != table):
+        raise InvalidExportCursorError(f"Invalid cursor for {table}: {cursor}.")
+    return (table,), position
+
+
+class InterfaceHospitalIndex(Protocol):
+    """An in-memory index kept alongside the registered hospitals."""
+
+    @abc.abstractmethod
+    def add(self, hospital_entry: HospitalEntityType) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def extend(self, hospital_entries: Iterable[HospitalEntityType]) -> None:
+        raise NotImplementedError
+
+
+class InterfaceHospitalSearchIndex(InterfaceHospitalIndex, Protocol):
+    """An index answering look ahead searches over registered hospitals."""
+
+    @abc.abstractmethod
+    def search(self, search_query: str, limit: int) -> list[HospitalEntityType]:
+        """Returns the best matching hospitals, best first."""
+        raise NotImplementedError
+
+
+class InterfaceHospitalGeoIndex(InterfaceHospitalIndex, Protocol):
+    """An index answering nearest hospital queries by geo location."""
+
+    @abc.abstractmethod
+    def nearest_many(
+        self,
+        points: Sequence[tuple[float, float]],
+        limit: int,
+        radius_km: float | None = None,
+    ) -> list[list[tuple[HospitalEntityType, float]]]:
+        """Returns per (latitude, longitude) point the nearest hospitals
+        with their distance in km, nearest first."""
+        raise NotImplementedError
+
+
 class InterfaceHospitalUOW(Protocol):
 
     hospital_repo: InterfaceHospitalRepo
@@ -60,3 +221,10 @@ class InterfaceHospitalUOW(Protocol):
     @abc.abstractmethod
     async def close(self) -> Literal[UOWSessionFlag.CLOSED]:
         raise NotImplementedError
+
+
+# ************************************************* #
+# A unit of work class, or any callable that builds a
+# fresh unit of work with its own repo per request.
+# ************************************************* #
+HospitalUOWFactory = Callable[[], InterfaceHospitalUOW]
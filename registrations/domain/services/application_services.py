@@ -1,9 +1,111 @@
 # Application Service
+from __future__ import annotations
+
 import abc
-from typing import Protocol, Type
+import asyncio
+import datetime
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Optional,
+    Protocol,
+    Sequence,
+    Type,
+    Union,
+)
+
+import phonenumbers
+import pydantic
+import ujson
 
+from registrations.domain import dto
 from registrations.domain.dto import ToHospitalRegistrationEntry
+from registrations.domain.repo.registration_repo import (
+    HospitalPageType,
+    InterfaceHospitalGeoIndex,
+    InterfaceHospitalIndex,
+    InterfaceHospitalReadRepo,
+    InterfaceHospitalSearchIndex,
+)
 from registrations.domain.services import hospital_registration_services
+from registrations.utils import log_utils, metrics
+from registrations.utils.errors import InvalidRegistrationEntryError
+
+APPLICATION_SERVICE_LOGGER = log_utils.get_logger(__name__)
+
+# Number of bulk registration lines held in memory and
+# written through a single unit of work.
+BULK_BATCH_SIZE = 100
+
+# Longest bulk registration line accepted; longer lines are invalid.
+BULK_MAX_LINE_BYTES = 64 * 1024
+
+# Number of hospitals read per page when loading the in-memory indexes.
+INDEX_LOAD_PAGE_SIZE = 1000
+
+# Number of look ahead search results returned by default.
+LOOKUP_SEARCH_LIMIT = 10
+
+# Number of nearby hospitals returned by default.
+NEARBY_LIMIT = 10
+
+# Number of hospitals an export reads from the repo per page.
+EXPORT_PAGE_SIZE = 1000
+
+# Number of pages an export reads ahead of the client it streams to.
+EXPORT_BUFFERED_PAGES = 4
+
+# Errors raised while parsing and building a registration entry.
+INVALID_ENTRY_ERRORS = (
+    pydantic.ValidationError,
+    InvalidRegistrationEntryError,
+    ValueError,
+    phonenumbers.NumberParseException,
+)
+
+# Registrations validated once per worker before it takes traffic, one
+# per invariant, so the validators and phone metadata are loaded then.
+WARMUP_REGISTRATIONS = (
+    {
+        "name": "Warmup Hospital",
+        "ownership_type": "private",
+        "hospital_contact_number": "+919425411234",
+        "verified_status": "verified",
+        "address": {
+            "street": "Rajaji marg",
+            "city": "Newark",
+            "state": "MP",
+            "country": "IN",
+        },
+    },
+    {
+        "name": "Warmup Hospital",
+        "ownership_type": "public",
+        "hospital_contact_number": "+919425411234",
+        "verified_status": "unverified",
+        "key_contact": {
+            "name": "Warmup Contact",
+            "mobile": "+919425411234",
+            "email": "warmup@example.com",
+        },
+        "address": {
+            "street": "Rajaji marg",
+            "city": "Newark",
+            "state": "MP",
+            "country": "IN",
+        },
+    },
+)
+
+EmailVerificationServiceType = Optional[
+    Type[hospital_registration_services.InterfaceEmailVerificationService]
+]
+BulkEntryType = Union[
+    hospital_registration_services.HospitalEntityType, dto.BulkRegistrationResult
+]
+NearbyHospitalType = tuple[hospital_registration_services.HospitalEntityType, float]
+# A page read ahead, the error that ended the read or None once done.
+BufferedPageType = Union[HospitalPageType, Exception, None]
 
 
 # ===================================================== #
@@ -15,12 +117,48 @@ class InterfaceLookAheadService(Protocol):
     @classmethod
     @abc.abstractmethod
     async def lookup_search(
-        cls, search_query: str
+        cls,
+        search_index: InterfaceHospitalSearchIndex,
+        search_query: str,
+        limit: int = LOOKUP_SEARCH_LIMIT,
     ) -> list[hospital_registration_services.HospitalEntityType]:
         """Returns a list of search results."""
         raise NotImplementedError
 
 
+class InterfaceGeoLookupService(Protocol):
+    """Nearby lookups of registered hospitals by geo location."""
+
+    @classmethod
+    @abc.abstractmethod
+    async def lookup_nearby(
+        cls,
+        geo_index: InterfaceHospitalGeoIndex,
+        latitude: float,
+        longitude: float,
+        limit: int = NEARBY_LIMIT,
+        radius_km: float | None = None,
+    ) -> list[NearbyHospitalType]:
+        """Returns the nearest hospitals with their distance in km."""
+        raise NotImplementedError
+
+
+class InterfaceExportService(Protocol):
+    """Export of every registered hospital."""
+
+    @classmethod
+    @abc.abstractmethod
+    def export_hospitals(
+        cls,
+        hospital_uow_async: hospital_registration_services.HospitalUOWFactory,
+        cursor: Optional[str] = None,
+        since: Optional[datetime.datetime] = None,
+        page_size: int = EXPORT_PAGE_SIZE,
+    ) -> AsyncIterator[list[dto.HospitalExportRow]]:
+        """Yields the registered hospitals after the cursor, page by page."""
+        raise NotImplementedError
+
+
 class InterfaceRegistrationService(Protocol):
     """Interface for registration service for hospitals."""
 
@@ -28,12 +166,65 @@ class InterfaceRegistrationService(Protocol):
     @abc.abstractmethod
     async def register_hospital(
         cls,
-        hospital_uow_async: Type[hospital_registration_services.InterfaceHospitalUOW],
+        hospital_uow_async: hospital_registration_services.HospitalUOWFactory,
         registration_entry: ToHospitalRegistrationEntry,
+        hospital_indexes: Sequence[InterfaceHospitalIndex] = (),
+        email_verification_service: EmailVerificationServiceType = None,
     ) -> ToHospitalRegistrationEntry:
         """Registers a hospital."""
         raise NotImplementedError
 
+    @classmethod
+    @abc.abstractmethod
+    def build_hospital_entry(
+        cls,
+        registration_entry: ToHospitalRegistrationEntry,
+        email_verification_service: EmailVerificationServiceType = None,
+    ) -> hospital_registration_services.HospitalEntityType:
+        """Validates a registration into its hospital entity."""
+        raise NotImplementedError
+
+    @classmethod
+    @abc.abstractmethod
+    async def persist_hospital_entry(
+        cls,
+        hospital_uow_async: hospital_registration_services.HospitalUOWFactory,
+        hospital_entry: hospital_registration_services.HospitalEntityType,
+        hospital_indexes: Sequence[InterfaceHospitalIndex] = (),
+    ) -> None:
+        """Stores a validated hospital entity."""
+        raise NotImplementedError
+
+    @classmethod
+    @abc.abstractmethod
+    def register_hospitals_bulk(
+        cls,
+        hospital_uow_async: hospital_registration_services.HospitalUOWFactory,
+        raw_entries: AsyncIterable[bytes],
+        batch_size: int = BULK_BATCH_SIZE,
+        hospital_indexes: Sequence[InterfaceHospitalIndex] = (),
+        email_verification_service: EmailVerificationServiceType = None,
+    ) -> AsyncIterator[dto.BulkRegistrationResult]:
+        """Registers hospitals from a stream of json lines."""
+        raise NotImplementedError
+
+    @classmethod
+    @abc.abstractmethod
+    async def load_hospital_indexes(
+        cls,
+        hospital_uow_async: hospital_registration_services.HospitalUOWFactory,
+        hospital_indexes: Sequence[InterfaceHospitalIndex],
+        cursors: Optional[dict[str, str]] = None,
+    ) -> None:
+        """Loads the hospitals registered after the cursors into the indexes."""
+        raise NotImplementedError
+
+    @classmethod
+    @abc.abstractmethod
+    def warmup(cls) -> None:
+        """Validates sample registrations, without storing them."""
+        raise NotImplementedError
+
 
 # Application Service for CRUD-like calls.
 class HospitalRegistrationApplicationService(InterfaceRegistrationService):
@@ -42,17 +233,348 @@ class HospitalRegistrationApplicationService(InterfaceRegistrationService):
     @classmethod
     async def register_hospital(
         cls,
-        hospital_uow_async: Type[hospital_registration_services.InterfaceHospitalUOW],
+        hospital_uow_async: hospital_registration_services.HospitalUOWFactory,
         registration_entry: ToHospitalRegistrationEntry,
+        hospital_indexes: Sequence[InterfaceHospitalIndex] = (),
+        email_verification_service: EmailVerificationServiceType = None,
     ) -> ToHospitalRegistrationEntry:
         """Registers a hospital."""
-        hospital_entry_dict = registration_entry.build_hospital_entity_dict()
-        # Most of the domain attributes will be validated by the pydantic library
-        # for the relevant entry via RegisterHospitalService.
-        hospital_entry = hospital_registration_services.RegisterHospitalService.build_hospital_factory(
-            **hospital_entry_dict
+        hospital_entry = cls.build_hospital_entry(
+            registration_entry, email_verification_service
+        )
+        await cls.persist_hospital_entry(
+            hospital_uow_async, hospital_entry, hospital_indexes
         )
+        return registration_entry
+
+    @classmethod
+    def build_hospital_entry(
+        cls,
+        registration_entry: ToHospitalRegistrationEntry,
+        email_verification_service: EmailVerificationServiceType = None,
+    ) -> hospital_registration_services.HospitalEntityType:
+        """Validates a registration into its hospital entity."""
+        with metrics.STAGE_LATENCY.time("validation"):
+            cls._verify_contact_email(registration_entry, email_verification_service)
+            hospital_entry_dict = registration_entry.build_hospital_entity_dict()
+            # Most of the domain attributes will be validated by the pydantic library
+            # for the relevant entry via RegisterHospitalService.
+            return hospital_registration_services.RegisterHospitalService.build_hospital_factory(
+                **hospital_entry_dict
+            )
+
+    @classmethod
+    async def persist_hospital_entry(
+        cls,
+        hospital_uow_async: hospital_registration_services.HospitalUOWFactory,
+        hospital_entry: hospital_registration_services.HospitalEntityType,
+        hospital_indexes: Sequence[InterfaceHospitalIndex] = (),
+    ) -> None:
+        """Stores a validated hospital entity and adds it to the indexes."""
         await hospital_registration_services.RegisterHospitalService.register_hospital(
             hospital_uow_async, hospital_entry
         )
-        return registration_entry
+        for hospital_index in hospital_indexes:
+            hospital_index.add(hospital_entry)
+
+    @classmethod
+    def warmup(cls) -> None:
+        """Validates sample registrations, without storing them.
+
+        The validation stage latency is not observed, so it only
+        reports registrations of clients.
+        """
+        for registration_dict in WARMUP_REGISTRATIONS:
+            registration_entry = ToHospitalRegistrationEntry(**registration_dict)
+            hospital_registration_services.RegisterHospitalService.build_hospital_factory(
+                **registration_entry.build_hospital_entity_dict()
+            )
+
+    @classmethod
+    async def register_hospitals_bulk(
+        cls,
+        hospital_uow_async: hospital_registration_services.HospitalUOWFactory,
+        raw_entries: AsyncIterable[bytes],
+        batch_size: int = BULK_BATCH_SIZE,
+        hospital_indexes: Sequence[InterfaceHospitalIndex] = (),
+        email_verification_service: EmailVerificationServiceType = None,
+    ) -> AsyncIterator[dto.BulkRegistrationResult]:
+        """Registers hospitals from a stream of json lines.
+
+        Each line is validated as it arrives. Valid entries are written
+        batch_size lines at a time through one unit of work, so memory
+        stays bounded by the batch whatever the size of the stream.
+        Yields one result per non blank line, in input order.
+        """
+        batch: list[tuple[int, BulkEntryType]] = []
+        async for line_no, raw_entry in cls._enumerate_lines(raw_entries):
+            batch.append(
+                (
+                    line_no,
+                    cls._build_bulk_entry(
+                        line_no, raw_entry, email_verification_service
+                    ),
+                )
+            )
+            if len(batch) >= batch_size:
+                for result in await cls._register_bulk_batch(
+                    hospital_uow_async, batch, hospital_indexes
+                ):
+                    yield result
+                batch = []
+        if batch:
+            for result in await cls._register_bulk_batch(
+                hospital_uow_async, batch, hospital_indexes
+            ):
+                yield result
+
+    @classmethod
+    async def load_hospital_indexes(
+        cls,
+        hospital_uow_async: hospital_registration_services.HospitalUOWFactory,
+        hospital_indexes: Sequence[InterfaceHospitalIndex],
+        cursors: Optional[dict[str, str]] = None,
+    ) -> None:
+        """Loads the hospitals registered after the cursors into the indexes.
+
+        Each table is read from its cursor, or from its start without
+        one, and its cursor is moved to the last hospital read, so
+        loading again with the same cursors only reads the hospitals
+        stored since. Each page read is indexed before the next, so
+        only a page is held besides the indexes. Repos that cannot
+        read back their hospitals leave them empty; they then fill up
+        with the hospitals registered from now on.
+        """
+        if not hospital_indexes:
+            return
+        hospital_uow = hospital_uow_async()
+        hospital_repo = hospital_uow.hospital_repo
+        if not isinstance(hospital_repo, InterfaceHospitalReadRepo):
+            APPLICATION_SERVICE_LOGGER.warning(
+                "%s cannot read back hospitals; the indexes start empty.",
+                type(hospital_repo).__name__,
+            )
+            return
+        cursors = {} if cursors is None else cursors
+        async with hospital_uow:
+            for table in hospital_repo.hospital_tables:
+                async for page in hospital_repo.iter_hospital_pages(
+                    INDEX_LOAD_PAGE_SIZE, cursors.get(table), table
+                ):
+                    hospital_entries = [hospital_entry for hospital_entry, _ in page]
+                    for hospital_index in hospital_indexes:
+                        hospital_index.extend(hospital_entries)
+                    cursors[table] = page[-1][1]
+
+    @staticmethod
+    async def _enumerate_lines(
+        raw_entries: AsyncIterable[bytes],
+    ) -> AsyncIterator[tuple[int, bytes]]:
+        """Yield numbered non blank lines; blank lines still count."""
+        line_no = 0
+        async for raw_entry in raw_entries:
+            line_no += 1
+            if raw_entry.strip():
+                yield line_no, raw_entry
+
+    @staticmethod
+    def _verify_contact_email(
+        registration_entry: ToHospitalRegistrationEntry,
+        email_verification_service: EmailVerificationServiceType,
+    ) -> None:
+        """Reject a key contact email whose domain is known not to take mail."""
+        key_contact = registration_entry.key_contact
+        if (
+            email_verification_service is not None
+            and key_contact is not None
+            and key_contact.email
+            and not email_verification_service.is_valid_domain(key_contact.email)
+        ):
+            raise InvalidRegistrationEntryError(
+                f"Email domain of {key_contact.email} does not accept mail."
+            )
+
+    @classmethod
+    def _build_bulk_entry(
+        cls,
+        line_no: int,
+        raw_entry: bytes,
+        email_verification_service: EmailVerificationServiceType = None,
+    ) -> BulkEntryType:
+        """Build the hospital entity of a line or its invalid result."""
+        if len(raw_entry) > BULK_MAX_LINE_BYTES:
+            return dto.BulkRegistrationResult(
+                line=line_no,
+                status=dto.BulkRegistrationStatus.Invalid,
+                error=f"Line is longer than {BULK_MAX_LINE_BYTES} bytes.",
+            )
+        try:
+            with metrics.STAGE_LATENCY.time("validation"):
+                registration_entry = ToHospitalRegistrationEntry.parse_obj(
+                    ujson.loads(raw_entry)
+                )
+                cls._verify_contact_email(
+                    registration_entry, email_verification_service
+                )
+                return hospital_registration_services.RegisterHospitalService.build_hospital_factory(
+                    **registration_entry.build_hospital_entity_dict()
+                )
+        except INVALID_ENTRY_ERRORS as e:
+            return dto.BulkRegistrationResult(
+                line=line_no,
+                status=dto.BulkRegistrationStatus.Invalid,
+                error=str(e),
+            )
+
+    @staticmethod
+    async def _register_bulk_batch(
+        hospital_uow_async: hospital_registration_services.HospitalUOWFactory,
+        batch: list[tuple[int, BulkEntryType]],
+        hospital_indexes: Sequence[InterfaceHospitalIndex] = (),
+    ) -> list[dto.BulkRegistrationResult]:
+        """Persist the valid entries of a batch and return all its results."""
+        hospital_entries = [
+            entry
+            for _, entry in batch
+            if not isinstance(entry, dto.BulkRegistrationResult)
+        ]
+        created_flags = iter(
+            await hospital_registration_services.RegisterHospitalService.register_hospitals_batch(
+                hospital_uow_async, hospital_entries
+            )
+            if hospital_entries
+            else []
+        )
+        results: list[dto.BulkRegistrationResult] = []
+        for line_no, entry in batch:
+            if isinstance(entry, dto.BulkRegistrationResult):
+                results.append(entry)
+                continue
+            is_created = next(created_flags)
+            if is_created:
+                for hospital_index in hospital_indexes:
+                    hospital_index.add(entry)
+            results.append(
+                dto.BulkRegistrationResult(
+                    line=line_no,
+                    status=(
+                        dto.BulkRegistrationStatus.Created
+                        if is_created
+                        else dto.BulkRegistrationStatus.Duplicate
+                    ),
+                    hospital_id=str(entry.hospital_id),
+                )
+            )
+        return results
+
+
+# Application Service for look ahead searches.
+class HospitalLookAheadApplicationService(InterfaceLookAheadService):
+    """Application service answering "is my hospital already listed?"."""
+
+    @classmethod
+    async def lookup_search(
+        cls,
+        search_index: InterfaceHospitalSearchIndex,
+        search_query: str,
+        limit: int = LOOKUP_SEARCH_LIMIT,
+    ) -> list[hospital_registration_services.HospitalEntityType]:
+        """Returns the registered hospitals best matching the query."""
+        return search_index.search(search_query, limit)
+
+
+# Application Service for nearby hospital lookups.
+class HospitalGeoApplicationService(InterfaceGeoLookupService):
+    """Application service answering "which hospitals are near me?"."""
+
+    @classmethod
+    async def lookup_nearby(
+        cls,
+        geo_index: InterfaceHospitalGeoIndex,
+        latitude: float,
+        longitude: float,
+        limit: int = NEARBY_LIMIT,
+        radius_km: float | None = None,
+    ) -> list[NearbyHospitalType]:
+        """Returns the nearest hospitals with their distance in km."""
+        return geo_index.nearest_many([(latitude, longitude)], limit, radius_km)[0]
+
+
+# Application Service for exports of the registered hospitals.
+class HospitalExportApplicationService(InterfaceExportService):
+    """Application service dumping the registered hospitals."""
+
+    @classmethod
+    async def export_hospitals(
+        cls,
+        hospital_uow_async: hospital_registration_services.HospitalUOWFactory,
+        cursor: Optional[str] = None,
+        since: Optional[datetime.datetime] = None,
+        page_size: int = EXPORT_PAGE_SIZE,
+        buffered_pages: int = EXPORT_BUFFERED_PAGES,
+    ) -> AsyncIterator[list[dto.HospitalExportRow]]:
+        """Yields the registered hospitals after the cursor, page by page.
+
+        Pages are read by a background task into a queue of
+        buffered_pages, so the repo is read while the previous pages
+        are sent, and memory stays bounded by the queue however many
+        hospitals there are. Only hospitals added since the given time
+        are yielded, each with the cursor resuming the export after it.
+        A page is yielded for every page read, empty when none of its
+        hospitals were added since, so the first comes without waiting
+        for the first match.
+        """
+        pages: asyncio.Queue[BufferedPageType] = asyncio.Queue(buffered_pages)
+        reader = asyncio.create_task(
+            cls._read_pages(hospital_uow_async, cursor, page_size, pages)
+        )
+        since = None if since is None else cls._as_aware(since)
+        try:
+            while (page := await pages.get()) is not None:
+                if isinstance(page, Exception):
+                    raise page
+                yield [
+                    dto.HospitalExportRow.from_hospital_entry(
+                        hospital_entry, entry_cursor
+                    )
+                    for hospital_entry, entry_cursor in page
+                    if since is None
+                    or cls._as_aware(hospital_entry.added_since) >= since
+                ]
+        finally:
+            reader.cancel()
+            # The unit of work of the reader is closed before returning.
+            await asyncio.gather(reader, return_exceptions=True)
+
+    @staticmethod
+    async def _read_pages(
+        hospital_uow_async: hospital_registration_services.HospitalUOWFactory,
+        cursor: Optional[str],
+        page_size: int,
+        pages: asyncio.Queue[BufferedPageType],
+    ) -> None:
+        """Put the pages read after the cursor, then None or the error.
+
+        Raises NotImplementedError to the export for repos that cannot
+        read back their hospitals, rather than export none.
+        """
+        try:
+            hospital_uow = hospital_uow_async()
+            hospital_repo = hospital_uow.hospital_repo
+            if not isinstance(hospital_repo, InterfaceHospitalReadRepo):
+                raise NotImplementedError(
+                    f"{type(hospital_repo).__name__} cannot read back hospitals."
+                )
+            async with hospital_uow:
+                async for page in hospital_repo.iter_hospital_pages(page_size, cursor):
+                    await pages.put(page)
+        except Exception as e:  # pylint: disable=broad-except
+            # Raised to the export, which is still waiting on the queue.
+            await pages.put(e)
+            return
+        await pages.put(None)
+
+    @staticmethod
+    def _as_aware(date_time: datetime.datetime) -> datetime.datetime:
+        """The time with a timezone, a naive time taken as local time."""
+        return date_time if date_time.tzinfo else date_time.astimezone()
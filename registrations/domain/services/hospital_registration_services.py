@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import abc
-from typing import Protocol, Type, TypeVar
+from typing import Protocol, Sequence, TypeVar
 
 import pydantic
 
@@ -12,7 +12,14 @@ from registrations.domain.hospital.registration import (
     UnclaimedHospital,
     UnverifiedRegisteredHospital,
 )
-from registrations.domain.repo.registration_repo import InterfaceHospitalUOW
+from registrations.domain.repo.registration_repo import (
+    HospitalUOWFactory,
+    InterfaceBulkHospitalRepo,
+    InterfaceEntityHospitalRepo,
+    InterfaceHospitalUOW,
+)
+from registrations.utils import metrics
+from registrations.utils.errors import RecordAlreadyExistsError
 
 # ************************************************* #
 # These are the infra, domain & application services
@@ -21,7 +28,10 @@ from registrations.domain.repo.registration_repo import InterfaceHospitalUOW
 # ************************************************* #
 
 # See: https://github.com/python/mypy/issues/5374#issuecomment-406218346
-IHUOW = TypeVar("IHUOW", bound=Type[InterfaceHospitalUOW])
+IHUOW = TypeVar("IHUOW", bound=HospitalUOWFactory)
+
+# Times a batch is written before a commit still finding a duplicate fails it.
+BATCH_COMMIT_ATTEMPTS = 3
 
 
 class InterfaceEmailVerificationService(Protocol):
@@ -83,20 +93,18 @@ class RegisterHospitalService:
     @classmethod
     async def register_unverified_hospital(
         cls,
-        hospital_uow_async: Type[InterfaceHospitalUOW],
+        hospital_uow_async: HospitalUOWFactory,
         unverified_hospital: UnverifiedRegisteredHospital,
     ) -> None:
         """Register hospital manually submitted but unverified."""
         async with hospital_uow_async() as uow_ctx:
-            await uow_ctx.hospital_repo.save_unverified_hospital(
-                **unverified_hospital.dict()
-            )
-            await uow_ctx.commit()
+            await cls._save_hospital(uow_ctx, unverified_hospital)
+            await cls._commit(uow_ctx)
 
     @classmethod
     async def register_unclaimed_hospital(
         cls,
-        hospital_uow_async: Type[InterfaceHospitalUOW],
+        hospital_uow_async: HospitalUOWFactory,
         unclaimed_hospital: UnclaimedHospital,
     ) -> None:
         """Register  imported hospital but unclaimed and unverified.
@@ -106,7 +114,81 @@ class RegisterHospitalService:
         Then HOSPITAL Verification happens async in the background.
         """
         async with hospital_uow_async() as uow_ctx:
-            await uow_ctx.hospital_repo.save_unclaimed_hospital(
-                **unclaimed_hospital.dict()
-            )
-            await uow_ctx.commit()
+            await cls._save_hospital(uow_ctx, unclaimed_hospital)
+            await cls._commit(uow_ctx)
+
+    @classmethod
+    async def register_hospitals_batch(
+        cls,
+        hospital_uow_async: HospitalUOWFactory,
+        hospital_entries: Sequence[HospitalEntityType],
+    ) -> list[bool]:
+        """Register a batch of hospitals in a single unit of work.
+
+        Duplicates are skipped without failing the rest of the batch.
+        If a racing writer stored one of them before the commit, the
+        batch is tried again, and that one then reports as a duplicate.
+
+        :return: list[bool], per entry whether it was created or a duplicate.
+        """
+        attempt = 1
+        while True:
+            try:
+                return await cls._register_hospitals_batch_once(
+                    hospital_uow_async, hospital_entries
+                )
+            except RecordAlreadyExistsError:
+                if attempt >= BATCH_COMMIT_ATTEMPTS:
+                    raise
+                attempt += 1
+
+    @classmethod
+    async def _register_hospitals_batch_once(
+        cls,
+        hospital_uow_async: HospitalUOWFactory,
+        hospital_entries: Sequence[HospitalEntityType],
+    ) -> list[bool]:
+        created_flags: list[bool] = []
+        async with hospital_uow_async() as uow_ctx:
+            if isinstance(uow_ctx.hospital_repo, InterfaceBulkHospitalRepo):
+                created_flags = await uow_ctx.hospital_repo.save_hospitals(
+                    hospital_entries
+                )
+                metrics.DUPLICATES.inc(amount=created_flags.count(False))
+                await cls._commit(uow_ctx)
+                return created_flags
+            for hospital_entry in hospital_entries:
+                try:
+                    await cls._save_hospital(uow_ctx, hospital_entry)
+                    created_flags.append(True)
+                except RecordAlreadyExistsError:
+                    created_flags.append(False)
+            await cls._commit(uow_ctx)
+        return created_flags
+
+    @staticmethod
+    async def _save_hospital(
+        uow_ctx: InterfaceHospitalUOW, hospital_entry: HospitalEntityType
+    ) -> None:
+        """Save the validated entity; repos taking its fields rebuild it."""
+        hospital_repo = uow_ctx.hospital_repo
+        try:
+            if isinstance(hospital_repo, InterfaceEntityHospitalRepo):
+                await hospital_repo.save_hospital(hospital_entry)
+            elif isinstance(hospital_entry, UnclaimedHospital):
+                await hospital_repo.save_unclaimed_hospital(**hospital_entry.dict())
+            else:
+                await hospital_repo.save_unverified_hospital(**hospital_entry.dict())
+        except RecordAlreadyExistsError:
+            metrics.DUPLICATES.inc()
+            raise
+
+    @staticmethod
+    async def _commit(uow_ctx: InterfaceHospitalUOW) -> None:
+        """Commit the unit of work; it may still find a duplicate."""
+        try:
+            with metrics.STAGE_LATENCY.time("uow_commit"):
+                await uow_ctx.commit()
+        except RecordAlreadyExistsError:
+            metrics.DUPLICATES.inc()
+            raise
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import asyncio
+import math
 import os.path
 
 import fastapi
@@ -8,14 +8,32 @@ import uvloop
 from fastapi import Request
 from fastapi.middleware.cors import CORSMiddleware
 
+from registrations.domain.hospital.registration import phone_number_cache
 from registrations.infrastructure.adapters.api import bootstrap
+from registrations.infrastructure.adapters.api.idempotency_middleware import (
+    IdempotencyMiddleware,
+)
+from registrations.infrastructure.adapters.api.metrics_middleware import (
+    MetricsMiddleware,
+)
+from registrations.infrastructure.adapters.api.profiler_middleware import (
+    ProfilerMiddleware,
+)
 from registrations.infrastructure.adapters.api.routers import (
+    export_hospital_router,
+    profiler_router,
     register_hospital_router,
+    search_hospital_router,
 )
+from registrations.utils import metrics
 from registrations.utils.errors import (
+    InvalidExportCursorError,
     InvalidRegistrationEntryError,
     RecordAlreadyExistsError,
+    RegistrationQueueFullError,
+    ServiceUnavailableError,
 )
+from registrations.utils.profiler import PROFILER
 
 LOCAL_PORT = os.getenv("LOCAL_PORT")
 
@@ -36,6 +54,7 @@ def build_cors_flight(app: fastapi.FastAPI) -> fastapi.FastAPI:
         "Content-Type",
         "Authorization",
         "Accept",
+        "Idempotency-Key",
     ]
     app.add_middleware(
         CORSMiddleware,
@@ -48,21 +67,69 @@ def build_cors_flight(app: fastapi.FastAPI) -> fastapi.FastAPI:
 
 app = fastapi.FastAPI(
     title="XCoV19 Registrations service.",
-    debug=True,
+    debug=os.getenv("ENV") == "test",
     description="""Hospital Registrations that
     registers healthcare data points, user registration.
     """,
+    default_response_class=fastapi.responses.UJSONResponse,
 )
 app.include_router(register_hospital_router.router)
+app.include_router(search_hospital_router.router)
+app.include_router(export_hospital_router.router)
 app = build_cors_flight(app)
+app.add_middleware(IdempotencyMiddleware, paths=("/register-hospital",))
+app.add_middleware(MetricsMiddleware)
+# Without an admin token the profiler is neither routed nor in the request path.
+if PROFILER.settings.admin_token is not None:
+    app.include_router(profiler_router.router, include_in_schema=False)
+    app.add_middleware(ProfilerMiddleware, profiler=PROFILER)
+
+metrics.PHONE_NUMBER_CACHE_LOOKUPS.set_function(
+    lambda: {("hit",): phone_number_cache.hits, ("miss",): phone_number_cache.misses}
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def render_metrics() -> fastapi.responses.PlainTextResponse:
+    """Metrics of this worker in the Prometheus text exposition format."""
+    return fastapi.responses.PlainTextResponse(
+        metrics.REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@app.get("/health", include_in_schema=False)
+async def health() -> dict[str, object]:
+    """Status of this worker and of its repo backend."""
+    return bootstrap.bootstrapper.health()
+
+
+@app.get("/health/live", include_in_schema=False)
+async def liveness() -> dict[str, object]:
+    """Answers as long as the event loop of this worker does."""
+    return {"status": "ok"}
+
+
+@app.get("/health/ready", include_in_schema=False)
+async def readiness() -> fastapi.responses.UJSONResponse:
+    """200 once this worker is warmed up, 503 before and while it drains."""
+    readiness_report = bootstrap.bootstrapper.readiness()
+    return fastapi.responses.UJSONResponse(
+        readiness_report,
+        status_code=(
+            fastapi.status.HTTP_200_OK
+            if readiness_report["ready"]
+            else fastapi.status.HTTP_503_SERVICE_UNAVAILABLE
+        ),
+    )
 
 
 # ============================ #
 # Set event handlers.
 # ============================ #
 @app.on_event("startup")
-def startup() -> None:
-    bootstrap.bootstrapper.run()
+async def startup() -> None:
+    await bootstrap.bootstrapper.run()
 
 
 @app.on_event("shutdown")
@@ -84,6 +151,17 @@ async def invalid_entry_exception_handler(
     )
 
 
+@app.exception_handler(InvalidExportCursorError)
+async def invalid_cursor_exception_handler(
+    _request: Request,
+    exc: InvalidExportCursorError,
+) -> fastapi.responses.JSONResponse:
+    return fastapi.responses.JSONResponse(
+        status_code=fastapi.status.HTTP_400_BAD_REQUEST,
+        content={"message": f"{exc}"},
+    )
+
+
 @app.exception_handler(phonenumbers.phonenumberutil.NumberParseException)
 async def invalid_phone_number_exception_handler(
     _request: Request,
@@ -106,15 +184,33 @@ async def record_exception_handler(
     )
 
 
+@app.exception_handler(RegistrationQueueFullError)
+async def queue_full_exception_handler(
+    _request: Request,
+    exc: RegistrationQueueFullError,
+) -> fastapi.responses.JSONResponse:
+    return fastapi.responses.JSONResponse(
+        status_code=fastapi.status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"message": f"{exc}"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(ServiceUnavailableError)
+async def service_unavailable_exception_handler(
+    _request: Request,
+    exc: ServiceUnavailableError,
+) -> fastapi.responses.JSONResponse:
+    return fastapi.responses.JSONResponse(
+        status_code=fastapi.status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"message": f"{exc}"},
+        headers={"Retry-After": str(math.ceil(exc.retry_after_seconds))},
+    )
+
+
 uvloop.install()
 
 if __name__ == "__main__":
-    from hypercorn.asyncio import serve
-    from hypercorn.config import Config
-
-    config = Config()
-    config.bind = [f"0.0.0.0:{LOCAL_PORT}"]
-    config_toml_file = os.path.join(os.path.dirname(__file__), "config.toml")
-    if os.path.exists(config_toml_file):
-        config.from_toml("config.toml")
-    asyncio.run(serve(app, config))  # type: ignore[arg-type]
+    from registrations.infrastructure.adapters.api import launcher
+
+    launcher.main()
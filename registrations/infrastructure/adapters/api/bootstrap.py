@@ -2,18 +2,35 @@
 import os
 
 from registrations.domain.services.application_services import (
+    HospitalExportApplicationService,
+    HospitalGeoApplicationService,
+    HospitalLookAheadApplicationService,
     HospitalRegistrationApplicationService,
 )
 from registrations.infrastructure.adapters.api.di_builder import (
     BootStrapDI,
     DIMapping,
+    HospitalIndexRefreshSettings,
 )
-from registrations.infrastructure.adapters.repos.dummy.repo import (
-    DummyHospitalUOWAsyncImpl,
+from registrations.infrastructure.adapters.repos import registry
+from registrations.infrastructure.adapters.search.geo_index import GeoHospitalIndex
+from registrations.infrastructure.adapters.search.memory_index import (
+    InMemoryHospitalSearchIndex,
 )
-from registrations.infrastructure.adapters.repos.postgres_m3o.repo import (
-    M3OHospitalUOWAsyncImpl,
+from registrations.infrastructure.services.email_verification import (
+    EmailDomainVerificationService,
 )
+from registrations.infrastructure.services.registration_queue import (
+    RegistrationQueue,
+    RegistrationQueueSettings,
+)
+
+
+def repo_backend_name() -> str:
+    """The REPO_BACKEND the API runs with; tests always run in memory."""
+    if not (env := os.getenv("ENV")):
+        raise ValueError("ENV environment variable not set.")
+    return "memory" if env == "test" else os.getenv("REPO_BACKEND") or "m3o"
 
 
 def get_mapping_di() -> DIMapping:
@@ -21,13 +38,38 @@ def get_mapping_di() -> DIMapping:
     if not (env := os.getenv("ENV")):
         raise ValueError("ENV environment variable not set.")
     if env != "test":
+        # Only the selected repo backend is imported, see registry.
+        hospital_uow_factory = registry.load_backend(repo_backend_name())
+        registration_queue_settings = RegistrationQueueSettings()
+        registration_queue = (
+            RegistrationQueue(
+                HospitalRegistrationApplicationService, registration_queue_settings
+            )
+            if registration_queue_settings.enabled
+            else None
+        )
         return DIMapping(
-            hospital_uow_async=M3OHospitalUOWAsyncImpl,
+            hospital_uow_async=hospital_uow_factory(),
             hospital_registration_application_service=HospitalRegistrationApplicationService,
+            hospital_lookahead_application_service=HospitalLookAheadApplicationService,
+            hospital_search_index=InMemoryHospitalSearchIndex(),
+            hospital_geo_application_service=HospitalGeoApplicationService,
+            hospital_geo_index=GeoHospitalIndex(),
+            email_verification_service=EmailDomainVerificationService,
+            hospital_registration_queue=registration_queue,
+            hospital_export_application_service=HospitalExportApplicationService,
+            hospital_index_refresh_seconds=(
+                HospitalIndexRefreshSettings().interval_seconds
+            ),
         )
     return DIMapping(
-        hospital_uow_async=DummyHospitalUOWAsyncImpl,
+        hospital_uow_async=registry.load_backend("memory")(),
         hospital_registration_application_service=HospitalRegistrationApplicationService,
+        hospital_lookahead_application_service=HospitalLookAheadApplicationService,
+        hospital_search_index=InMemoryHospitalSearchIndex(),
+        hospital_geo_application_service=HospitalGeoApplicationService,
+        hospital_geo_index=GeoHospitalIndex(),
+        hospital_export_application_service=HospitalExportApplicationService,
     )
 
 
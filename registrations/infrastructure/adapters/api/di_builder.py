@@ -1,19 +1,96 @@
 """Dependency injection builder for dependencies to run API."""
 from __future__ import annotations
 
+import asyncio
+import contextlib
 from typing import Optional, Protocol, Type, runtime_checkable
 
-from registrations.domain.repo.registration_repo import InterfaceHospitalUOW
+import pydantic
+
+from registrations.domain.repo.registration_repo import (
+    HospitalUOWFactory,
+    InterfaceHospitalGeoIndex,
+    InterfaceHospitalIndex,
+    InterfaceHospitalSearchIndex,
+)
 from registrations.domain.services.application_services import (
+    InterfaceExportService,
+    InterfaceGeoLookupService,
+    InterfaceLookAheadService,
     InterfaceRegistrationService,
 )
+from registrations.domain.services.hospital_registration_services import (
+    InterfaceEmailVerificationService,
+)
+from registrations.infrastructure.services.registration_queue import (
+    RegistrationQueue,
+)
+from registrations.utils import log_utils, metrics
+
+DI_BUILDER_LOGGER = log_utils.get_logger(__name__)
+
+
+class HospitalIndexRefreshSettings(
+    pydantic.BaseSettings, env_prefix="HOSPITAL_INDEX_REFRESH_"
+):
+    """How often a worker loads the hospitals other workers registered.
+
+    Every interval_seconds the search and geo indexes are extended
+    with the hospitals stored after the last ones loaded, so workers
+    answer alike within an interval. Zero turns the refresh off.
+    """
+
+    interval_seconds: pydantic.confloat(ge=0) = 30  # type: ignore[valid-type]
 
 
 @runtime_checkable
 class InterfaceDIMapping(Protocol):
 
-    hospital_uow_async: Type[InterfaceHospitalUOW]
+    hospital_uow_async: HospitalUOWFactory
     hospital_registration_application_service: Type[InterfaceRegistrationService]
+    hospital_lookahead_application_service: Optional[Type[InterfaceLookAheadService]]
+    hospital_search_index: Optional[InterfaceHospitalSearchIndex]
+    hospital_geo_application_service: Optional[Type[InterfaceGeoLookupService]]
+    hospital_geo_index: Optional[InterfaceHospitalGeoIndex]
+    email_verification_service: Optional[Type[InterfaceEmailVerificationService]]
+    hospital_registration_queue: Optional[RegistrationQueue]
+    hospital_export_application_service: Optional[Type[InterfaceExportService]]
+    hospital_index_refresh_seconds: Optional[float]
+
+
+@runtime_checkable
+class InterfaceManagedUOWFactory(Protocol):
+    """A unit of work factory owning shared resources, e.g. a connection pool."""
+
+    async def startup(self) -> None:
+        ...
+
+    async def shutdown(self) -> None:
+        ...
+
+
+@runtime_checkable
+class InterfacePooledUOWFactory(Protocol):
+    """A unit of work factory reporting the usage of its connection pool."""
+
+    def pool_stats(self) -> dict[str, int]:
+        ...
+
+
+@runtime_checkable
+class InterfaceDrainingUOWFactory(Protocol):
+    """A unit of work factory letting its open units of work finish on shutdown."""
+
+    async def drain(self) -> None:
+        ...
+
+
+@runtime_checkable
+class InterfaceHealthReportingUOWFactory(Protocol):
+    """A unit of work factory reporting whether its backend takes calls."""
+
+    def health(self) -> dict[str, object]:
+        ...
 
 
 class DIMapping(InterfaceDIMapping):
@@ -26,31 +103,156 @@ class DIMapping(InterfaceDIMapping):
 
     def __init__(
         self,
-        hospital_uow_async: Type[InterfaceHospitalUOW],
+        hospital_uow_async: HospitalUOWFactory,
         hospital_registration_application_service: Type[InterfaceRegistrationService],
+        hospital_lookahead_application_service: Optional[
+            Type[InterfaceLookAheadService]
+        ] = None,
+        hospital_search_index: Optional[InterfaceHospitalSearchIndex] = None,
+        hospital_geo_application_service: Optional[
+            Type[InterfaceGeoLookupService]
+        ] = None,
+        hospital_geo_index: Optional[InterfaceHospitalGeoIndex] = None,
+        email_verification_service: Optional[
+            Type[InterfaceEmailVerificationService]
+        ] = None,
+        hospital_registration_queue: Optional[RegistrationQueue] = None,
+        hospital_export_application_service: Optional[
+            Type[InterfaceExportService]
+        ] = None,
+        hospital_index_refresh_seconds: Optional[float] = None,
     ):
 
         self.hospital_uow_async = hospital_uow_async
         self.hospital_registration_application_service = (
             hospital_registration_application_service
         )
+        self.hospital_lookahead_application_service = (
+            hospital_lookahead_application_service
+        )
+        self.hospital_search_index = hospital_search_index
+        self.hospital_geo_application_service = hospital_geo_application_service
+        self.hospital_geo_index = hospital_geo_index
+        self.email_verification_service = email_verification_service
+        self.hospital_registration_queue = hospital_registration_queue
+        self.hospital_export_application_service = hospital_export_application_service
+        self.hospital_index_refresh_seconds = hospital_index_refresh_seconds
 
 
 class BootStrapDI:
     """A DI wrapper service specific to fastapi."""
 
     def __init__(self, mapping_di: DIMapping):
-        self.uow: Optional[Type[InterfaceHospitalUOW]] = mapping_di.hospital_uow_async
+        self.uow: Optional[HospitalUOWFactory] = mapping_di.hospital_uow_async
         # HospitalRegistrationApplicationService
         self.registration_service = mapping_di.hospital_registration_application_service
+        # HospitalLookAheadApplicationService
+        self.lookahead_service = mapping_di.hospital_lookahead_application_service
+        self.search_index = mapping_di.hospital_search_index
+        # HospitalGeoApplicationService
+        self.geo_service = mapping_di.hospital_geo_application_service
+        self.geo_index = mapping_di.hospital_geo_index
+        # EmailDomainVerificationService
+        self.email_verification_service = mapping_di.email_verification_service
+        # Stores registrations in the background when set.
+        self.registration_queue = mapping_di.hospital_registration_queue
+        # HospitalExportApplicationService
+        self.export_service = mapping_di.hospital_export_application_service
+        # Indexes are refreshed from the cursors of the last hospitals loaded.
+        self.index_refresh_seconds = mapping_di.hospital_index_refresh_seconds
+        self.index_cursors: dict[str, str] = {}
+        self.__index_refresh: Optional[asyncio.Task[None]] = None
+        # Ready once warmed up, until the worker starts draining.
+        self.ready = False
+        self.draining = False
 
-    def run(self) -> None:
-        # TODO: wrap a singleton around self.uow class
-        #  so it doesn't have to start up every time.
-        ...
+    @property
+    def hospital_indexes(self) -> tuple[InterfaceHospitalIndex, ...]:
+        """The in-memory indexes kept alongside the registered hospitals."""
+        return tuple(
+            hospital_index
+            for hospital_index in (self.search_index, self.geo_index)
+            if hospital_index is not None
+        )
+
+    def health(self) -> dict[str, object]:
+        """Status of the worker, degraded while its repo backend is failing."""
+        repo_health: dict[str, object] = {}
+        if isinstance(self.uow, InterfaceHealthReportingUOWFactory):
+            repo_health = self.uow.health()
+        return {
+            "status": repo_health.get("status", "ok"),
+            "repo": repo_health,
+        }
+
+    def readiness(self) -> dict[str, object]:
+        """Whether the worker should be sent traffic."""
+        if self.draining:
+            return {"status": "draining", "ready": False}
+        if not self.ready:
+            return {"status": "starting", "ready": False}
+        return {"status": "ok", "ready": True}
+
+    def begin_drain(self) -> None:
+        """Report not ready, so load balancers stop sending traffic."""
+        self.draining = True
+
+    async def run(self) -> None:
+        """Start shared resources of consumed services once per worker.
+
+        The validators are warmed up last, then the worker is ready.
+        """
+        if isinstance(self.uow, InterfaceManagedUOWFactory):
+            await self.uow.startup()
+        if isinstance(self.uow, InterfacePooledUOWFactory):
+            pooled_uow = self.uow
+            metrics.POOL_CONNECTIONS.set_function(
+                lambda: {
+                    (state,): connections
+                    for state, connections in pooled_uow.pool_stats().items()
+                }
+            )
+        if self.uow is not None:
+            await self.registration_service.load_hospital_indexes(
+                self.uow, self.hospital_indexes, self.index_cursors
+            )
+            if self.index_refresh_seconds and self.hospital_indexes:
+                self.__index_refresh = asyncio.create_task(
+                    self.__refresh_hospital_indexes(self.index_refresh_seconds),
+                    name="hospital-index-refresh",
+                )
+            if self.registration_queue is not None:
+                await self.registration_queue.start(self.uow, self.hospital_indexes)
+        self.registration_service.warmup()
+        self.ready, self.draining = True, False
 
     async def shutdown(self) -> None:
         """Shutdown consumed services."""
+        self.begin_drain()
+        if self.__index_refresh is not None:
+            self.__index_refresh.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.__index_refresh
+            self.__index_refresh = None
+        if self.registration_queue is not None:
+            # Accepted registrations are stored before the repo goes away.
+            await self.registration_queue.drain()
         if self.uow is not None:
+            if isinstance(self.uow, InterfaceDrainingUOWFactory):
+                await self.uow.drain()
             await self.uow().close()
+            if isinstance(self.uow, InterfaceManagedUOWFactory):
+                await self.uow.shutdown()
             self.uow = None
+
+    async def __refresh_hospital_indexes(self, interval_seconds: float) -> None:
+        """Load the hospitals stored since the last load, every interval."""
+        while self.uow is not None:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.registration_service.load_hospital_indexes(
+                    self.uow, self.hospital_indexes, self.index_cursors
+                )
+            except Exception as e:  # pylint: disable=broad-except
+                # The next interval retries from the same cursors.
+                DI_BUILDER_LOGGER.error("Could not refresh hospital indexes: %s", e)
@@ -0,0 +1,262 @@
+"""ASGI middleware replaying the response of a retried POST.
+
+A client sends the same Idempotency-Key header with each retry of a
+request. The first response is stored and replayed to the retries,
+which then neither validate again nor reach the repo. Retries sent
+while the first request is still handled wait for its response.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import hashlib
+import time
+import urllib.parse
+from typing import NamedTuple, Optional, Sequence
+
+import pydantic
+import ujson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from registrations.utils import metrics
+
+IDEMPOTENCY_KEY_HEADER = b"idempotency-key"
+
+IDEMPOTENT_REQUESTS = metrics.Counter(
+    "registrations_idempotent_requests_total",
+    "Requests with an Idempotency-Key by result: stored, replayed, coalesced"
+    " or mismatched.",
+    ("result",),
+)
+
+
+class IdempotencySettings(pydantic.BaseSettings, env_prefix="IDEMPOTENCY_"):
+    """Settings of stored responses, e.g. IDEMPOTENCY_TTL_SECONDS=3600."""
+
+    ttl_seconds: pydantic.PositiveFloat = 24 * 60 * 60
+    cache_size: pydantic.PositiveInt = 10_000
+    max_key_length: pydantic.PositiveInt = 255
+
+
+class StoredResponse(NamedTuple):
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+class IdempotentResponseCache:
+    """Bounded cache of responses by key, each expiring after the ttl.
+
+    A key is stored with a fingerprint of its request, so the key of
+    one request is not replayed to a different one.
+    """
+
+    def __init__(self, ttl_seconds: float, maxsize: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self.__responses: collections.OrderedDict[
+            str, tuple[str, StoredResponse, float]
+        ] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__responses)
+
+    def get(self, key: str) -> Optional[tuple[str, StoredResponse]]:
+        """The fingerprint and response of the key, None when unknown or expired."""
+        if (cached := self.__responses.get(key)) is None:
+            return None
+        fingerprint, response, expires_at = cached
+        if expires_at <= time.monotonic():
+            del self.__responses[key]
+            return None
+        self.__responses.move_to_end(key)
+        return fingerprint, response
+
+    def put(self, key: str, fingerprint: str, response: StoredResponse) -> None:
+        self.__responses[key] = (
+            fingerprint,
+            response,
+            time.monotonic() + self.ttl_seconds,
+        )
+        self.__responses.move_to_end(key)
+        if len(self.__responses) > self.maxsize:
+            self.__responses.popitem(last=False)
+
+    def clear(self) -> None:
+        self.__responses.clear()
+
+
+class IdempotencyMiddleware:
+    """Stores and replays responses to POSTs with an Idempotency-Key.
+
+    Responses below 500 are stored, as a retry would get the same one.
+    Server errors are not, so a retry can still succeed. A key reused
+    with a different method, path, query or body is rejected with 422.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        paths: Sequence[str],
+        settings: IdempotencySettings | None = None,
+    ) -> None:
+        self.app = app
+        self.paths = frozenset(paths)
+        self.settings = settings or IdempotencySettings()
+        self.cache = IdempotentResponseCache(
+            self.settings.ttl_seconds, self.settings.cache_size
+        )
+        self.__in_flight: dict[
+            str, tuple[str, asyncio.Future[Optional[StoredResponse]]]
+        ] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+            or (idempotency_key := self.__idempotency_key(scope)) is None
+        ):
+            await self.app(scope, receive, send)
+            return
+        if len(idempotency_key) > self.settings.max_key_length:
+            await self.__send_error(send, 400, "Idempotency-Key is too long.")
+            return
+        body = await self.__read_body(receive)
+        fingerprint = self.__fingerprint(scope, body)
+        key = f"{scope['path']} {idempotency_key}"
+        while True:
+            if (cached := self.cache.get(key)) is not None:
+                await self.__replay(send, fingerprint, *cached, result="replayed")
+                return
+            if (in_flight := self.__in_flight.get(key)) is None:
+                break
+            in_flight_fingerprint, in_flight_response = in_flight
+            response = await asyncio.shield(in_flight_response)
+            if response is not None:
+                await self.__replay(
+                    send,
+                    fingerprint,
+                    in_flight_fingerprint,
+                    response,
+                    result="coalesced",
+                )
+                return
+            # The first request raised; this one is handled afresh.
+        await self.__handle(scope, receive, send, key, fingerprint, body)
+
+    async def __handle(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        key: str,
+        fingerprint: str,
+        body: bytes,
+    ) -> None:
+        in_flight_response: asyncio.Future[
+            Optional[StoredResponse]
+        ] = asyncio.get_running_loop().create_future()
+        self.__in_flight[key] = (fingerprint, in_flight_response)
+        response_start: Message = {}
+        response_body = bytearray()
+
+        body_messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive_body() -> Message:
+            # The body read up front, then a disconnect when it comes.
+            return body_messages.pop() if body_messages else await receive()
+
+        async def send_and_record(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_start.update(message)
+            elif message["type"] == "http.response.body":
+                response_body.extend(message.get("body", b""))
+            await send(message)
+
+        response: Optional[StoredResponse] = None
+        try:
+            await self.app(scope, receive_body, send_and_record)
+            response = StoredResponse(
+                response_start["status"],
+                list(response_start.get("headers", [])),
+                bytes(response_body),
+            )
+            if response.status < 500:
+                self.cache.put(key, fingerprint, response)
+                IDEMPOTENT_REQUESTS.inc("stored")
+        finally:
+            del self.__in_flight[key]
+            in_flight_response.set_result(response)
+
+    async def __replay(
+        self,
+        send: Send,
+        fingerprint: str,
+        stored_fingerprint: str,
+        response: StoredResponse,
+        result: str,
+    ) -> None:
+        if fingerprint != stored_fingerprint:
+            IDEMPOTENT_REQUESTS.inc("mismatched")
+            await self.__send_error(
+                send, 422, "Idempotency-Key was used for a different request."
+            )
+            return
+        IDEMPOTENT_REQUESTS.inc(result)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status,
+                "headers": [*response.headers, (b"idempotent-replayed", b"true")],
+            }
+        )
+        await send({"type": "http.response.body", "body": response.body})
+
+    @staticmethod
+    def __fingerprint(scope: Scope, body: bytes) -> str:
+        """Hash of the request, its query parameters in any order."""
+        query = urllib.parse.urlencode(
+            sorted(
+                urllib.parse.parse_qsl(
+                    scope["query_string"].decode("latin-1"), keep_blank_values=True
+                )
+            )
+        )
+        request_hash = hashlib.sha256(
+            f"{scope['method']} {scope['path']}?{query}\n".encode()
+        )
+        request_hash.update(body)
+        return request_hash.hexdigest()
+
+    @staticmethod
+    def __idempotency_key(scope: Scope) -> Optional[str]:
+        for header, value in scope["headers"]:
+            if header == IDEMPOTENCY_KEY_HEADER:
+                return value.decode("latin-1")
+        return None
+
+    @staticmethod
+    async def __read_body(receive: Receive) -> bytes:
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            body.extend(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        return bytes(body)
+
+    @staticmethod
+    async def __send_error(send: Send, status: int, error_msg: str) -> None:
+        body = ujson.dumps({"message": error_msg}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
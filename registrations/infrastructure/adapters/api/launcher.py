@@ -0,0 +1,278 @@
+"""Serve the api from one or more worker processes.
+
+    SERVER_WORKERS=4 python -m registrations.infrastructure.adapters.api.launcher
+
+One worker runs unless more are asked for. Several workers are only
+run on a repo backend they share, see registry.SHARED_REPO_BACKENDS;
+in memory each worker would keep its own store of hospitals. An
+authoritative M3O dedup index needs a single writer, so one worker,
+and so do queue tickets, which only the issuing worker knows.
+
+The master binds the sockets and imports the app, then forks the
+workers, which share both. Each worker warms up in its startup, see
+BootStrapDI.run, and only then listens, so no request waits on a cold
+worker.
+
+On SIGTERM or SIGINT, the workers answer 503 at /health/ready for
+drain_delay_seconds while they keep serving, so load balancers stop
+sending them traffic. Then they stop accepting, give in-flight requests
+graceful_timeout_seconds, and drain the registration queue and the open
+units of work in their shutdown. A worker exiting on its own is
+replaced.
+
+Hypercorn options not set here, e.g. the access log, are read from a
+config.toml next to this module when there is one.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import time
+from functools import partial
+from multiprocessing.process import BaseProcess
+from multiprocessing.synchronize import Event as EventType
+from typing import Any, Callable, Optional
+
+import pydantic
+from hypercorn.asyncio.run import worker_serve
+from hypercorn.config import Config, Sockets
+from hypercorn.utils import load_application
+
+from registrations.infrastructure.adapters.api import bootstrap
+from registrations.infrastructure.adapters.repos import registry
+from registrations.infrastructure.adapters.repos.postgres_m3o import dedup_index
+from registrations.infrastructure.services.registration_queue import (
+    RegistrationQueueSettings,
+)
+from registrations.utils import log_utils
+
+LAUNCHER_LOGGER = log_utils.get_logger(__name__)
+
+APPLICATION_PATH = "registrations.infrastructure.adapters.api.app:app"
+CONFIG_TOML_FILE = os.path.join(os.path.dirname(__file__), "config.toml")
+
+# How often workers and the master check for a shutdown.
+POLL_INTERVAL_SECONDS = 0.1
+
+
+class LauncherSettings(pydantic.BaseSettings, env_prefix="SERVER_"):
+    """Settings of the launcher, e.g. SERVER_WORKERS=4.
+
+    Without workers, one worker runs, or with workers_per_core that
+    many per CPU core, at most max_workers.
+    """
+
+    bind: str = f"0.0.0.0:{os.getenv('LOCAL_PORT') or 8080}"
+    workers: Optional[pydantic.conint(gt=0)] = None  # type: ignore[valid-type]
+    workers_per_core: Optional[pydantic.PositiveFloat] = None
+    max_workers: Optional[pydantic.conint(gt=0)] = None  # type: ignore[valid-type]
+    preload: bool = True
+    drain_delay_seconds: pydantic.confloat(ge=0) = 5  # type: ignore[valid-type]
+    graceful_timeout_seconds: pydantic.confloat(ge=0) = 30  # type: ignore[valid-type]
+
+
+def worker_count(settings: LauncherSettings, cpu_count: Optional[int] = None) -> int:
+    if settings.workers is not None:
+        return settings.workers
+    if settings.workers_per_core is None:
+        return 1
+    cpu_count = cpu_count or os.cpu_count() or 1
+    workers = max(1, math.floor(cpu_count * settings.workers_per_core))
+    if settings.max_workers is not None:
+        workers = min(workers, settings.max_workers)
+    return workers
+
+
+def check_shared_backend(workers: int, repo_backend: str) -> None:
+    """Raise ValueError for several workers on state they do not share."""
+    if workers > 1 and repo_backend not in registry.SHARED_REPO_BACKENDS:
+        raise ValueError(
+            f"REPO_BACKEND={repo_backend} is not shared between workers, "
+            f"run one worker rather than {workers}."
+        )
+    if (
+        workers > 1
+        and repo_backend == "m3o"
+        and dedup_index.M3ODedupSettings().authoritative
+    ):
+        raise ValueError(
+            "M3O_DEDUP_AUTHORITATIVE needs a single writer, "
+            f"run one worker rather than {workers}."
+        )
+    if workers > 1 and RegistrationQueueSettings().enabled:
+        raise ValueError(
+            "REGISTRATION_QUEUE_ENABLED tickets are kept by the worker issuing "
+            f"them, run one worker rather than {workers}."
+        )
+
+
+def build_config(settings: LauncherSettings) -> Config:
+    config = (
+        Config.from_toml(CONFIG_TOML_FILE)
+        if os.path.exists(CONFIG_TOML_FILE)
+        else Config()
+    )
+    config.application_path = APPLICATION_PATH
+    config.bind = [settings.bind]
+    config.workers = worker_count(settings)
+    config.graceful_timeout = settings.graceful_timeout_seconds
+    return config
+
+
+async def wait_for_shutdown(
+    drain_event: EventType, shutdown_event: EventType, master_pid: int
+) -> None:
+    """Return once the master shuts the workers down, or is gone.
+
+    The worker reports not ready from the drain until then.
+    """
+    while not shutdown_event.is_set() and os.getppid() == master_pid:
+        if drain_event.is_set() and not bootstrap.bootstrapper.draining:
+            bootstrap.bootstrapper.begin_drain()
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+
+def run_worker(
+    config: Config,
+    sockets: Sockets,
+    drain_event: EventType,
+    shutdown_event: EventType,
+    master_pid: int,
+) -> None:
+    # Only the master handles signals; workers follow its events.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    # Importing the app installs uvloop as the event loop policy.
+    app = load_application(config.application_path)
+    try:
+        asyncio.run(
+            worker_serve(
+                app,
+                config,
+                sockets=sockets,
+                shutdown_trigger=partial(
+                    wait_for_shutdown, drain_event, shutdown_event, master_pid
+                ),
+            )
+        )
+    finally:
+        # A forked worker exits without running atexit, so the records
+        # logged while it shut down are written here.
+        log_utils.flush()
+
+
+def serve(settings: LauncherSettings | None = None) -> None:
+    """Run the workers until they are drained after SIGTERM or SIGINT."""
+    settings = settings or LauncherSettings()
+    config = build_config(settings)
+    check_shared_backend(config.workers, bootstrap.repo_backend_name())
+    # Forked workers share the modules the master imported.
+    context = multiprocessing.get_context(
+        "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+    )
+    if settings.preload:
+        load_application(config.application_path)
+    sockets = config.create_sockets()
+    drain_event, shutdown_event = context.Event(), context.Event()
+    start_worker: Callable[[], BaseProcess] = partial(
+        _start_worker,
+        context,
+        config,
+        sockets,
+        drain_event,
+        shutdown_event,
+    )
+
+    def drain(*_: Any) -> None:
+        drain_event.set()
+
+    signal.signal(signal.SIGINT, drain)
+    signal.signal(signal.SIGTERM, drain)
+    LAUNCHER_LOGGER.info(
+        "Starting %d workers on %s.", config.workers, ", ".join(config.bind)
+    )
+    workers = [start_worker() for _ in range(config.workers)]
+    try:
+        _supervise(workers, start_worker, settings, config, drain_event, shutdown_event)
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                LAUNCHER_LOGGER.error("Terminating worker %s.", worker.pid)
+                worker.terminate()
+            worker.join()
+        for sock in (*sockets.secure_sockets, *sockets.insecure_sockets):
+            sock.close()
+
+
+def _start_worker(
+    context: Any,
+    config: Config,
+    sockets: Sockets,
+    drain_event: EventType,
+    shutdown_event: EventType,
+) -> BaseProcess:
+    worker = context.Process(
+        target=run_worker,
+        args=(config, sockets, drain_event, shutdown_event, os.getpid()),
+    )
+    worker.daemon = True
+    worker.start()
+    return worker
+
+
+def _supervise(
+    workers: list[BaseProcess],
+    start_worker: Callable[[], BaseProcess],
+    settings: LauncherSettings,
+    config: Config,
+    drain_event: EventType,
+    shutdown_event: EventType,
+) -> None:
+    """Replace exited workers until the drain, then wait for them to stop."""
+    drain_started: Optional[float] = None
+    while any(worker.is_alive() for worker in workers):
+        multiprocessing.connection.wait(
+            [worker.sentinel for worker in workers], POLL_INTERVAL_SECONDS
+        )
+        if drain_event.is_set() and drain_started is None:
+            drain_started = time.monotonic()
+            LAUNCHER_LOGGER.info(
+                "Draining workers, shutting them down in %.1f s.",
+                settings.drain_delay_seconds,
+            )
+        if drain_started is None:
+            for worker_no, worker in enumerate(workers):
+                if not worker.is_alive():
+                    LAUNCHER_LOGGER.error(
+                        "Worker %s exited with %s, starting another.",
+                        worker.pid,
+                        worker.exitcode,
+                    )
+                    workers[worker_no] = start_worker()
+            continue
+        draining_seconds = time.monotonic() - drain_started
+        if (
+            not shutdown_event.is_set()
+            and draining_seconds >= settings.drain_delay_seconds
+        ):
+            shutdown_event.set()
+        # Workers still running after their graceful and lifespan
+        # shutdown timeouts are terminated.
+        if draining_seconds >= (
+            settings.drain_delay_seconds
+            + config.graceful_timeout
+            + config.shutdown_timeout
+        ):
+            return
+
+
+def main() -> None:
+    serve(LauncherSettings())
+
+
+if __name__ == "__main__":
+    main()
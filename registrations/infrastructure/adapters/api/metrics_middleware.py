@@ -0,0 +1,42 @@
+"""ASGI middleware measuring every http request of the api."""
+from __future__ import annotations
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from registrations.utils import metrics
+
+
+class MetricsMiddleware:
+    """Records latency, status and in flight count of http requests.
+
+    Requests are labelled by the name of their route's endpoint, so
+    paths with parameters do not make a label each.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.REQUESTS_IN_FLIGHT.dec()
+            # The router adds the matched endpoint to the scope.
+            handler = getattr(scope.get("endpoint"), "__name__", "unmatched")
+            metrics.REQUEST_LATENCY.observe(time.perf_counter() - started, handler)
+            metrics.RESPONSES.inc(handler, str(status_code))
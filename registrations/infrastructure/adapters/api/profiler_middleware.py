@@ -0,0 +1,28 @@
+"""ASGI middleware marking the requests the sampling profiler samples."""
+from __future__ import annotations
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from registrations.utils.profiler import SamplingProfiler
+
+
+class ProfilerMiddleware:
+    """Counts the sampled requests in flight for a request fraction profile.
+
+    Only added to the app when the profiler endpoints are served; while
+    the profiler is stopped a request costs one attribute check.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: SamplingProfiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.profiler.sample_request():
+            await self.app(scope, receive, send)
+            return
+        self.profiler.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.request_finished()
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import csv
+import datetime
+import io
+from typing import AsyncIterator, Optional
+
+import fastapi
+import ujson
+from fastapi.responses import StreamingResponse
+
+from registrations.domain.dto import HospitalExportFormat, HospitalExportRow
+from registrations.domain.services.application_services import EXPORT_PAGE_SIZE
+from registrations.infrastructure.adapters.api import bootstrap
+from registrations.infrastructure.adapters.api.routers.register_hospital_router import (
+    NDJSON_MEDIA_TYPE,
+)
+
+EXPORT_MEDIA_TYPES = {
+    HospitalExportFormat.Ndjson: NDJSON_MEDIA_TYPE,
+    HospitalExportFormat.Csv: "text/csv; charset=utf-8",
+}
+
+router = fastapi.APIRouter(tags=["hospitals", "export"])
+
+
+@router.get(
+    "/hospitals/export",
+    status_code=fastapi.status.HTTP_200_OK,
+    response_class=StreamingResponse,
+)
+async def export_hospitals(
+    export_format: HospitalExportFormat = fastapi.Query(
+        HospitalExportFormat.Ndjson, alias="format"
+    ),
+    cursor: Optional[str] = fastapi.Query(None, max_length=200),
+    since: Optional[datetime.datetime] = fastapi.Query(None),
+    page_size: int = fastapi.Query(EXPORT_PAGE_SIZE, ge=1, le=10_000),
+) -> StreamingResponse:
+    """Stream every registered hospital as NDJSON or CSV, one per line.
+
+    Each line has the cursor resuming the export after its hospital,
+    so an interrupted export goes on from the cursor of its last line.
+    With since, only hospitals added from that time on are exported.
+    """
+    if (
+        bootstrap.bootstrapper.export_service is None
+        or bootstrap.bootstrapper.uow is None
+    ):
+        raise fastapi.HTTPException(
+            status_code=fastapi.status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Exports are not available.",
+        )
+    pages = bootstrap.bootstrapper.export_service.export_hospitals(
+        bootstrap.bootstrapper.uow, cursor, since, page_size
+    )
+    # The first page is read before answering, so an invalid cursor or
+    # a backend that is down gets its status code, not a broken stream.
+    # It may hold no hospital added since, the headers are not held
+    # back until one is found.
+    try:
+        first_page = await pages.__anext__()
+    except StopAsyncIteration:
+        first_page = []
+    except NotImplementedError as e:
+        raise fastapi.HTTPException(
+            status_code=fastapi.status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Exports are not available.",
+        ) from e
+    return StreamingResponse(
+        encode_export(first_page, pages, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+    )
+
+
+async def encode_export(
+    first_page: list[HospitalExportRow],
+    pages: AsyncIterator[list[HospitalExportRow]],
+    export_format: HospitalExportFormat,
+) -> AsyncIterator[str]:
+    """One chunk per page, so a page is sent in a single write."""
+    encode_page = (
+        encode_csv if export_format == HospitalExportFormat.Csv else encode_ndjson
+    )
+    try:
+        if export_format == HospitalExportFormat.Csv:
+            yield encode_csv([HospitalExportRow._fields])
+        if first_page:
+            yield encode_page(first_page)
+        async for page in pages:
+            if page:
+                yield encode_page(page)
+    finally:
+        # Stops reading ahead once the client is gone.
+        await pages.aclose()  # type: ignore[attr-defined]
+
+
+def encode_ndjson(rows: list[HospitalExportRow]) -> str:
+    return "".join(ujson.dumps(row._asdict()) + "\n" for row in rows)
+
+
+def encode_csv(rows: list[tuple]) -> str:
+    csv_buffer = io.StringIO()
+    csv.writer(csv_buffer).writerows(rows)
+    return csv_buffer.getvalue()
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import secrets
+from typing import Optional
+
+import fastapi
+import pydantic
+
+from registrations.utils.profiler import PROFILER
+
+router = fastapi.APIRouter(prefix="/admin/profiler", tags=["admin"])
+
+
+class ProfilerStatus(pydantic.BaseModel):
+    running: bool
+    started_at: Optional[float]
+    sample_count: int
+    output_path: Optional[str]
+
+    @classmethod
+    def current(cls) -> ProfilerStatus:
+        return cls(
+            running=PROFILER.running,
+            started_at=PROFILER.started_at,
+            sample_count=PROFILER.sample_count,
+            output_path=PROFILER.last_output_path,
+        )
+
+
+async def require_admin_token(
+    authorization: str = fastapi.Header(""),
+) -> None:
+    """Let only bearers of the PROFILER_ADMIN_TOKEN through."""
+    if (admin_token := PROFILER.settings.admin_token) is None:
+        raise fastapi.HTTPException(status_code=fastapi.status.HTTP_404_NOT_FOUND)
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        token.encode(), admin_token.get_secret_value().encode()
+    ):
+        raise fastapi.HTTPException(
+            status_code=fastapi.status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@router.get(
+    "",
+    response_model=ProfilerStatus,
+    dependencies=[fastapi.Depends(require_admin_token)],
+)
+async def profiler_status() -> ProfilerStatus:
+    """Whether this worker is being profiled and its last profile."""
+    return ProfilerStatus.current()
+
+
+@router.post(
+    "/start",
+    status_code=fastapi.status.HTTP_202_ACCEPTED,
+    response_model=ProfilerStatus,
+    dependencies=[fastapi.Depends(require_admin_token)],
+)
+async def start_profiler(
+    seconds: float = fastapi.Query(30, gt=0),
+    interval_ms: Optional[float] = fastapi.Query(None, gt=0, le=1000),
+    request_fraction: Optional[float] = fastapi.Query(None, gt=0, le=1),
+) -> ProfilerStatus:
+    """Sample the stacks of this worker's event loop for the seconds.
+
+    With a request fraction, only that fraction of requests is profiled.
+    """
+    try:
+        # Handlers run on the event loop thread, so it is the one sampled.
+        PROFILER.start(seconds, interval_ms, request_fraction)
+    except RuntimeError as e:
+        raise fastapi.HTTPException(
+            status_code=fastapi.status.HTTP_409_CONFLICT, detail=f"{e}"
+        ) from e
+    return ProfilerStatus.current()
+
+
+@router.post(
+    "/stop",
+    response_model=ProfilerStatus,
+    dependencies=[fastapi.Depends(require_admin_token)],
+)
+async def stop_profiler() -> ProfilerStatus:
+    """Stop sampling early and write the profile to the output directory."""
+    # Joining the sampler thread waits up to an interval; not on the loop.
+    await asyncio.to_thread(PROFILER.stop)
+    return ProfilerStatus.current()
+
+
+@router.get(
+    "/collapsed",
+    response_class=fastapi.responses.PlainTextResponse,
+    dependencies=[fastapi.Depends(require_admin_token)],
+)
+async def collapsed_stacks() -> str:
+    """The sampled stacks so far, as flamegraph ready collapsed stacks."""
+    return PROFILER.collapsed()
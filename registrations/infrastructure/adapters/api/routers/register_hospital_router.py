@@ -1,25 +1,197 @@
 from __future__ import annotations
 
+import re
+from typing import Any, AsyncIterable, AsyncIterator, Callable
+
 import fastapi
+import ujson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse, UJSONResponse
+from fastapi.routing import APIRoute
+from starlette.types import Receive, Scope, Send
 
-from registrations.domain.dto import ToHospitalRegistrationEntry
+from registrations.domain.dto import (
+    BulkRegistrationResult,
+    RegisteredHospital,
+    RegistrationTicket,
+    ToHospitalRegistrationEntry,
+)
+from registrations.domain.services.application_services import (
+    BULK_BATCH_SIZE,
+    BULK_MAX_LINE_BYTES,
+)
 from registrations.infrastructure.adapters.api import bootstrap
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class CustomMethodAPIRoute(APIRoute):
+    """Route also matching custom method paths like /resources:verb.
+
+    starlette < 0.21 drops everything after a ':' when it compiles
+    a route path, so such paths are matched literally here.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, endpoint, **kwargs)
+        if ":" in path and "{" not in path:
+            self.path_regex = re.compile(f"^{re.escape(path)}$")
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """Streaming response whose body is produced from the request stream.
+
+    StreamingResponse listens for a disconnect on receive() while it
+    streams, which would steal the request body chunks the body iterator
+    still reads. A disconnect instead surfaces from request.stream().
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
 router = fastapi.APIRouter(
     tags=["hospitals", "registration"],
+    route_class=CustomMethodAPIRoute,
 )
 
 
 @router.post(
     "/register-hospital",
     status_code=fastapi.status.HTTP_201_CREATED,
-    response_model=ToHospitalRegistrationEntry,
+    response_model=RegisteredHospital,
+    responses={
+        fastapi.status.HTTP_202_ACCEPTED: {
+            "model": RegistrationTicket,
+            "description": "Accepted to be stored in the background.",
+        }
+    },
 )
 async def register_hospital_center(
     healthcare_data: ToHospitalRegistrationEntry,
-) -> ToHospitalRegistrationEntry:
+    echo: bool = fastapi.Query(
+        False, description="Answer with the registration entry as it was sent."
+    ),
+) -> fastapi.responses.JSONResponse:
+    """Register a hospital, or accept it with a ticket in queued mode.
+
+    Answers with the id of the stored hospital, or the registration
+    entry as sent with echo. Responses are rendered as they are, so
+    FastAPI neither validates nor encodes them again.
+    """
+    if (registration_queue := bootstrap.bootstrapper.registration_queue) is not None:
+        ticket = registration_queue.submit(
+            bootstrap.bootstrapper.registration_service.build_hospital_entry(
+                healthcare_data, bootstrap.bootstrapper.email_verification_service
+            )
+        )
+        return fastapi.responses.JSONResponse(
+            status_code=fastapi.status.HTTP_202_ACCEPTED,
+            content=jsonable_encoder(ticket),
+            headers={"Location": f"/registrations/{ticket.ticket}"},
+        )
+    hospital_entry = bootstrap.bootstrapper.registration_service.build_hospital_entry(
+        healthcare_data, bootstrap.bootstrapper.email_verification_service
+    )
     if bootstrap.bootstrapper.uow is not None:
-        await bootstrap.bootstrapper.registration_service.register_hospital(
-            bootstrap.bootstrapper.uow, healthcare_data
+        await bootstrap.bootstrapper.registration_service.persist_hospital_entry(
+            bootstrap.bootstrapper.uow,
+            hospital_entry,
+            bootstrap.bootstrapper.hospital_indexes,
         )
-    return healthcare_data
+    return UJSONResponse(
+        status_code=fastapi.status.HTTP_201_CREATED,
+        content=(
+            healthcare_data.dict()
+            if echo
+            else RegisteredHospital.from_hospital_entry(hospital_entry).to_dict()
+        ),
+    )
+
+
+@router.get(
+    "/registrations/{ticket}",
+    status_code=fastapi.status.HTTP_200_OK,
+    response_model=RegistrationTicket,
+)
+async def registration_status(ticket: str) -> RegistrationTicket:
+    """Status of a registration accepted by this worker."""
+    registration_queue = bootstrap.bootstrapper.registration_queue
+    if (
+        registration_queue is None
+        or (registration_ticket := registration_queue.ticket(ticket)) is None
+    ):
+        raise fastapi.HTTPException(
+            status_code=fastapi.status.HTTP_404_NOT_FOUND,
+            detail="Unknown registration ticket.",
+        )
+    return registration_ticket
+
+
+@router.post(
+    "/register-hospitals:bulk",
+    status_code=fastapi.status.HTTP_200_OK,
+    response_class=RequestStreamingResponse,
+)
+async def register_hospitals_bulk(
+    request: fastapi.Request,
+    batch_size: int = fastapi.Query(BULK_BATCH_SIZE, ge=1, le=1000),
+) -> RequestStreamingResponse:
+    """Register hospitals from an NDJSON body, one entry per line.
+
+    Streams back one NDJSON result line per input line with
+    the status created, duplicate or invalid.
+    """
+    if bootstrap.bootstrapper.uow is None:
+        raise fastapi.HTTPException(
+            status_code=fastapi.status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Registrations are not available.",
+        )
+    results = bootstrap.bootstrapper.registration_service.register_hospitals_bulk(
+        bootstrap.bootstrapper.uow,
+        iter_ndjson_lines(request.stream()),
+        batch_size,
+        bootstrap.bootstrapper.hospital_indexes,
+        bootstrap.bootstrapper.email_verification_service,
+    )
+    return RequestStreamingResponse(
+        encode_ndjson(results), media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+async def iter_ndjson_lines(
+    byte_stream: AsyncIterable[bytes], max_line_bytes: int = BULK_MAX_LINE_BYTES
+) -> AsyncIterator[bytes]:
+    """Split a chunked byte stream into lines without buffering the body.
+
+    Of a line longer than max_line_bytes only the first max_line_bytes
+    and one more are kept, enough for it to be reported as invalid.
+    """
+    line_buffer = bytearray()
+    async for chunk in byte_stream:
+        line_start = 0
+        while True:
+            line_end = chunk.find(b"\n", line_start)
+            kept_bytes = max(0, max_line_bytes + 1 - len(line_buffer))
+            line_buffer += chunk[
+                line_start : min(
+                    len(chunk) if line_end == -1 else line_end,
+                    line_start + kept_bytes,
+                )
+            ]
+            if line_end == -1:
+                break
+            yield bytes(line_buffer)
+            line_buffer.clear()
+            line_start = line_end + 1
+    if line_buffer:
+        yield bytes(line_buffer)
+
+
+async def encode_ndjson(
+    results: AsyncIterator[BulkRegistrationResult],
+) -> AsyncIterator[str]:
+    async for result in results:
+        yield ujson.dumps(result.to_dict()) + "\n"
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from typing import Optional
+
+import fastapi
+
+from registrations.domain.dto import HospitalSearchResult, NearbyHospitalResult
+from registrations.domain.services.application_services import (
+    LOOKUP_SEARCH_LIMIT,
+    NEARBY_LIMIT,
+)
+from registrations.infrastructure.adapters.api import bootstrap
+
+router = fastapi.APIRouter(tags=["hospitals", "search"])
+
+
+@router.get(
+    "/hospitals/search",
+    status_code=fastapi.status.HTTP_200_OK,
+    response_model=list[HospitalSearchResult],
+)
+async def search_hospitals(
+    q: str = fastapi.Query(..., min_length=1, max_length=100),
+    limit: int = fastapi.Query(LOOKUP_SEARCH_LIMIT, ge=1, le=50),
+) -> list[HospitalSearchResult]:
+    """Look ahead search of registered hospitals by name, city and state."""
+    if (
+        bootstrap.bootstrapper.lookahead_service is None
+        or bootstrap.bootstrapper.search_index is None
+    ):
+        raise fastapi.HTTPException(
+            status_code=fastapi.status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search is not available.",
+        )
+    hospital_entries = await bootstrap.bootstrapper.lookahead_service.lookup_search(
+        bootstrap.bootstrapper.search_index, q, limit
+    )
+    return [
+        HospitalSearchResult.from_hospital_entry(hospital_entry)
+        for hospital_entry in hospital_entries
+    ]
+
+
+@router.get(
+    "/hospitals/nearby",
+    status_code=fastapi.status.HTTP_200_OK,
+    response_model=list[NearbyHospitalResult],
+)
+async def nearby_hospitals(
+    lat: float = fastapi.Query(..., ge=-90, le=90),
+    lon: float = fastapi.Query(..., ge=-180, le=180),
+    limit: int = fastapi.Query(NEARBY_LIMIT, ge=1, le=50),
+    radius_km: Optional[float] = fastapi.Query(None, gt=0, le=20_000),
+) -> list[NearbyHospitalResult]:
+    """Registered hospitals nearest to a geo location, nearest first."""
+    if (
+        bootstrap.bootstrapper.geo_service is None
+        or bootstrap.bootstrapper.geo_index is None
+    ):
+        raise fastapi.HTTPException(
+            status_code=fastapi.status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Nearby lookups are not available.",
+        )
+    nearby_hospitals = await bootstrap.bootstrapper.geo_service.lookup_nearby(
+        bootstrap.bootstrapper.geo_index, lat, lon, limit, radius_km
+    )
+    return [
+        NearbyHospitalResult.from_nearby_hospital(hospital_entry, distance_km)
+        for hospital_entry, distance_km in nearby_hospitals
+    ]
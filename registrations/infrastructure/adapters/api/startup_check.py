@@ -0,0 +1,136 @@
+"""Report what importing the API costs a worker before it serves.
+
+    python -m registrations.infrastructure.adapters.api.startup_check
+    python -m registrations.infrastructure.adapters.api.startup_check \\
+        --backend postgres --budget-ms 800 --top 20
+
+Imports the app in a fresh interpreter under `python -X importtime`,
+as a new worker does, and prints the total import time, the resident
+memory of that interpreter and the slowest modules. Exits with status
+1 when the import takes longer than --budget-ms, or when a repo
+backend other than the selected one was imported.
+
+Modules imported with importlib, as the selected repo backend is, are
+not timed by -X importtime, though the modules they import are. The
+total is timed around the import instead.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+from typing import NamedTuple
+
+from registrations.infrastructure.adapters.repos import registry
+
+APP_MODULE = "registrations.infrastructure.adapters.api.app"
+
+# Prints the seconds the import took, then every imported module.
+IMPORT_APP_SCRIPT = f"""
+import sys, time
+started = time.perf_counter()
+import {APP_MODULE}
+print(time.perf_counter() - started)
+print(*sys.modules, sep="\\n")
+"""
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    level: int
+
+
+class StartupReport(NamedTuple):
+    total_ms: float
+    max_rss_kb: int
+    modules: frozenset[str]
+    import_times: list[ImportTime]
+
+
+def parse_importtime(stderr: str) -> list[ImportTime]:
+    """Parse the `import time: self | cumulative | module` lines."""
+    import_times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue  # The header line.
+        # Nested imports are indented by two spaces per level.
+        indent = len(module) - len(module.lstrip()) - 1
+        import_times.append(
+            ImportTime(module.strip(), int(self_us), int(cumulative_us), indent // 2)
+        )
+    return import_times
+
+
+def measure_startup(backend: str) -> StartupReport:
+    """Import the app with the backend in a fresh interpreter."""
+    env = {**os.environ, "REPO_BACKEND": backend}
+    env.setdefault("ENV", "production")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_APP_SCRIPT],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode:
+        raise RuntimeError(f"Importing {APP_MODULE} failed:\n{completed.stderr}")
+    # The only child waited for so far, so its peak is this import's.
+    max_rss_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    import_seconds, *modules = completed.stdout.splitlines()
+    return StartupReport(
+        float(import_seconds) * 1000,
+        max_rss_kb,
+        frozenset(modules),
+        parse_importtime(completed.stderr),
+    )
+
+
+def unselected_backend_modules(report: StartupReport, backend: str) -> list[str]:
+    """Modules of built in backends other than the selected one."""
+    selected_module = registry.backend_import_path(backend).partition(":")[0]
+    return sorted(
+        module
+        for import_path in registry.REPO_BACKENDS.values()
+        if (module := import_path.partition(":")[0]) != selected_module
+        and module in report.modules
+    )
+
+
+def main(args: argparse.Namespace) -> int:
+    report = measure_startup(args.backend)
+    print(f"import of {APP_MODULE} with REPO_BACKEND={args.backend}")
+    print(f"total import time  {report.total_ms:10.1f} ms")
+    print(f"max resident size  {report.max_rss_kb / 1024:10.1f} MB")
+    print(f"{'self ms':>10} {'cumulative ms':>14}  module")
+    for import_time in sorted(
+        report.import_times, key=lambda import_time: -import_time.self_us
+    )[: args.top]:
+        print(
+            f"{import_time.self_us / 1000:10.1f} "
+            f"{import_time.cumulative_us / 1000:14.1f}  {import_time.module}"
+        )
+    failed = False
+    if unselected_modules := unselected_backend_modules(report, args.backend):
+        print(f"imported unselected backends: {', '.join(unselected_modules)}")
+        failed = True
+    if args.budget_ms is not None and report.total_ms > args.budget_ms:
+        print(f"import took over the budget of {args.budget_ms:.0f} ms")
+        failed = True
+    return int(failed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--backend", default=os.getenv("REPO_BACKEND") or "m3o", help="REPO_BACKEND"
+    )
+    parser.add_argument("--budget-ms", type=float, help="fail above this import time")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules shown")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import random
+import uuid
+from typing import AsyncIterator, Literal, Optional
+
+import pydantic
+
+from registrations.domain.hospital import registration
+from registrations.domain.repo.registration_repo import (
+    HospitalPageType,
+    InterfaceEntityHospitalRepo,
+    InterfaceHospitalReadRepo,
+    InterfaceHospitalRepo,
+    InterfaceHospitalUOW,
+    UOWSessionFlag,
+    build_page_cursor,
+    parse_offset,
+    parse_page_range,
+)
+from registrations.utils import log_utils
+from registrations.utils.errors import (
+    MissingRegistrationFieldError,
+    RecordAlreadyExistsError,
+)
+
+MEMORY_DB_LOGGER = log_utils.get_logger(__name__)
+
+UNVERIFIED_TABLE = "unverified_hospital"
+UNCLAIMED_TABLE = "unclaimed_hospital"
+
+
+def table_of(hospital_entry: registration.HospitalEntityType) -> str:
+    if isinstance(hospital_entry, registration.UnclaimedHospital):
+        return UNCLAIMED_TABLE
+    return UNVERIFIED_TABLE
+
+
+class InMemorySettings(pydantic.BaseSettings, env_prefix="MEMORY_REPO_"):
+    """Settings of the in-memory adapter, e.g. MEMORY_REPO_LATENCY_MS=20.
+
+    Every read and write waits the latency plus or minus up to the
+    jitter on the event loop, to mimic a remote database.
+    """
+
+    latency_ms: pydantic.confloat(ge=0) = 0  # type: ignore[valid-type]
+    jitter_ms: pydantic.confloat(ge=0) = 0  # type: ignore[valid-type]
+
+
+class InMemoryHospitalStore:
+    """Committed hospitals of every table, shared by the units of work."""
+
+    def __init__(self, settings: InMemorySettings | None = None) -> None:
+        self.settings = settings or InMemorySettings()
+        self.tables: dict[str, dict[uuid.UUID, registration.HospitalEntityType]] = {
+            UNVERIFIED_TABLE: {},
+            UNCLAIMED_TABLE: {},
+        }
+        self.__identity_keys: dict[str, set[str]] = {
+            table: set() for table in self.tables
+        }
+        self.__random = random.Random()
+
+    def __len__(self) -> int:
+        return sum(len(hospitals) for hospitals in self.tables.values())
+
+    def exists(
+        self, table: str, hospital_entry: registration.HospitalEntityType
+    ) -> bool:
+        return (
+            hospital_entry.hospital_id in self.tables[table]
+            or hospital_entry.identity_key in self.__identity_keys[table]
+        )
+
+    def insert(self, hospital_entries: list[registration.HospitalEntityType]) -> None:
+        """Store every hospital, or none if any of them exists already.
+
+        Existence is checked again as another unit of work may have
+        committed the same hospital since it was staged.
+        """
+        if any(
+            self.exists(table_of(hospital_entry), hospital_entry)
+            for hospital_entry in hospital_entries
+        ):
+            raise RecordAlreadyExistsError("Record already exists.")
+        for hospital_entry in hospital_entries:
+            table = table_of(hospital_entry)
+            self.tables[table][hospital_entry.hospital_id] = hospital_entry
+            self.__identity_keys[table].add(hospital_entry.identity_key)
+
+    def clear(self) -> None:
+        for table, hospitals in self.tables.items():
+            hospitals.clear()
+            self.__identity_keys[table].clear()
+
+    async def delay(self) -> None:
+        delay_ms = self.settings.latency_ms + self.__random.uniform(
+            -self.settings.jitter_ms, self.settings.jitter_ms
+        )
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+
+class InMemoryHospitalRepoImpl(
+    InterfaceHospitalRepo, InterfaceEntityHospitalRepo, InterfaceHospitalReadRepo
+):
+    """Hospital repo staging entries until its unit of work commits."""
+
+    def __init__(self, store: InMemoryHospitalStore | None = None) -> None:
+        self.__store = store
+        self.pending_hospitals: list[registration.HospitalEntityType] = []
+        self.__pending_keys: set[tuple[str, str]] = set()
+
+    @property
+    def store(self) -> InMemoryHospitalStore:
+        if self.__store is None:
+            raise AssertionError("In-memory store is not set.")
+        return self.__store
+
+    async def save_unverified_hospital(
+        self, **kwargs: registration.HospitalEntryDictType
+    ) -> registration.UnverifiedRegisteredHospital:
+        try:
+            hospital_entry = registration.HospitalEntryAggregate.build_factory(**kwargs)
+            if not isinstance(
+                hospital_entry, registration.UnverifiedRegisteredHospital
+            ):
+                raise AssertionError
+            await self._stage_hospital(hospital_entry)
+            return hospital_entry
+        except (pydantic.ValidationError, AttributeError, AssertionError) as e:
+            MEMORY_DB_LOGGER.error("Error: %s\n%s Parameters are %s", e, self, kwargs)
+            raise e
+
+    async def save_unclaimed_hospital(
+        self, **kwargs: registration.HospitalEntryDictType
+    ) -> registration.UnclaimedHospital:
+        try:
+            hospital_entry = registration.HospitalEntryAggregate.build_factory(**kwargs)
+            if not isinstance(hospital_entry, registration.UnclaimedHospital):
+                raise AssertionError
+            await self._stage_hospital(hospital_entry)
+            return hospital_entry
+        except (pydantic.ValidationError, AttributeError, AssertionError) as e:
+            MEMORY_DB_LOGGER.error("Error: %s\n%s Parameters are %s", e, self, kwargs)
+            raise e
+
+    async def save_hospital(
+        self, hospital_entry: registration.HospitalEntityType
+    ) -> registration.HospitalEntityType:
+        await self._stage_hospital(hospital_entry)
+        return hospital_entry
+
+    async def iter_hospitals(self) -> AsyncIterator[registration.HospitalEntityType]:
+        await self.store.delay()
+        for hospitals in self.store.tables.values():
+            for hospital_entry in list(hospitals.values()):
+                yield hospital_entry
+
+    @property
+    def hospital_tables(self) -> tuple[str, ...]:
+        return tuple(self.store.tables)
+
+    async def iter_hospital_pages(
+        self,
+        page_size: int,
+        cursor: Optional[str] = None,
+        table: Optional[str] = None,
+    ) -> AsyncIterator[HospitalPageType]:
+        """Pages in insertion order, a cursor being the offset in its table."""
+        tables, offset = parse_page_range(
+            cursor, self.hospital_tables, parse_offset, table
+        )
+        offset = offset or 0
+        for table in tables:
+            while True:
+                await self.store.delay()
+                page = list(
+                    itertools.islice(
+                        self.store.tables[table].values(), offset, offset + page_size
+                    )
+                )
+                if page:
+                    yield [
+                        (hospital_entry, build_page_cursor(table, offset + entry_no))
+                        for entry_no, hospital_entry in enumerate(page, 1)
+                    ]
+                if len(page) < page_size:
+                    break
+                offset += page_size
+            offset = 0
+
+    async def flush(self) -> None:
+        """Store every staged hospital at once, discarding them either way."""
+        try:
+            if self.pending_hospitals:
+                await self.store.delay()
+                self.store.insert(self.pending_hospitals)
+        finally:
+            self.discard()
+
+    def discard(self) -> None:
+        self.pending_hospitals.clear()
+        self.__pending_keys.clear()
+
+    async def _stage_hospital(
+        self, hospital_entry: registration.HospitalEntityType
+    ) -> None:
+        """Stage the hospital unless its identity is already stored or staged."""
+        await self.store.delay()
+        table = table_of(hospital_entry)
+        pending_key = (table, hospital_entry.identity_key)
+        if pending_key in self.__pending_keys or self.store.exists(
+            table, hospital_entry
+        ):
+            raise RecordAlreadyExistsError("Record already exists.")
+        self.pending_hospitals.append(hospital_entry)
+        self.__pending_keys.add(pending_key)
+
+
+# **************************************************** #
+# Hospital unit of work over the in-memory store.
+# **************************************************** #
+class InMemoryHospitalUOWAsyncImpl(InterfaceHospitalUOW):
+    def __init__(self, store: InMemoryHospitalStore) -> None:
+        self.hospital_repo = InMemoryHospitalRepoImpl(store)
+
+    async def commit(self) -> Literal[UOWSessionFlag.COMMITTED]:
+        """Store the staged hospitals of the unit of work."""
+        await self.hospital_repo.flush()
+        return UOWSessionFlag.COMMITTED
+
+    async def rollback(self) -> Literal[UOWSessionFlag.ROLLED_BACK]:
+        """Discard the staged hospitals of the unit of work."""
+        MEMORY_DB_LOGGER.error("Rolling back unit of work.")
+        self.hospital_repo.discard()
+        return UOWSessionFlag.ROLLED_BACK
+
+    async def close(self) -> Literal[UOWSessionFlag.CLOSED]:
+        """Close the unit of work."""
+        return UOWSessionFlag.CLOSED
+
+    async def __aenter__(self) -> InMemoryHospitalUOWAsyncImpl:
+        """Create a storage session using unit of work."""
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Exception,
+        exc_val: str | MissingRegistrationFieldError,
+        exc_tb: str,
+    ) -> None:
+        """Exit context manager, discarding uncommitted hospitals."""
+        if exc_val:
+            MEMORY_DB_LOGGER.error("Error during UOW exit: %s", exc_val)
+            await self.rollback()
+        self.hospital_repo.discard()
+
+
+# **************************************************** #
+# Builds a fresh in-memory unit of work per request
+# over the worker wide store.
+# **************************************************** #
+class InMemoryHospitalUOWFactory:
+    """Factory of per request units of work sharing one in-memory store."""
+
+    def __init__(
+        self,
+        settings: InMemorySettings | None = None,
+        store: InMemoryHospitalStore | None = None,
+    ) -> None:
+        self.__store = InMemoryHospitalStore(settings) if store is None else store
+
+    @property
+    def store(self) -> InMemoryHospitalStore:
+        return self.__store
+
+    async def startup(self) -> None:
+        MEMORY_DB_LOGGER.info("Using the in-memory hospital store.")
+
+    async def shutdown(self) -> None:
+        """Drop every stored hospital."""
+        self.__store.clear()
+
+    def __call__(self) -> InMemoryHospitalUOWAsyncImpl:
+        return InMemoryHospitalUOWAsyncImpl(self.__store)
@@ -0,0 +1,50 @@
+"""Async connection pool for the native PostgreSQL adapter."""
+from __future__ import annotations
+
+from typing import Optional
+
+import pydantic
+from psycopg_pool import AsyncConnectionPool
+
+
+class PostgresSettings(pydantic.BaseSettings, env_prefix="POSTGRES_"):
+    """Connection settings for the PostgreSQL adapter.
+
+    Uses the same POSTGRES_* environment variables as docker-compose.
+    POSTGRES_DSN, if set, takes precedence over the individual parts.
+    """
+
+    dsn: Optional[str]
+    user: str = "postgres"
+    password: str = "postgres"
+    host: str = "localhost"
+    port: pydantic.PositiveInt = 5432
+    db: str = "postgres"
+    pool_min_size: pydantic.PositiveInt = 2
+    pool_max_size: pydantic.PositiveInt = 20
+    pool_timeout: pydantic.PositiveFloat = 5.0
+
+    @property
+    def conninfo(self) -> str:
+        if self.dsn:
+            return self.dsn
+        return (
+            f"postgresql://{self.user}:{self.password}@"
+            f"{self.host}:{self.port}/{self.db}"
+        )
+
+
+def build_pool(settings: PostgresSettings | None = None) -> AsyncConnectionPool:
+    """Build a closed connection pool; open it with ``await pool.open()``.
+
+    :param settings: PostgresSettings, connection settings. Read from env if absent.
+    :return: AsyncConnectionPool, the unopened pool.
+    """
+    settings = settings or PostgresSettings()
+    return AsyncConnectionPool(
+        settings.conninfo,
+        min_size=settings.pool_min_size,
+        max_size=settings.pool_max_size,
+        timeout=settings.pool_timeout,
+        open=False,
+    )
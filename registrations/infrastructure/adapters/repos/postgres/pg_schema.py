@@ -0,0 +1,208 @@
+"""Tables, statements and row mapping of the PostgreSQL adapter."""
+from __future__ import annotations
+
+from psycopg import AsyncConnection, sql
+from psycopg.types.json import Jsonb
+
+from registrations.domain.hospital import registration
+
+UNVERIFIED_TABLE = "unverified_hospital"
+UNCLAIMED_TABLE = "unclaimed_hospital"
+
+BASE_COLUMNS = (
+    ("id", "uuid PRIMARY KEY"),
+    ("identity_key", "text NOT NULL"),
+    ("name", "text NOT NULL"),
+    ("ownership_type", "text"),
+    ("street", "text NOT NULL"),
+    ("street2", "text"),
+    ("city", "text NOT NULL"),
+    ("state", "text NOT NULL"),
+    ("country", "text NOT NULL"),
+    ("contact_number", "text NOT NULL"),
+    ("latitude", "double precision"),
+    ("longitude", "double precision"),
+    ("added_since", "timestamptz NOT NULL"),
+)
+TABLE_COLUMNS = {
+    UNVERIFIED_TABLE: BASE_COLUMNS + (("key_contact_registrar", "jsonb NOT NULL"),),
+    UNCLAIMED_TABLE: BASE_COLUMNS + (("verified_status", "text NOT NULL"),),
+}
+
+# ======================================================== #
+# The hospital identity is stored as the domain computes
+# it, see HospitalEntryAggregate.build_identity_key, so
+# every backend agrees on duplicates. The unique index on
+# it lets inserts resolve them with ON CONFLICT instead of
+# a separate existence query.
+# ======================================================== #
+IDENTITY_COLUMN = "identity_key"
+
+# ======================================================== #
+# Pages are read in insertion order by a serial column, so
+# hospitals stored later come after the cursors issued
+# before. It is left out of the written columns to be
+# assigned on insert. A transaction still open while a
+# later seq is paged is passed over by that cursor.
+# ======================================================== #
+PAGE_COLUMN = "seq"
+
+
+def column_names(table: str) -> list[str]:
+    return [name for name, _ in TABLE_COLUMNS[table]]
+
+
+async def create_schema(connection: AsyncConnection) -> None:
+    """Create the tables and identity indexes if they do not exist."""
+    async with connection.transaction():
+        for table, columns in TABLE_COLUMNS.items():
+            await connection.execute(
+                sql.SQL("CREATE TABLE IF NOT EXISTS {} ({})").format(
+                    sql.Identifier(table),
+                    sql.SQL(", ").join(
+                        sql.SQL(f"{{}} {ddl}").format(sql.Identifier(name))
+                        for name, ddl in (*columns, (PAGE_COLUMN, "bigserial"))
+                    ),
+                )
+            )
+            await connection.execute(
+                sql.SQL("CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} ({})").format(
+                    sql.Identifier(f"{table}_{PAGE_COLUMN}_idx"),
+                    sql.Identifier(table),
+                    sql.Identifier(PAGE_COLUMN),
+                )
+            )
+            await connection.execute(
+                sql.SQL("CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} ({})").format(
+                    sql.Identifier(f"{table}_identity_key_idx"),
+                    sql.Identifier(table),
+                    sql.Identifier(IDENTITY_COLUMN),
+                )
+            )
+
+
+def insert_statement(table: str) -> sql.Composed:
+    """Insert a row unless its identity exists, returning the created id."""
+    columns = column_names(table)
+    return sql.SQL(
+        "INSERT INTO {} ({}) VALUES ({}) ON CONFLICT DO NOTHING RETURNING id"
+    ).format(
+        sql.Identifier(table),
+        sql.SQL(", ").join(map(sql.Identifier, columns)),
+        sql.SQL(", ").join(sql.Placeholder() * len(columns)),
+    )
+
+
+def staging_table(table: str) -> str:
+    return f"{table}_staging"
+
+
+def create_staging_statement(table: str) -> sql.Composed:
+    """A session local table that bulk rows are copied into."""
+    return sql.SQL(
+        "CREATE TEMP TABLE IF NOT EXISTS {} (LIKE {} INCLUDING DEFAULTS) "
+        "ON COMMIT DELETE ROWS"
+    ).format(sql.Identifier(staging_table(table)), sql.Identifier(table))
+
+
+def truncate_staging_statement(table: str) -> sql.Composed:
+    return sql.SQL("TRUNCATE {}").format(sql.Identifier(staging_table(table)))
+
+
+def copy_statement(table: str) -> sql.Composed:
+    return sql.SQL("COPY {} ({}) FROM STDIN").format(
+        sql.Identifier(staging_table(table)),
+        sql.SQL(", ").join(map(sql.Identifier, column_names(table))),
+    )
+
+
+def merge_staging_statement(table: str) -> sql.Composed:
+    """Move staged rows into the table, skipping existing identities."""
+    columns = sql.SQL(", ").join(map(sql.Identifier, column_names(table)))
+    return sql.SQL(
+        "INSERT INTO {} ({}) SELECT {} FROM {} ON CONFLICT DO NOTHING RETURNING id"
+    ).format(
+        sql.Identifier(table),
+        columns,
+        columns,
+        sql.Identifier(staging_table(table)),
+    )
+
+
+def select_statement(table: str) -> sql.Composed:
+    return sql.SQL("SELECT {} FROM {}").format(
+        sql.SQL(", ").join(map(sql.Identifier, column_names(table))),
+        sql.Identifier(table),
+    )
+
+
+def select_page_statement(table: str) -> sql.Composed:
+    """Rows after a seq in seq order, each led by its seq, to resume by keyset."""
+    return sql.SQL("SELECT {}, {} FROM {} WHERE {} > %s ORDER BY {} LIMIT %s").format(
+        sql.Identifier(PAGE_COLUMN),
+        sql.SQL(", ").join(map(sql.Identifier, column_names(table))),
+        sql.Identifier(table),
+        sql.Identifier(PAGE_COLUMN),
+        sql.Identifier(PAGE_COLUMN),
+    )
+
+
+def table_of(hospital_entry: registration.HospitalEntityType) -> str:
+    if isinstance(hospital_entry, registration.UnclaimedHospital):
+        return UNCLAIMED_TABLE
+    return UNVERIFIED_TABLE
+
+
+def parse_to_row(hospital_entry: registration.HospitalEntityType) -> tuple:
+    """Parses a hospital entry to a row in its table's column order."""
+    address = hospital_entry.address
+    geo_location = hospital_entry.geo_location
+    row: tuple = (
+        hospital_entry.hospital_id,
+        hospital_entry.identity_key,
+        hospital_entry.hospital_name,
+        hospital_entry.ownership_type and str(hospital_entry.ownership_type.value),
+        address.street,
+        address.street2,
+        address.city,
+        address.state,
+        address.country,
+        hospital_entry.phone_number.number,
+        geo_location and geo_location.latitude,
+        geo_location and geo_location.longitude,
+        hospital_entry.added_since,
+    )
+    if isinstance(hospital_entry, registration.UnclaimedHospital):
+        return row + (str(hospital_entry.verified_status.value),)
+    return row + (Jsonb(hospital_entry.key_contact_registrar.dict()),)
+
+
+def parse_from_row(table: str, row: tuple) -> registration.HospitalEntityType:
+    """Parses a row of the table back to its hospital entry."""
+    columns = dict(zip(column_names(table), row))
+    hospital_dict: dict = {
+        "hospital_id": columns["id"],
+        "hospital_name": columns["name"],
+        "ownership_type": columns["ownership_type"],
+        "address": {
+            "street": columns["street"],
+            "street2": columns["street2"],
+            "city": columns["city"],
+            "state": columns["state"],
+            "country": columns["country"],
+        },
+        "phone_number": {"number": columns["contact_number"]},
+        "geo_location": (
+            {"latitude": columns["latitude"], "longitude": columns["longitude"]}
+            if columns["latitude"] is not None
+            else None
+        ),
+        "added_since": columns["added_since"],
+    }
+    if table == UNCLAIMED_TABLE:
+        hospital_dict["verified_status"] = registration.VerificationStatus(
+            columns["verified_status"]
+        )
+    else:
+        hospital_dict["key_contact_registrar"] = columns["key_contact_registrar"]
+    return registration.HospitalEntryAggregate.build_factory(**hospital_dict)
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+from typing import AsyncIterator, Literal, Optional, Sequence
+
+import pydantic
+from psycopg import AsyncConnection
+from psycopg.pq import TransactionStatus
+from psycopg_pool import AsyncConnectionPool
+
+from registrations.domain.hospital import registration
+from registrations.domain.repo.registration_repo import (
+    HospitalPageType,
+    InterfaceBulkHospitalRepo,
+    InterfaceEntityHospitalRepo,
+    InterfaceHospitalReadRepo,
+    InterfaceHospitalRepo,
+    InterfaceHospitalUOW,
+    UOWSessionFlag,
+    build_page_cursor,
+    parse_page_range,
+)
+from registrations.infrastructure.adapters.repos.postgres import pg_pool, pg_schema
+from registrations.utils import log_utils, metrics
+from registrations.utils.errors import (
+    MissingRegistrationFieldError,
+    RecordAlreadyExistsError,
+)
+
+POSTGRES_DB_LOGGER = log_utils.get_logger(__name__)
+
+
+class PostgresHospitalRepoImpl(
+    InterfaceHospitalRepo,
+    InterfaceEntityHospitalRepo,
+    InterfaceBulkHospitalRepo,
+    InterfaceHospitalReadRepo,
+):
+    """Hospital repo writing inside the transaction of its unit of work."""
+
+    def __init__(self, connection: AsyncConnection | None = None) -> None:
+        self.__connection = connection
+
+    @property
+    def has_connection(self) -> bool:
+        return self.__connection is not None and not self.__connection.closed
+
+    def set_connection(self, connection: AsyncConnection | None) -> None:
+        self.__connection = connection
+
+    @property
+    def connection(self) -> AsyncConnection:
+        if self.__connection is None:
+            raise AssertionError("Connection is not set.")
+        return self.__connection
+
+    async def save_unverified_hospital(
+        self, **kwargs: registration.HospitalEntryDictType
+    ) -> registration.UnverifiedRegisteredHospital:
+        try:
+            hospital_entry = registration.HospitalEntryAggregate.build_factory(**kwargs)
+            if not isinstance(
+                hospital_entry, registration.UnverifiedRegisteredHospital
+            ):
+                raise AssertionError
+            await self.save_hospital(hospital_entry)
+            return hospital_entry
+        except (pydantic.ValidationError, AttributeError, AssertionError) as e:
+            POSTGRES_DB_LOGGER.error("Error: %s\n%s Parameters are %s", e, self, kwargs)
+            raise e
+
+    async def save_unclaimed_hospital(
+        self, **kwargs: registration.HospitalEntryDictType
+    ) -> registration.UnclaimedHospital:
+        try:
+            hospital_entry = registration.HospitalEntryAggregate.build_factory(**kwargs)
+            if not isinstance(hospital_entry, registration.UnclaimedHospital):
+                raise AssertionError
+            await self.save_hospital(hospital_entry)
+            return hospital_entry
+        except (pydantic.ValidationError, AttributeError, AssertionError) as e:
+            POSTGRES_DB_LOGGER.error("Error: %s\n%s Parameters are %s", e, self, kwargs)
+            raise e
+
+    async def save_hospital(
+        self, hospital_entry: registration.HospitalEntityType
+    ) -> registration.HospitalEntityType:
+        await self._insert_record(pg_schema.table_of(hospital_entry), hospital_entry)
+        return hospital_entry
+
+    async def save_hospitals(
+        self, hospital_entries: Sequence[registration.HospitalEntityType]
+    ) -> list[bool]:
+        """COPY hospitals into a staging table and merge them in.
+
+        Rows whose identity already exists are skipped by the
+        identity index, and reported as duplicates.
+        """
+        created_ids: set = set()
+        for table in (pg_schema.UNVERIFIED_TABLE, pg_schema.UNCLAIMED_TABLE):
+            table_rows = [
+                pg_schema.parse_to_row(hospital_entry)
+                for hospital_entry in hospital_entries
+                if pg_schema.table_of(hospital_entry) == table
+            ]
+            if table_rows:
+                created_ids |= await self._copy_records(table, table_rows)
+        return [
+            hospital_entry.hospital_id in created_ids
+            for hospital_entry in hospital_entries
+        ]
+
+    async def iter_hospitals(self) -> AsyncIterator[registration.HospitalEntityType]:
+        for table in (pg_schema.UNVERIFIED_TABLE, pg_schema.UNCLAIMED_TABLE):
+            async with self.connection.cursor() as cursor:
+                async for row in cursor.stream(pg_schema.select_statement(table)):
+                    yield pg_schema.parse_from_row(table, row)
+
+    @property
+    def hospital_tables(self) -> tuple[str, ...]:
+        return (pg_schema.UNVERIFIED_TABLE, pg_schema.UNCLAIMED_TABLE)
+
+    async def iter_hospital_pages(
+        self,
+        page_size: int,
+        cursor: Optional[str] = None,
+        table: Optional[str] = None,
+    ) -> AsyncIterator[HospitalPageType]:
+        """Pages in insertion order, a cursor being the seq in its table."""
+        tables, after_seq = parse_page_range(cursor, self.hospital_tables, int, table)
+        after_seq = after_seq or 0
+        for table in tables:
+            while True:
+                async with self.connection.cursor() as db_cursor:
+                    await db_cursor.execute(
+                        pg_schema.select_page_statement(table), (after_seq, page_size)
+                    )
+                    rows = await db_cursor.fetchall()
+                if rows:
+                    yield [
+                        (
+                            pg_schema.parse_from_row(table, tuple(row)),
+                            build_page_cursor(table, seq),
+                        )
+                        for seq, *row in rows
+                    ]
+                if len(rows) < page_size:
+                    break
+                after_seq = rows[-1][0]
+            after_seq = 0
+
+    async def _insert_record(
+        self, table: str, hospital_entry: registration.HospitalEntityType
+    ) -> None:
+        """Insert the record, the identity index detecting duplicates."""
+        with metrics.STAGE_LATENCY.time("record_create"):
+            async with self.connection.cursor() as cursor:
+                await cursor.execute(
+                    pg_schema.insert_statement(table),
+                    pg_schema.parse_to_row(hospital_entry),
+                )
+                inserted_row = await cursor.fetchone()
+        if inserted_row is None:
+            raise RecordAlreadyExistsError("Record already exists.")
+
+    async def _copy_records(self, table: str, rows: list[tuple]) -> set:
+        async with self.connection.cursor() as cursor:
+            await cursor.execute(pg_schema.create_staging_statement(table))
+            await cursor.execute(pg_schema.truncate_staging_statement(table))
+            async with cursor.copy(pg_schema.copy_statement(table)) as copy:
+                for row in rows:
+                    await copy.write_row(row)
+            await cursor.execute(pg_schema.merge_staging_statement(table))
+            return {created_id for (created_id,) in await cursor.fetchall()}
+
+
+# **************************************************** #
+# Hospital unit of work as a PostgreSQL transaction.
+# **************************************************** #
+class PostgresHospitalUOWAsyncImpl(InterfaceHospitalUOW):
+    def __init__(self, pool: AsyncConnectionPool | None) -> None:
+        self._pool = pool
+        self.hospital_repo = PostgresHospitalRepoImpl()
+
+    async def commit(self) -> Literal[UOWSessionFlag.COMMITTED]:
+        """Commit the transaction of the unit of work."""
+        await self.hospital_repo.connection.commit()
+        return UOWSessionFlag.COMMITTED
+
+    async def rollback(self) -> Literal[UOWSessionFlag.ROLLED_BACK]:
+        """Rollback the transaction of the unit of work."""
+        POSTGRES_DB_LOGGER.error("Rolling back unit of work.")
+        await self.hospital_repo.connection.rollback()
+        return UOWSessionFlag.ROLLED_BACK
+
+    async def close(self) -> Literal[UOWSessionFlag.CLOSED]:
+        """Return the connection of the unit of work to the pool."""
+        if self._pool is not None and self.hospital_repo.has_connection:
+            await self._pool.putconn(self.hospital_repo.connection)
+        self.hospital_repo.set_connection(None)
+        return UOWSessionFlag.CLOSED
+
+    async def __aenter__(self) -> PostgresHospitalUOWAsyncImpl:
+        """Take a pooled connection; its transaction begins on first write."""
+        if self._pool is None:
+            raise AssertionError("Connection pool is not open.")
+        self.hospital_repo.set_connection(await self._pool.getconn())
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Exception,
+        exc_val: str | MissingRegistrationFieldError,
+        exc_tb: str,
+    ) -> None:
+        """Exit context manager, discarding uncommitted work."""
+        try:
+            if exc_val:
+                POSTGRES_DB_LOGGER.error("Error during UOW exit: %s", exc_val)
+                await self.rollback()
+            elif (
+                self.hospital_repo.connection.info.transaction_status
+                != TransactionStatus.IDLE
+            ):
+                await self.hospital_repo.connection.rollback()
+        finally:
+            await self.close()
+
+
+# **************************************************** #
+# Builds a fresh PostgreSQL unit of work per request
+# over the worker wide connection pool.
+# **************************************************** #
+class PostgresHospitalUOWFactory:
+    """Factory of per request units of work sharing one connection pool."""
+
+    def __init__(self, settings: pg_pool.PostgresSettings | None = None) -> None:
+        self.__settings = settings
+        self.__pool: AsyncConnectionPool | None = None
+
+    async def startup(self) -> None:
+        """Open the connection pool and create the schema."""
+        if self.__pool is None:
+            POSTGRES_DB_LOGGER.info("Opening postgres connection pool.")
+            self.__pool = pg_pool.build_pool(self.__settings)
+            await self.__pool.open(wait=True)
+            async with self.__pool.connection() as connection:
+                await pg_schema.create_schema(connection)
+
+    async def shutdown(self) -> None:
+        """Close the connection pool."""
+        if self.__pool is not None:
+            POSTGRES_DB_LOGGER.info("Closing postgres connection pool.")
+            await self.__pool.close()
+            self.__pool = None
+
+    def pool_stats(self) -> dict[str, int]:
+        """Connections of the pool: open, in use and the most allowed."""
+        if self.__pool is None:
+            return {}
+        pool_stats = self.__pool.get_stats()
+        return {
+            "open": pool_stats["pool_size"],
+            "in_use": pool_stats["pool_size"] - pool_stats["pool_available"],
+            "max": self.__pool.max_size,
+        }
+
+    def __call__(self) -> PostgresHospitalUOWAsyncImpl:
+        return PostgresHospitalUOWAsyncImpl(self.__pool)
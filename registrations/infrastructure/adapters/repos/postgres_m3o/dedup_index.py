@@ -0,0 +1,69 @@
+"""Process local index of hospitals already stored in M3O.
+
+By default the index only holds the hospitals this process created or
+found by a remote Read, so a hit is a duplicate without a Read query
+and a miss is still checked remotely.
+
+In authoritative mode (M3O_DEDUP_AUTHORITATIVE=true) the index is
+warmed with every stored identity key at startup, and from then on a
+miss means the hospital is new, so neither case reads M3O. The index
+goes stale as soon as another process writes to the same tables, and
+a stale index lets a duplicate through, so the mode is only safe with
+a single writer: one worker of one deployment.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Iterable
+
+import pydantic
+
+
+class M3ODedupSettings(pydantic.BaseSettings, env_prefix="M3O_DEDUP_"):
+    """Dedup index settings, overridable by M3O_DEDUP_ variables."""
+
+    authoritative: bool = False
+
+
+def hash_key(table: str, identity_key: str) -> bytes:
+    """128 bit hash of a table scoped identity key."""
+    return hashlib.blake2b(f"{table}|{identity_key}".encode(), digest_size=16).digest()
+
+
+class HospitalDedupIndex:
+    """Identity keys of the hospitals known to be stored.
+
+    An authoritative index reports nothing as new until it is warmed,
+    so callers fall back to the remote check meanwhile.
+    """
+
+    def __init__(self, authoritative: bool = False) -> None:
+        self.authoritative = authoritative
+        self.__key_hashes: set[bytes] = set()
+        self.is_warm = False
+
+    def __len__(self) -> int:
+        return len(self.__key_hashes)
+
+    def add(self, table: str, identity_key: str) -> None:
+        self.__key_hashes.add(hash_key(table, identity_key))
+
+    def warm(self, table: str, identity_keys: Iterable[str]) -> None:
+        """Load keys read from the backend; call mark_warm once all are in."""
+        for identity_key in identity_keys:
+            self.add(table, identity_key)
+
+    def mark_warm(self) -> None:
+        self.is_warm = True
+
+    def is_known(self, table: str, identity_key: str) -> bool:
+        """True means the hospital is stored."""
+        return hash_key(table, identity_key) in self.__key_hashes
+
+    def is_new(self, table: str, identity_key: str) -> bool:
+        """True means the hospital is not stored, without a remote check."""
+        return (
+            self.authoritative
+            and self.is_warm
+            and not self.is_known(table, identity_key)
+        )
@@ -0,0 +1,82 @@
+"""Migrates stored uuid1 hospital records to content addressed uuid5 ids.
+
+Run it before switching a deployment to HOSPITAL_ID_MODE=content,
+so every stored hospital can be found by a primary key read:
+
+    python -m registrations.infrastructure.adapters.repos.postgres_m3o.id_migration
+
+It only reports what it would do unless --apply is given. Each
+record is copied under its content id before the original is
+deleted. A uuid1 record whose content id is already taken is a
+duplicate (or a leftover of an interrupted run); it is reported
+and left in place.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import uuid
+
+import pydantic
+
+from registrations.domain.hospital import registration
+from registrations.infrastructure.adapters.repos.postgres_m3o import m3o_client
+from registrations.infrastructure.adapters.repos.postgres_m3o.repo import (
+    M3O_API_TOKEN,
+    M3O_DB_LOGGER,
+    M3OHospitalRepoImpl,
+)
+
+HOSPITAL_TABLES = ("unverified_hospital", "unclaimed_hospital")
+
+
+class IdMigrationReport(pydantic.BaseModel):
+    table: str
+    migrated: int = 0
+    already_migrated: int = 0
+    duplicate_ids: list[str] = []
+
+
+async def migrate_table(
+    hospital_repo: M3OHospitalRepoImpl, table: str, apply: bool = False
+) -> IdMigrationReport:
+    """Moves every uuid1 record of the table to its content id."""
+    report = IdMigrationReport(table=table)
+    records = await hospital_repo.read_records(table)
+    stored_ids = {record["id"] for record in records}
+    for record in records:
+        if uuid.UUID(record["id"]).version != 1:
+            report.already_migrated += 1
+            continue
+        content_id = registration.HospitalEntryAggregate.build_content_id(
+            hospital_repo.record_identity_key(record)
+        ).hex
+        if content_id in stored_ids:
+            report.duplicate_ids.append(record["id"])
+            continue
+        if apply:
+            await hospital_repo.create_record(table, {**record, "id": content_id})
+            await hospital_repo.delete_record(table, record["id"])
+        stored_ids.add(content_id)
+        report.migrated += 1
+    return report
+
+
+async def migrate(apply: bool = False) -> list[IdMigrationReport]:
+    async with m3o_client.build_async_client() as http_client:
+        hospital_repo = M3OHospitalRepoImpl(M3O_API_TOKEN, http_client)
+        return [
+            await migrate_table(hospital_repo, table, apply)
+            for table in HOSPITAL_TABLES
+        ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--apply", action="store_true", help="write changes, not only report them"
+    )
+    M3O_DB_LOGGER.setLevel(logging.INFO)
+    for table_report in asyncio.run(migrate(parser.parse_args().apply)):
+        M3O_DB_LOGGER.info(table_report.json())
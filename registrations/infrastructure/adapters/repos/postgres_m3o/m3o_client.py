@@ -0,0 +1,105 @@
+"""Shared async HTTP client for the M3O DB API."""
+from __future__ import annotations
+
+import httpx
+import pydantic
+
+from registrations.utils import metrics
+
+M3O_DB_API_URL = "https://api.m3o.com/v1/db"
+
+
+class M3OHttpSettings(pydantic.BaseSettings, env_prefix="M3O_HTTP_"):
+    """Connection pool settings for the M3O HTTP client.
+
+    Every field can be overridden by an environment variable
+    prefixed with M3O_HTTP_, e.g. M3O_HTTP_MAX_CONNECTIONS=200, or
+    M3O_HTTP_API_URL=http://localhost:8090/v1/db to use a local stand-in.
+    """
+
+    api_url: pydantic.AnyHttpUrl = M3O_DB_API_URL  # type: ignore[assignment]
+    max_connections: pydantic.PositiveInt = 100
+    max_keepalive_connections: pydantic.PositiveInt = 20
+    keepalive_expiry: pydantic.PositiveFloat = 30.0
+    connect_timeout: pydantic.PositiveFloat = 5.0
+    read_timeout: pydantic.PositiveFloat = 10.0
+    write_timeout: pydantic.PositiveFloat = 10.0
+    pool_timeout: pydantic.PositiveFloat = 5.0
+    http2: bool = False
+
+
+class M3OResilienceSettings(pydantic.BaseSettings, env_prefix="M3O_RESILIENCE_"):
+    """Deadline, retries and circuit breaker of M3O calls.
+
+    Every call gives up after deadline_seconds. Reads are tried up to
+    read_attempts times. After breaker_failure_threshold consecutive
+    failures, calls are rejected for breaker_reset_seconds. On shutdown,
+    open units of work get drain_timeout_seconds to commit.
+    """
+
+    deadline_seconds: pydantic.PositiveFloat = 5.0
+    read_attempts: pydantic.PositiveInt = 3
+    retry_base_delay_seconds: pydantic.PositiveFloat = 0.05
+    retry_max_delay_seconds: pydantic.PositiveFloat = 1.0
+    breaker_failure_threshold: pydantic.PositiveInt = 5
+    breaker_reset_seconds: pydantic.PositiveFloat = 10.0
+    drain_timeout_seconds: pydantic.confloat(ge=0) = 10.0  # type: ignore[valid-type]
+
+
+def build_async_client(
+    settings: M3OHttpSettings | None = None,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> httpx.AsyncClient:
+    """Build a keep-alive pooled client for the M3O DB API at api_url.
+
+    The client is meant to be created once per worker and shared
+    by every unit of work; it must be closed with aclose().
+
+    :param settings: M3OHttpSettings, pool settings. Read from env if absent.
+    :param transport: httpx.AsyncBaseTransport, custom transport (e.g. tests).
+    :return: httpx.AsyncClient, the pooled client.
+    """
+    settings = settings or M3OHttpSettings()
+    return httpx.AsyncClient(
+        base_url=settings.api_url,
+        headers={
+            "Content-Type": "application/json",
+            "accept": "application/json",
+        },
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.connect_timeout,
+            read=settings.read_timeout,
+            write=settings.write_timeout,
+            pool=settings.pool_timeout,
+        ),
+        http2=settings.http2,
+        transport=transport,
+        event_hooks={"response": [count_response]},
+    )
+
+
+async def count_response(response: httpx.Response) -> None:
+    """Count M3O responses by endpoint, e.g. Read, and status code."""
+    endpoint = response.request.url.path.rsplit("/", 1)[-1]
+    metrics.M3O_REQUESTS.inc(endpoint, str(response.status_code))
+
+
+def pool_stats(http_client: httpx.AsyncClient) -> dict[str, int]:
+    """Connections of the client's pool: open, in use and the most allowed.
+
+    httpx does not expose its pool, so this reads the httpcore pool
+    of the default transport; other transports report nothing.
+    """
+    connection_pool = getattr(http_client._transport, "_pool", None)
+    if (connections := getattr(connection_pool, "connections", None)) is None:
+        return {}
+    return {
+        "open": len(connections),
+        "in_use": sum(not connection.is_idle() for connection in connections),
+        "max": getattr(connection_pool, "_max_connections", 0),
+    }
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import uuid
+
 from registrations.domain.hospital import registration
 
 
@@ -34,3 +36,23 @@ def parse_to_dict(table: str, hospital_entry: registration.HospitalEntityType) -
     ):
         hospital_dict["verified_status"] = str(hospital_entry.verified_status.value)
     return hospital_dict
+
+
+def parse_from_dict(record: dict) -> registration.HospitalEntityType:
+    """Parses a stored record back to its hospital entry."""
+    hospital_dict: dict = {
+        "hospital_id": uuid.UUID(record["id"]),
+        "hospital_name": record["name"],
+        "ownership_type": record.get("ownership_type"),
+        "address": record["address"],
+        "phone_number": {"number": record["contact_number"]},
+        "geo_location": record.get("geo_location"),
+        "added_since": record["added_since"],
+    }
+    if "verified_status" in record:
+        hospital_dict["verified_status"] = registration.VerificationStatus(
+            record["verified_status"]
+        )
+    else:
+        hospital_dict["key_contact_registrar"] = record["key_contact_registrar"]
+    return registration.HospitalEntryAggregate.build_factory(**hospital_dict)
@@ -1,99 +1,130 @@
 from __future__ import annotations
 
-import logging
+import asyncio
 import os
-import sys
-from typing import Callable, Literal
+from typing import AsyncIterator, Awaitable, Callable, Literal, Optional
 
+import httpx
 import pydantic
-import requests
 
 from registrations.domain.hospital import registration
 from registrations.domain.repo.registration_repo import (
+    HospitalPageType,
+    InterfaceEntityHospitalRepo,
+    InterfaceHospitalReadRepo,
     InterfaceHospitalRepo,
     InterfaceHospitalUOW,
     UOWSessionFlag,
+    build_page_cursor,
+    parse_offset,
+    parse_page_range,
 )
-from registrations.infrastructure.adapters.repos.postgres_m3o import m3o_dto
+from registrations.infrastructure.adapters.repos.postgres_m3o import (
+    dedup_index,
+    m3o_client,
+    m3o_dto,
+)
+from registrations.utils import log_utils, metrics, resilience
 from registrations.utils.errors import (
     MissingRegistrationFieldError,
     RecordAlreadyExistsError,
+    ServiceUnavailableError,
     ValidationModelType,
 )
 
-M3O_DB_LOGGER = logging.getLogger(__name__)
-
-error_stream_handler = logging.StreamHandler(stream=sys.stderr)
-error_stream_handler.setLevel(logging.CRITICAL)
-
-log_handlers = logging.StreamHandler(stream=sys.stdout)
-log_handlers.setLevel(logging.INFO)
-
-M3O_DB_LOGGER.addHandler(error_stream_handler)
-M3O_DB_LOGGER.addHandler(log_handlers)
+M3O_DB_LOGGER = log_utils.get_logger(__name__)
 
 M3O_API_TOKEN = os.getenv("M3O_API_TOKEN")
+# Records read per page when warming the dedup index or the search indexes.
+M3O_READ_PAGE_SIZE = 1000
 
 
-class M3OHospitalRepoImpl(InterfaceHospitalRepo):
-    def __init__(self, m3o_token: str | None = None) -> None:
+class M3OHospitalRepoImpl(
+    InterfaceHospitalRepo, InterfaceEntityHospitalRepo, InterfaceHospitalReadRepo
+):
+    def __init__(
+        self,
+        m3o_token: str | None = None,
+        http_client: httpx.AsyncClient | None = None,
+        hospital_index: dedup_index.HospitalDedupIndex | None = None,
+        resilience_settings: m3o_client.M3OResilienceSettings | None = None,
+        circuit_breaker: resilience.CircuitBreaker | None = None,
+    ) -> None:
         self.__session_api = m3o_token
+        self.__http_client = http_client
+        self.__hospital_index = hospital_index
+        self.__resilience_settings = (
+            resilience_settings or m3o_client.M3OResilienceSettings()
+        )
+        self.__circuit_breaker = circuit_breaker
         self.__unverified_tbl = "unverified_hospital"
         self.__unclaimed_hospital = "unclaimed_hospital"
         self.pending_transaction: list[Callable] = []
+        # Identities staged by this unit of work, so a repeat is a duplicate.
+        self.__pending_keys: set[tuple[str, str]] = set()
 
     async def save_unverified_hospital(
         self, **kwargs: registration.HospitalEntryDictType
     ) -> registration.UnverifiedRegisteredHospital:
         try:
-            # check if unverified hospital exists then return exists error.
-            if self._record_exists(self.__unverified_tbl, **kwargs):
-                raise RecordAlreadyExistsError("Record already exists.")
             hospital_entry = registration.HospitalEntryAggregate.build_factory(**kwargs)
             if not isinstance(
                 hospital_entry, registration.UnverifiedRegisteredHospital
             ):
                 raise AssertionError
-            self.enqueue_transaction(
-                self._create_record,
-                self.__unverified_tbl,
-                hospital_entry=hospital_entry,
-            )
+            await self.save_hospital(hospital_entry)
             return hospital_entry
         except (
             pydantic.ValidationError,
             AttributeError,
             AssertionError,
-            requests.HTTPError,
+            httpx.HTTPError,
         ) as e:
-            M3O_DB_LOGGER.error(f"Error: {e}\n{self} Parameters are {kwargs}")
+            M3O_DB_LOGGER.error("Error: %s\n%s Parameters are %s", e, self, kwargs)
             raise e
 
     async def save_unclaimed_hospital(
         self, **kwargs: registration.HospitalEntryDictType
     ) -> registration.UnclaimedHospital:
         try:
-            # check if unclaimed hospital exists then return exists error.
-            if self._record_exists(self.__unclaimed_hospital, **kwargs):
-                raise RecordAlreadyExistsError("Record already exists.")
             hospital_entry = registration.HospitalEntryAggregate.build_factory(**kwargs)
             if not isinstance(hospital_entry, registration.UnclaimedHospital):
                 raise AssertionError
-            self.enqueue_transaction(
-                self._create_record,
-                self.__unclaimed_hospital,
-                hospital_entry=hospital_entry,
-            )
+            await self.save_hospital(hospital_entry)
             return hospital_entry
         except (
             pydantic.ValidationError,
             AttributeError,
             AssertionError,
-            requests.HTTPError,
+            httpx.HTTPError,
         ) as e:
-            M3O_DB_LOGGER.error(f"Error: {e}\n{self} Parameters are {kwargs}")
+            M3O_DB_LOGGER.error("Error: %s\n%s Parameters are %s", e, self, kwargs)
             raise e
 
+    async def save_hospital(
+        self, hospital_entry: registration.HospitalEntityType
+    ) -> registration.HospitalEntityType:
+        table = (
+            self.__unclaimed_hospital
+            if isinstance(hospital_entry, registration.UnclaimedHospital)
+            else self.__unverified_tbl
+        )
+        pending_key = (table, hospital_entry.identity_key)
+        if pending_key in self.__pending_keys:
+            raise RecordAlreadyExistsError("Record already exists.")
+        # check if the hospital exists then return exists error.
+        with metrics.STAGE_LATENCY.time("existence_check"):
+            record_exists = await self._record_exists(table, hospital_entry)
+        if record_exists:
+            raise RecordAlreadyExistsError("Record already exists.")
+        self.enqueue_transaction(
+            self._create_record,
+            table,
+            hospital_entry=hospital_entry,
+        )
+        self.__pending_keys.add(pending_key)
+        return hospital_entry
+
     def enqueue_transaction(
         self,
         executable: Callable,
@@ -104,97 +135,362 @@ class M3OHospitalRepoImpl(InterfaceHospitalRepo):
         self.pending_transaction += [lambda: executable(table, **kwargs)]
 
     async def set_executable(self) -> None:
-        for each_callable_transaction in self.pending_transaction:
-            each_callable_transaction()
+        # Taken off the repo first, so a rollback while they run skips none.
+        pending_transaction, self.pending_transaction = self.pending_transaction, []
+        self.__pending_keys.clear()
+        for each_callable_transaction in pending_transaction:
+            await each_callable_transaction()
+
+    def discard(self) -> None:
+        self.pending_transaction.clear()
+        self.__pending_keys.clear()
 
     @property
     def has_session_key(self) -> bool:
         """Checks if session key is set."""
         return bool(self.__session_api)
 
-    def _record_exists(
-        self, table: str, /, **kwargs: registration.HospitalEntryDictType
+    @property
+    def has_http_client(self) -> bool:
+        """Checks if an open http client is set."""
+        return self.__http_client is not None and not self.__http_client.is_closed
+
+    @property
+    def _http_client(self) -> httpx.AsyncClient:
+        if self.__http_client is None:
+            raise AssertionError("Http client is not set.")
+        return self.__http_client
+
+    @property
+    def _auth_headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.__session_api}"}
+
+    async def read_records(
+        self, table: str, page_size: int = M3O_READ_PAGE_SIZE
+    ) -> list[dict]:
+        """Reads every record stored in the table, page by page."""
+        records: list[dict] = []
+        offset = 0
+        while True:
+            page = await self.read_page(table, offset, page_size)
+            records += page
+            if len(page) < page_size:
+                return records
+            offset += page_size
+
+    async def read_page(self, table: str, offset: int, page_size: int) -> list[dict]:
+        """Reads the page_size records stored in the table from the offset."""
+        json_payload = {"table": table, "limit": page_size, "offset": offset}
+        response = await self._post("/Read", json_payload, idempotent=True)
+        response.raise_for_status()
+        return response.json().get("records") or []
+
+    async def iter_hospitals(self) -> AsyncIterator[registration.HospitalEntityType]:
+        async for page in self.iter_hospital_pages(M3O_READ_PAGE_SIZE):
+            for hospital_entry, _ in page:
+                yield hospital_entry
+
+    @property
+    def hospital_tables(self) -> tuple[str, ...]:
+        return (self.__unverified_tbl, self.__unclaimed_hospital)
+
+    async def iter_hospital_pages(
+        self,
+        page_size: int,
+        cursor: Optional[str] = None,
+        table: Optional[str] = None,
+    ) -> AsyncIterator[HospitalPageType]:
+        """Pages read by offset, a cursor being the offset in its table."""
+        tables, offset = parse_page_range(
+            cursor, self.hospital_tables, parse_offset, table
+        )
+        offset = offset or 0
+        for table in tables:
+            while True:
+                records = await self.read_page(table, offset, page_size)
+                if records:
+                    yield [
+                        (
+                            m3o_dto.parse_from_dict(record),
+                            build_page_cursor(table, offset + record_no),
+                        )
+                        for record_no, record in enumerate(records, 1)
+                    ]
+                if len(records) < page_size:
+                    break
+                offset += page_size
+            offset = 0
+
+    async def read_identity_keys(
+        self, table: str, page_size: int = M3O_READ_PAGE_SIZE
+    ) -> list[str]:
+        """Reads the identity keys of every record stored in the table."""
+        return [
+            self.record_identity_key(record)
+            for record in await self.read_records(table, page_size)
+        ]
+
+    async def create_record(self, table: str, record: dict) -> None:
+        """Creates an already serialized record in table."""
+        response = await self._post("/Create", {"record": record, "table": table})
+        response.raise_for_status()
+
+    async def delete_record(self, table: str, record_id: str) -> None:
+        response = await self._post("/Delete", {"id": record_id, "table": table})
+        response.raise_for_status()
+
+    @staticmethod
+    def record_identity_key(record: dict) -> str:
+        """Identity key of a record as stored by m3o_dto."""
+        address = record.get("address") or {}
+        return registration.HospitalEntryAggregate.build_identity_key(
+            record.get("name"),
+            record.get("ownership_type"),
+            address.get("street"),
+            address.get("city"),
+            address.get("state"),
+            address.get("country"),
+        )
+
+    async def _record_exists(
+        self, table: str, hospital_entry: registration.HospitalEntityType
     ) -> bool:
-        """Checks if record exists in the table."""
-        url = "https://api.m3o.com/v1/db/Read"
+        """Checks if record exists in the table.
 
-        headers = {
-            "Content-Type": "application/json",
-            "accept": "application/json",
-            "Authorization": f"Bearer {self.__session_api}",
-        }
-        address: dict[str, str | None] = {}
-        hospital_name = str(kwargs.get("hospital_name"))
-        ownership_type = str(kwargs.get("ownership_type"))
-        if (address_dict := kwargs.get("address")) and isinstance(address_dict, dict):
-            address = address_dict
-        query = (
-            f"ownership_type == {ownership_type} and hospital_name == {hospital_name} and "
-            f"address.street == {address.get('street')} and address.city == {address.get('city')} and "
-            f"address.state == {address.get('state')} and address.country == {address.get('country')}"
-        )
-        json_payload = {
-            "table": table,
-            "query": query,
+        The remote query is skipped when the local index knows the
+        hospital is stored, or when an authoritative index knows it
+        is not.
+        """
+        if self.__hospital_index is not None:
+            if self.__hospital_index.is_known(table, hospital_entry.identity_key):
+                return True
+            if self.__hospital_index.is_new(table, hospital_entry.identity_key):
+                return False
+        json_payload: dict[str, str] = {"table": table}
+        if hospital_entry.hospital_id.version == 5:
+            # Content addressed ids make this a primary key read.
+            json_payload["id"] = hospital_entry.hospital_id.hex
+        else:
+            json_payload["query"] = self._identity_query(hospital_entry)
+        response = await self._post("/Read", json_payload, idempotent=True)
+        if response.status_code == httpx.codes.NOT_FOUND:
+            return False
+        # A failed check must not pass a duplicate as new.
+        response.raise_for_status()
+        record_exists = bool((response.json() or {}).get("records"))
+        if record_exists and self.__hospital_index is not None:
+            self.__hospital_index.add(table, hospital_entry.identity_key)
+        return record_exists
+
+    async def _post(
+        self, endpoint: str, json_payload: dict, idempotent: bool = False
+    ) -> httpx.Response:
+        """Post to the M3O DB API within the deadline, through the breaker.
+
+        Timeouts, transport errors and server errors count as failures
+        of M3O and raise ServiceUnavailableError. Idempotent calls,
+        i.e. reads, are retried first.
+        """
+        try:
+            if not idempotent:
+                return await self._post_once(endpoint, json_payload)
+            return await resilience.call_with_retries(
+                lambda: self._post_once(endpoint, json_payload),
+                self.__resilience_settings.read_attempts,
+                self.__resilience_settings.retry_base_delay_seconds,
+                self.__resilience_settings.retry_max_delay_seconds,
+                retry_on=(httpx.TransportError, httpx.HTTPStatusError),
+                breaker_name="m3o",
+            )
+        except httpx.HTTPError as e:
+            retry_after_seconds = (
+                self.__circuit_breaker.retry_after_seconds
+                if self.__circuit_breaker is not None
+                else 0
+            )
+            raise ServiceUnavailableError(
+                f"M3O {endpoint} failed: {e}", retry_after_seconds or 1
+            ) from e
+
+    async def _post_once(self, endpoint: str, json_payload: dict) -> httpx.Response:
+        if self.__circuit_breaker is not None:
+            self.__circuit_breaker.check()
+        try:
+            response = await asyncio.wait_for(
+                self._http_client.post(
+                    endpoint, json=json_payload, headers=self._auth_headers
+                ),
+                self.__resilience_settings.deadline_seconds,
+            )
+            if response.is_server_error:
+                response.raise_for_status()
+        except asyncio.TimeoutError as e:
+            self.__record_failure()
+            raise httpx.TimeoutException(
+                f"M3O {endpoint} exceeded its deadline."
+            ) from e
+        except httpx.HTTPError:
+            self.__record_failure()
+            raise
+        if self.__circuit_breaker is not None:
+            self.__circuit_breaker.record_success()
+        return response
+
+    def __record_failure(self) -> None:
+        if self.__circuit_breaker is not None:
+            self.__circuit_breaker.record_failure()
+
+    @staticmethod
+    def _identity_query(hospital_entry: registration.HospitalEntityType) -> str:
+        """Query matching the stored fields of the hospital identity."""
+        address = hospital_entry.address
+        conditions = {
+            "name": hospital_entry.hospital_name,
+            "address.street": address.street,
+            "address.city": address.city,
+            "address.state": address.state,
+            "address.country": address.country,
         }
-        response = requests.post(url, json=json_payload, headers=headers)
-        if not 400 <= response.status_code <= 511 and (data := response.json()):
-            return data and bool(data["records"])
-        return False
+        if hospital_entry.ownership_type:
+            conditions["ownership_type"] = str(hospital_entry.ownership_type.value)
+        return " and ".join(
+            "{} == '{}'".format(field, value.replace("'", "\\'"))
+            for field, value in conditions.items()
+        )
 
-    def _create_record(
+    async def _create_record(
         self, table: str, hospital_entry: registration.HospitalEntityType
     ) -> dict[str, str] | None:
         """Creates record in table."""
         # save entry using dto
-        url = "https://api.m3o.com/v1/db/Create"
-        headers = {
-            "Content-Type": "application/json",
-            "accept": "application/json",
-            "Authorization": f"Bearer {self.__session_api}",
-        }
         hospital_record_dict = m3o_dto.parse_to_dict(table, hospital_entry)
         json_payload = {"record": hospital_record_dict, "table": table}
-        response = requests.post(url, json=json_payload, headers=headers)
+        with metrics.STAGE_LATENCY.time("record_create"):
+            response = await self._post("/Create", json_payload)
         response.raise_for_status()
+        if self.__hospital_index is not None:
+            self.__hospital_index.add(table, hospital_entry.identity_key)
         if (json_response := response.json()) and isinstance(json_response, dict):
             return json_response
         return None
 
 
+# **************************************************** #
+# Units of work open on a worker, drained on shutdown.
+# **************************************************** #
+class M3OUOWDrainGate:
+    """Tracks the open units of work and the commits they flush.
+
+    Once draining, no unit of work is opened. Those still open after
+    the drain timeout have their pending transactions rejected, while
+    commits already flushing run to the end, so every transaction is
+    either stored whole or not sent at all.
+    """
+
+    def __init__(self) -> None:
+        self.draining = False
+        self.__open_uows: set[M3OHospitalUOWAsyncImpl] = set()
+        self.__flushes: set[asyncio.Task[None]] = set()
+        self.__closed: asyncio.Event | None = None
+
+    def __len__(self) -> int:
+        return len(self.__open_uows)
+
+    def open(self, uow: M3OHospitalUOWAsyncImpl) -> None:
+        if self.draining:
+            raise ServiceUnavailableError("M3O units of work are draining.", 1)
+        self.__open_uows.add(uow)
+
+    def close(self, uow: M3OHospitalUOWAsyncImpl) -> None:
+        self.__open_uows.discard(uow)
+        if not self.__open_uows and self.__closed is not None:
+            self.__closed.set()
+
+    def flush(self, transactions: Awaitable[None]) -> asyncio.Task[None]:
+        """Run the transactions of a commit to the end, even if cancelled."""
+        flush_task = asyncio.ensure_future(transactions)
+        self.__flushes.add(flush_task)
+        flush_task.add_done_callback(self.__flushes.discard)
+        return flush_task
+
+    async def drain(self, timeout_seconds: float) -> int:
+        """Wait for open units of work, then reject those left.
+
+        Returns the number of pending transactions rejected.
+        """
+        self.draining = True
+        if self.__open_uows:
+            self.__closed = asyncio.Event()
+            try:
+                await asyncio.wait_for(self.__closed.wait(), timeout_seconds)
+            except asyncio.TimeoutError:
+                pass
+        rejected_transactions = sum(uow.reject() for uow in list(self.__open_uows))
+        if self.__flushes:
+            await asyncio.gather(*self.__flushes, return_exceptions=True)
+        return rejected_transactions
+
+
 # **************************************************** #
 # Hospital unit of work for M3O Postgres database.
 # **************************************************** #
 class M3OHospitalUOWAsyncImpl(InterfaceHospitalUOW):
-    hospital_repo = M3OHospitalRepoImpl(M3O_API_TOKEN)
+    def __init__(
+        self,
+        hospital_repo: M3OHospitalRepoImpl,
+        drain_gate: M3OUOWDrainGate | None = None,
+    ) -> None:
+        # Each unit of work owns its repo and so its pending transactions.
+        self.hospital_repo = hospital_repo
+        self.__drain_gate = M3OUOWDrainGate() if drain_gate is None else drain_gate
+        self.__rejected = False
 
     async def commit(self) -> Literal[UOWSessionFlag.COMMITTED]:
         """Commit the unit of work."""
-        M3O_DB_LOGGER.info("Committing unit of work")
-        await self.hospital_repo.set_executable()
-        M3O_DB_LOGGER.info("committed.")
+        if self.__rejected:
+            raise ServiceUnavailableError("M3O unit of work was drained.", 1)
+        M3O_DB_LOGGER.debug("Committing unit of work")
+        # Shielded, so a request cancelled mid commit still stores it whole.
+        await asyncio.shield(
+            self.__drain_gate.flush(self.hospital_repo.set_executable())
+        )
+        M3O_DB_LOGGER.debug("committed.")
         return UOWSessionFlag.COMMITTED
 
+    def reject(self) -> int:
+        """Drop the pending transactions of a drained unit of work.
+
+        Returns how many were dropped.
+        """
+        self.__rejected = True
+        rejected_transactions = len(self.hospital_repo.pending_transaction)
+        self.hospital_repo.discard()
+        self.__drain_gate.close(self)
+        return rejected_transactions
+
     async def rollback(self) -> Literal[UOWSessionFlag.ROLLED_BACK]:
         """Rollback the unit of work."""
         M3O_DB_LOGGER.error(
             "Rolling back unit of work.\nClearing pending transactions."
         )
-        self.hospital_repo.pending_transaction.clear()
+        self.hospital_repo.discard()
         return UOWSessionFlag.ROLLED_BACK
 
     async def close(self) -> Literal[UOWSessionFlag.CLOSED]:
         """Close the unit of work."""
-        M3O_DB_LOGGER.info("Closing M3O UOW session.")
+        M3O_DB_LOGGER.debug("Closing M3O UOW session.")
         return UOWSessionFlag.CLOSED
 
     async def __aenter__(self) -> M3OHospitalUOWAsyncImpl:
         """Create a storage session using unit of work."""
         try:
-            M3O_DB_LOGGER.info("Setting db_session to UOW repo.")
+            M3O_DB_LOGGER.debug("Setting db_session to UOW repo.")
+            self.__drain_gate.open(self)
             # TODO: These should be changed from AssertionError
             if not self.hospital_repo.has_session_key:
                 raise AssertionError("Session key is not set.")
+            if not self.hospital_repo.has_http_client:
+                raise AssertionError("Http client is not open.")
             if self.hospital_repo.pending_transaction:
                 error_msg = (
                     "There are pending transactions.\n"
@@ -205,7 +501,8 @@ class M3OHospitalUOWAsyncImpl(InterfaceHospitalUOW):
                 raise AssertionError(error_msg)
             return self
         except (AttributeError, AssertionError, pydantic.ValidationError) as e:
-            M3O_DB_LOGGER.error(f"Error: {e}\n{self}", exc_info=e, stack_info=True)
+            self.__drain_gate.close(self)
+            M3O_DB_LOGGER.error("Error: %s\n%s", e, self, exc_info=e)
             raise e
 
     async def __aexit__(
@@ -215,19 +512,156 @@ class M3OHospitalUOWAsyncImpl(InterfaceHospitalUOW):
         exc_tb: str,
     ) -> None:
         """Exit context manager."""
+        self.__drain_gate.close(self)
         if exc_val:
-            M3O_DB_LOGGER.exception(
-                "Error during UOW exit.", exc_info=exc_type, stack_info=True
+            M3O_DB_LOGGER.error(
+                "Error during UOW exit.",
+                exc_info=exc_val if isinstance(exc_val, BaseException) else None,
             )
             await self.rollback()
             M3O_DB_LOGGER.error("Error: Closed M3O UOW session.")
             if exc_type == AttributeError:
                 raise AttributeError(exc_val)
             if exc_type == MissingRegistrationFieldError:
-                M3O_DB_LOGGER.error(
-                    exc_val, exc_info=(type(exc_type), BaseException(exc_tb), None)
-                )
                 if isinstance(exc_val, str):
                     raise AssertionError
                 model: ValidationModelType = exc_val.model
                 raise MissingRegistrationFieldError(str(exc_type), model, exc_tb)
+
+
+# **************************************************** #
+# Builds a fresh M3O unit of work per request over the
+# worker wide http connection pool.
+# **************************************************** #
+class M3OHospitalUOWFactory:
+    """Factory of per request M3O units of work sharing one http pool."""
+
+    def __init__(
+        self,
+        m3o_token: str | None = M3O_API_TOKEN,
+        http_settings: m3o_client.M3OHttpSettings | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        hospital_index: dedup_index.HospitalDedupIndex | None = None,
+        resilience_settings: m3o_client.M3OResilienceSettings | None = None,
+    ) -> None:
+        self.__m3o_token = m3o_token
+        self.__http_settings = http_settings
+        self.__transport = transport
+        self.__http_client: httpx.AsyncClient | None = None
+        self.__hospital_index = (
+            dedup_index.HospitalDedupIndex(dedup_index.M3ODedupSettings().authoritative)
+            if hospital_index is None
+            else hospital_index
+        )
+        self.__resilience_settings = (
+            resilience_settings or m3o_client.M3OResilienceSettings()
+        )
+        # Shared by the units of work, so every request sees M3O is down.
+        self.__circuit_breaker = resilience.CircuitBreaker(
+            "m3o",
+            self.__resilience_settings.breaker_failure_threshold,
+            self.__resilience_settings.breaker_reset_seconds,
+        )
+        self.__drain_gate = M3OUOWDrainGate()
+
+    @property
+    def hospital_index(self) -> dedup_index.HospitalDedupIndex:
+        return self.__hospital_index
+
+    @property
+    def circuit_breaker(self) -> resilience.CircuitBreaker:
+        return self.__circuit_breaker
+
+    async def startup(self) -> None:
+        """Open the shared keep-alive connection pool once per worker.
+
+        Then warm an authoritative dedup index. If the tables cannot
+        be read the index stays cold, and every save checks M3O.
+        """
+        if self.__drain_gate.draining:
+            self.__drain_gate = M3OUOWDrainGate()
+        if self.__http_client is None or self.__http_client.is_closed:
+            M3O_DB_LOGGER.info("Opening M3O http connection pool.")
+            self.__http_client = m3o_client.build_async_client(
+                self.__http_settings, self.__transport
+            )
+        if self.__hospital_index.authoritative and not self.__hospital_index.is_warm:
+            await self._warm_hospital_index()
+
+    async def _warm_hospital_index(self) -> None:
+        hospital_repo = self.__build_repo(hospital_index=None)
+        try:
+            for table in ("unverified_hospital", "unclaimed_hospital"):
+                self.__hospital_index.warm(
+                    table, await hospital_repo.read_identity_keys(table)
+                )
+        except (
+            httpx.HTTPError,
+            ServiceUnavailableError,
+            ValueError,
+            AttributeError,
+        ) as e:
+            M3O_DB_LOGGER.error("Could not warm hospital dedup index: %s", e)
+            return
+        self.__hospital_index.mark_warm()
+        M3O_DB_LOGGER.info(
+            "Warmed hospital dedup index with %d keys.", len(self.__hospital_index)
+        )
+
+    async def drain(self) -> None:
+        """Let open units of work commit, then reject what is left pending.
+
+        New units of work are refused with ServiceUnavailableError, so
+        their clients retry on another worker.
+        """
+        M3O_DB_LOGGER.info(
+            "Draining %d open M3O units of work.", len(self.__drain_gate)
+        )
+        rejected_transactions = await self.__drain_gate.drain(
+            self.__resilience_settings.drain_timeout_seconds
+        )
+        if rejected_transactions:
+            M3O_DB_LOGGER.error(
+                "Rejected %d pending M3O transactions on drain.",
+                rejected_transactions,
+            )
+
+    async def shutdown(self) -> None:
+        """Close the shared connection pool."""
+        if self.__http_client is not None:
+            M3O_DB_LOGGER.info("Closing M3O http connection pool.")
+            await self.__http_client.aclose()
+            self.__http_client = None
+
+    def pool_stats(self) -> dict[str, int]:
+        """Connections of the http pool: open, in use and the most allowed."""
+        if self.__http_client is None:
+            return {}
+        return m3o_client.pool_stats(self.__http_client)
+
+    def health(self) -> dict[str, object]:
+        """Whether M3O is taking calls, as seen by the circuit breaker."""
+        return {
+            "status": (
+                "ok"
+                if self.__circuit_breaker.state == resilience.CircuitState.Closed
+                else "degraded"
+            ),
+            **self.__circuit_breaker.health(),
+        }
+
+    def __call__(self) -> M3OHospitalUOWAsyncImpl:
+        return M3OHospitalUOWAsyncImpl(
+            self.__build_repo(self.__hospital_index), self.__drain_gate
+        )
+
+    def __build_repo(
+        self, hospital_index: dedup_index.HospitalDedupIndex | None
+    ) -> M3OHospitalRepoImpl:
+        return M3OHospitalRepoImpl(
+            self.__m3o_token,
+            self.__http_client,
+            hospital_index,
+            self.__resilience_settings,
+            self.__circuit_breaker,
+        )
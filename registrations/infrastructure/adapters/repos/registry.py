@@ -0,0 +1,60 @@
+"""Repo backends by name, each imported only once it is selected.
+
+A backend is the `module:attribute` import path of its unit of work
+factory, so a worker imports the one adapter it runs with, and its
+client libraries, rather than every adapter there is. Other packages
+add backends under the `registrations.repo_backends` entry point
+group, e.g. in pyproject.toml:
+
+    [tool.poetry.plugins."registrations.repo_backends"]
+    mongo = "my_package.repo:MongoHospitalUOWFactory"
+"""
+from __future__ import annotations
+
+import importlib.metadata
+import pkgutil
+from typing import Callable, cast
+
+from registrations.domain.repo.registration_repo import HospitalUOWFactory
+
+ENTRY_POINT_GROUP = "registrations.repo_backends"
+
+REPO_BACKENDS = {
+    "m3o": "registrations.infrastructure.adapters.repos.postgres_m3o.repo:M3OHospitalUOWFactory",
+    "memory": "registrations.infrastructure.adapters.repos.memory.repo:InMemoryHospitalUOWFactory",
+    "postgres": "registrations.infrastructure.adapters.repos.postgres.repo:PostgresHospitalUOWFactory",
+    "sqlite": "registrations.infrastructure.adapters.repos.sqlite.repo:SQLiteHospitalUOWFactory",
+}
+
+# Backends storing hospitals where every worker process sees them and
+# checks for duplicates. Any other backend may only run one worker.
+SHARED_REPO_BACKENDS = frozenset({"m3o", "postgres", "sqlite"})
+
+
+def entry_point_backends() -> dict[str, str]:
+    """Backends added by installed packages, by name."""
+    entry_points = importlib.metadata.entry_points()
+    # python 3.9 groups entry points in a dict, later versions select them.
+    group_entry_points = (
+        entry_points.select(group=ENTRY_POINT_GROUP)
+        if hasattr(entry_points, "select")
+        else entry_points.get(ENTRY_POINT_GROUP, ())
+    )
+    return {entry_point.name: entry_point.value for entry_point in group_entry_points}
+
+
+def backend_import_path(name: str) -> str:
+    # Installed packages are only looked up for names not built in.
+    if (import_path := REPO_BACKENDS.get(name)) is None:
+        import_path = entry_point_backends().get(name)
+    if import_path is None:
+        raise ValueError(f"Unknown REPO_BACKEND: {name}.")
+    return import_path
+
+
+def load_backend(name: str) -> Callable[[], HospitalUOWFactory]:
+    """Import the unit of work factory class of the named backend."""
+    return cast(
+        Callable[[], HospitalUOWFactory],
+        pkgutil.resolve_name(backend_import_path(name)),
+    )
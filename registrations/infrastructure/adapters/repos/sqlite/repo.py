@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import sqlite3
+from typing import Any, AsyncIterator, Callable, Literal, Optional, TypeVar
+
+import pydantic
+
+from registrations.domain.hospital import registration
+from registrations.domain.repo.registration_repo import (
+    HospitalPageType,
+    InterfaceEntityHospitalRepo,
+    InterfaceHospitalReadRepo,
+    InterfaceHospitalRepo,
+    InterfaceHospitalUOW,
+    UOWSessionFlag,
+    build_page_cursor,
+    parse_page_range,
+)
+from registrations.infrastructure.adapters.repos.sqlite import sqlite_schema
+from registrations.utils import log_utils, metrics
+from registrations.utils.errors import (
+    MissingRegistrationFieldError,
+    RecordAlreadyExistsError,
+)
+
+SQLITE_DB_LOGGER = log_utils.get_logger(__name__)
+
+T = TypeVar("T")
+
+# Rows fetched per round trip to the session thread when reading.
+READ_PAGE_SIZE = 1000
+
+
+class SQLiteSettings(pydantic.BaseSettings, env_prefix="SQLITE_"):
+    """Settings of the SQLite adapter, e.g. SQLITE_PATH=/storage/hospitals.db."""
+
+    path: str = "registrations.db"
+    # Statements are prepared once and reused from this cache.
+    cached_statements: pydantic.PositiveInt = 256
+
+
+class SQLiteSession:
+    """A SQLite connection owned by a single background thread.
+
+    Every call runs on that thread so the event loop never blocks
+    on disk I/O, and writes are serialized as SQLite requires.
+    """
+
+    def __init__(self, settings: SQLiteSettings | None = None) -> None:
+        self.__settings = settings or SQLiteSettings()
+        self.__executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self.__connection: sqlite3.Connection | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.__connection is not None
+
+    async def open(self) -> None:
+        self.__executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="sqlite-session"
+        )
+        self.__connection = await self.__run_in_thread(self.__connect)
+        await self.run(sqlite_schema.create_schema)
+
+    async def close(self) -> None:
+        if self.__connection is not None:
+            await self.__run_in_thread(self.__connection.close)
+            self.__connection = None
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
+
+    async def run(self, query: Callable[..., T], *args: Any) -> T:
+        """Run query(connection, *args) on the session thread."""
+        if self.__connection is None:
+            raise AssertionError("SQLite session is not open.")
+        return await self.__run_in_thread(query, self.__connection, *args)
+
+    async def __run_in_thread(self, func: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, func, *args)
+
+    def __connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.__settings.path,
+            cached_statements=self.__settings.cached_statements,
+        )
+        for pragma in sqlite_schema.PRAGMAS:
+            connection.execute(pragma)
+        return connection
+
+
+class SQLiteHospitalRepoImpl(
+    InterfaceHospitalRepo, InterfaceEntityHospitalRepo, InterfaceHospitalReadRepo
+):
+    """Hospital repo buffering rows until its unit of work commits."""
+
+    def __init__(self, session: SQLiteSession | None = None) -> None:
+        self.__session = session
+        self.pending_rows: dict[str, list[tuple]] = {
+            table: [] for table in sqlite_schema.TABLE_COLUMNS
+        }
+        self.__pending_keys: set[str] = set()
+
+    @property
+    def session(self) -> SQLiteSession:
+        if self.__session is None:
+            raise AssertionError("SQLite session is not set.")
+        return self.__session
+
+    @property
+    def has_pending_rows(self) -> bool:
+        return bool(self.__pending_keys)
+
+    async def save_unverified_hospital(
+        self, **kwargs: registration.HospitalEntryDictType
+    ) -> registration.UnverifiedRegisteredHospital:
+        try:
+            hospital_entry = registration.HospitalEntryAggregate.build_factory(**kwargs)
+            if not isinstance(
+                hospital_entry, registration.UnverifiedRegisteredHospital
+            ):
+                raise AssertionError
+            await self._stage_record(hospital_entry)
+            return hospital_entry
+        except (pydantic.ValidationError, AttributeError, AssertionError) as e:
+            SQLITE_DB_LOGGER.error("Error: %s\n%s Parameters are %s", e, self, kwargs)
+            raise e
+
+    async def save_unclaimed_hospital(
+        self, **kwargs: registration.HospitalEntryDictType
+    ) -> registration.UnclaimedHospital:
+        try:
+            hospital_entry = registration.HospitalEntryAggregate.build_factory(**kwargs)
+            if not isinstance(hospital_entry, registration.UnclaimedHospital):
+                raise AssertionError
+            await self._stage_record(hospital_entry)
+            return hospital_entry
+        except (pydantic.ValidationError, AttributeError, AssertionError) as e:
+            SQLITE_DB_LOGGER.error("Error: %s\n%s Parameters are %s", e, self, kwargs)
+            raise e
+
+    async def save_hospital(
+        self, hospital_entry: registration.HospitalEntityType
+    ) -> registration.HospitalEntityType:
+        await self._stage_record(hospital_entry)
+        return hospital_entry
+
+    async def iter_hospitals(self) -> AsyncIterator[registration.HospitalEntityType]:
+        async for page in self.iter_hospital_pages(READ_PAGE_SIZE):
+            for hospital_entry, _ in page:
+                yield hospital_entry
+
+    @property
+    def hospital_tables(self) -> tuple[str, ...]:
+        return tuple(sqlite_schema.TABLE_COLUMNS)
+
+    async def iter_hospital_pages(
+        self,
+        page_size: int,
+        cursor: Optional[str] = None,
+        table: Optional[str] = None,
+    ) -> AsyncIterator[HospitalPageType]:
+        """Pages in rowid order, a cursor being the rowid in its table."""
+        tables, after_rowid = parse_page_range(cursor, self.hospital_tables, int, table)
+        after_rowid = after_rowid or 0
+        for table in tables:
+            while rows := await self.session.run(
+                sqlite_schema.select_page, table, after_rowid, page_size
+            ):
+                yield [
+                    (
+                        sqlite_schema.parse_from_row(table, tuple(row)),
+                        build_page_cursor(table, rowid),
+                    )
+                    for rowid, *row in rows
+                ]
+                after_rowid = rows[-1][0]
+            after_rowid = 0
+
+    async def flush(self) -> None:
+        """Insert every buffered row in a single transaction.
+
+        Raises RecordAlreadyExistsError, inserting none, if another unit
+        of work stored one of the hospitals since it was staged.
+        """
+        try:
+            if self.has_pending_rows:
+                await self.session.run(sqlite_schema.insert_rows, self.pending_rows)
+        except sqlite3.IntegrityError as e:
+            raise RecordAlreadyExistsError("Record already exists.") from e
+        finally:
+            self.discard()
+
+    def discard(self) -> None:
+        for rows in self.pending_rows.values():
+            rows.clear()
+        self.__pending_keys.clear()
+
+    async def _stage_record(
+        self, hospital_entry: registration.HospitalEntityType
+    ) -> None:
+        """Buffer the record unless its identity is already stored or staged."""
+        table = sqlite_schema.table_of(hospital_entry)
+        identity_key = hospital_entry.identity_key
+        if identity_key in self.__pending_keys:
+            raise RecordAlreadyExistsError("Record already exists.")
+        with metrics.STAGE_LATENCY.time("existence_check"):
+            record_exists = await self.session.run(
+                sqlite_schema.record_exists, table, identity_key
+            )
+        if record_exists:
+            raise RecordAlreadyExistsError("Record already exists.")
+        self.pending_rows[table].append(sqlite_schema.parse_to_row(hospital_entry))
+        self.__pending_keys.add(identity_key)
+
+
+# **************************************************** #
+# Hospital unit of work over a local SQLite file.
+# **************************************************** #
+class SQLiteHospitalUOWAsyncImpl(InterfaceHospitalUOW):
+    def __init__(self, session: SQLiteSession) -> None:
+        self.hospital_repo = SQLiteHospitalRepoImpl(session)
+
+    async def commit(self) -> Literal[UOWSessionFlag.COMMITTED]:
+        """Write the buffered rows of the unit of work."""
+        await self.hospital_repo.flush()
+        return UOWSessionFlag.COMMITTED
+
+    async def rollback(self) -> Literal[UOWSessionFlag.ROLLED_BACK]:
+        """Discard the buffered rows of the unit of work."""
+        SQLITE_DB_LOGGER.error("Rolling back unit of work.")
+        self.hospital_repo.discard()
+        return UOWSessionFlag.ROLLED_BACK
+
+    async def close(self) -> Literal[UOWSessionFlag.CLOSED]:
+        """Close the unit of work."""
+        return UOWSessionFlag.CLOSED
+
+    async def __aenter__(self) -> SQLiteHospitalUOWAsyncImpl:
+        """Create a storage session using unit of work."""
+        if not self.hospital_repo.session.is_open:
+            raise AssertionError("SQLite session is not open.")
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Exception,
+        exc_val: str | MissingRegistrationFieldError,
+        exc_tb: str,
+    ) -> None:
+        """Exit context manager, discarding uncommitted rows."""
+        if exc_val:
+            SQLITE_DB_LOGGER.error("Error during UOW exit: %s", exc_val)
+            await self.rollback()
+        self.hospital_repo.discard()
+
+
+# **************************************************** #
+# Builds a fresh SQLite unit of work per request over
+# the worker wide SQLite session.
+# **************************************************** #
+class SQLiteHospitalUOWFactory:
+    """Factory of per request units of work sharing one SQLite session."""
+
+    def __init__(self, settings: SQLiteSettings | None = None) -> None:
+        self.__session = SQLiteSession(settings)
+
+    async def startup(self) -> None:
+        """Open the SQLite file in WAL mode and create the schema."""
+        if not self.__session.is_open:
+            SQLITE_DB_LOGGER.info("Opening SQLite session.")
+            await self.__session.open()
+
+    async def shutdown(self) -> None:
+        """Close the SQLite session."""
+        SQLITE_DB_LOGGER.info("Closing SQLite session.")
+        await self.__session.close()
+
+    def __call__(self) -> SQLiteHospitalUOWAsyncImpl:
+        return SQLiteHospitalUOWAsyncImpl(self.__session)
@@ -0,0 +1,163 @@
+"""Tables, statements and row mapping of the SQLite adapter.
+
+These functions block and are run on the session's own thread.
+"""
+from __future__ import annotations
+
+import datetime
+import sqlite3
+import uuid
+
+import ujson
+
+from registrations.domain.hospital import registration
+
+UNVERIFIED_TABLE = "unverified_hospital"
+UNCLAIMED_TABLE = "unclaimed_hospital"
+
+BASE_COLUMNS = (
+    ("id", "TEXT PRIMARY KEY"),
+    ("identity_key", "TEXT NOT NULL"),
+    ("name", "TEXT NOT NULL"),
+    ("ownership_type", "TEXT"),
+    ("street", "TEXT NOT NULL"),
+    ("street2", "TEXT"),
+    ("city", "TEXT NOT NULL"),
+    ("state", "TEXT NOT NULL"),
+    ("country", "TEXT NOT NULL"),
+    ("contact_number", "TEXT NOT NULL"),
+    ("latitude", "REAL"),
+    ("longitude", "REAL"),
+    ("added_since", "TEXT NOT NULL"),
+)
+TABLE_COLUMNS = {
+    UNVERIFIED_TABLE: BASE_COLUMNS + (("key_contact_registrar", "TEXT NOT NULL"),),
+    UNCLAIMED_TABLE: BASE_COLUMNS + (("verified_status", "TEXT NOT NULL"),),
+}
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+def column_names(table: str) -> list[str]:
+    return [name for name, _ in TABLE_COLUMNS[table]]
+
+
+def create_schema(connection: sqlite3.Connection) -> None:
+    """Create the tables and their identity index if they do not exist.
+
+    The unique identity_key index serves the existence check and
+    fails the commit of the later of two racing units of work.
+    """
+    with connection:
+        for table, columns in TABLE_COLUMNS.items():
+            column_ddl = ", ".join(f"{name} {ddl}" for name, ddl in columns)
+            connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({column_ddl})")
+            connection.execute(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_identity_idx "
+                f"ON {table} (identity_key)"
+            )
+
+
+def record_exists(
+    connection: sqlite3.Connection, table: str, identity_key: str
+) -> bool:
+    cursor = connection.execute(
+        f"SELECT 1 FROM {table} WHERE identity_key = ? LIMIT 1", (identity_key,)
+    )
+    return cursor.fetchone() is not None
+
+
+def insert_rows(connection: sqlite3.Connection, rows_by_table: dict[str, list]) -> None:
+    """Insert the rows of a unit of work in a single transaction.
+
+    A row whose identity was stored since its existence check fails
+    the transaction with sqlite3.IntegrityError, so none is inserted.
+    """
+    with connection:
+        for table, rows in rows_by_table.items():
+            if rows:
+                columns = column_names(table)
+                connection.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})",
+                    rows,
+                )
+
+
+def select_page(
+    connection: sqlite3.Connection, table: str, after_rowid: int, limit: int
+) -> list[tuple]:
+    """Rows after the rowid in rowid order, each led by its rowid."""
+    cursor = connection.execute(
+        f"SELECT rowid, {', '.join(column_names(table))} FROM {table} "
+        "WHERE rowid > ? ORDER BY rowid LIMIT ?",
+        (after_rowid, limit),
+    )
+    return cursor.fetchall()
+
+
+def table_of(hospital_entry: registration.HospitalEntityType) -> str:
+    if isinstance(hospital_entry, registration.UnclaimedHospital):
+        return UNCLAIMED_TABLE
+    return UNVERIFIED_TABLE
+
+
+def parse_to_row(hospital_entry: registration.HospitalEntityType) -> tuple:
+    """Parses a hospital entry to a row in its table's column order."""
+    address = hospital_entry.address
+    geo_location = hospital_entry.geo_location
+    row: tuple = (
+        hospital_entry.hospital_id.hex,
+        hospital_entry.identity_key,
+        hospital_entry.hospital_name,
+        hospital_entry.ownership_type and str(hospital_entry.ownership_type.value),
+        address.street,
+        address.street2,
+        address.city,
+        address.state,
+        address.country,
+        hospital_entry.phone_number.number,
+        geo_location and geo_location.latitude,
+        geo_location and geo_location.longitude,
+        hospital_entry.added_since.isoformat(),
+    )
+    if isinstance(hospital_entry, registration.UnclaimedHospital):
+        return row + (str(hospital_entry.verified_status.value),)
+    return row + (ujson.dumps(hospital_entry.key_contact_registrar.dict()),)
+
+
+def parse_from_row(table: str, row: tuple) -> registration.HospitalEntityType:
+    """Parses a row of the table back to its hospital entry."""
+    columns = dict(zip(column_names(table), row))
+    hospital_dict: dict = {
+        "hospital_id": uuid.UUID(hex=columns["id"]),
+        "hospital_name": columns["name"],
+        "ownership_type": columns["ownership_type"],
+        "address": {
+            "street": columns["street"],
+            "street2": columns["street2"],
+            "city": columns["city"],
+            "state": columns["state"],
+            "country": columns["country"],
+        },
+        "phone_number": {"number": columns["contact_number"]},
+        "geo_location": (
+            {"latitude": columns["latitude"], "longitude": columns["longitude"]}
+            if columns["latitude"] is not None
+            else None
+        ),
+        "added_since": datetime.datetime.fromisoformat(columns["added_since"]),
+    }
+    if table == UNCLAIMED_TABLE:
+        hospital_dict["verified_status"] = registration.VerificationStatus(
+            columns["verified_status"]
+        )
+    else:
+        hospital_dict["key_contact_registrar"] = ujson.loads(
+            columns["key_contact_registrar"]
+        )
+    return registration.HospitalEntryAggregate.build_factory(**hospital_dict)
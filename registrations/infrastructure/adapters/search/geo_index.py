@@ -0,0 +1,297 @@
+"""In-memory spatial index over the geo locations of registered hospitals.
+
+Locations are bucketed in a grid of latitude/longitude cells. A query
+searches rings of cells around its own cell, nearest first, and stops
+once no unsearched cell can hold anything closer than what it found.
+Distances are great circle (haversine) distances in kilometres.
+"""
+from __future__ import annotations
+
+import array
+import heapq
+import math
+import uuid
+from typing import Iterable, Iterator, Sequence
+
+from registrations.domain.hospital import registration
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+# About 11 km along a meridian.
+CELL_DEGREES = 0.1
+
+GeoPoint = tuple[float, float]
+GeoMatch = tuple[registration.HospitalEntityType, float]
+
+
+class GeoCell:
+    """Columns of the hospitals in one grid cell."""
+
+    __slots__ = ("positions", "latitudes", "longitudes", "cos_latitudes")
+
+    def __init__(self) -> None:
+        self.positions = array.array("l")
+        self.latitudes = array.array("d")
+        self.longitudes = array.array("d")
+        self.cos_latitudes = array.array("d")
+
+    def append(self, position: int, latitude: float, longitude: float) -> None:
+        self.positions.append(position)
+        self.latitudes.append(math.radians(latitude))
+        self.longitudes.append(math.radians(longitude))
+        self.cos_latitudes.append(math.cos(math.radians(latitude)))
+
+    def distances(self, latitude: float, longitude: float) -> list[float]:
+        """Haversine distances in km from a point given in radians."""
+        cos_latitude = math.cos(latitude)
+        sin, asin, sqrt = math.sin, math.asin, math.sqrt
+        return [
+            2
+            * EARTH_RADIUS_KM
+            * asin(
+                min(
+                    1.0,
+                    sqrt(
+                        sin((cell_latitude - latitude) / 2) ** 2
+                        + cos_latitude
+                        * cell_cos_latitude
+                        * sin((cell_longitude - longitude) / 2) ** 2
+                    ),
+                )
+            )
+            for cell_latitude, cell_longitude, cell_cos_latitude in zip(
+                self.latitudes, self.longitudes, self.cos_latitudes
+            )
+        ]
+
+
+def haversine_km(origin: GeoPoint, destination: GeoPoint) -> float:
+    """Great circle distance in km between two (latitude, longitude) points."""
+    latitude, longitude = map(math.radians, origin)
+    other_latitude, other_longitude = map(math.radians, destination)
+    haversine = (
+        math.sin((other_latitude - latitude) / 2) ** 2
+        + math.cos(latitude)
+        * math.cos(other_latitude)
+        * math.sin((other_longitude - longitude) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(haversine)))
+
+
+class GeoHospitalIndex:
+    """Grid index answering nearest and within radius queries."""
+
+    def __init__(self, cell_degrees: float = CELL_DEGREES) -> None:
+        if not 0 < cell_degrees <= 90:
+            raise ValueError("cell_degrees must be in (0, 90].")
+        self.cell_degrees = cell_degrees
+        self.__latitude_cells = math.ceil(180 / cell_degrees)
+        self.__longitude_cells = math.ceil(360 / cell_degrees)
+        self.__entries: list[registration.HospitalEntityType] = []
+        self.__indexed_ids: set[uuid.UUID] = set()
+        self.__cells: dict[tuple[int, int], GeoCell] = {}
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def add(self, hospital_entry: registration.HospitalEntityType) -> None:
+        self.extend((hospital_entry,))
+
+    def extend(
+        self, hospital_entries: Iterable[registration.HospitalEntityType]
+    ) -> None:
+        """Index hospitals with a geo location, skipping ids already indexed."""
+        for hospital_entry in hospital_entries:
+            geo_location = hospital_entry.geo_location
+            if geo_location is None or hospital_entry.hospital_id in self.__indexed_ids:
+                continue
+            self.__indexed_ids.add(hospital_entry.hospital_id)
+            cell_key = self.__cell_of(geo_location.latitude, geo_location.longitude)
+            if (cell := self.__cells.get(cell_key)) is None:
+                cell = self.__cells[cell_key] = GeoCell()
+            cell.append(
+                len(self.__entries), geo_location.latitude, geo_location.longitude
+            )
+            self.__entries.append(hospital_entry)
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int = 10,
+        radius_km: float | None = None,
+    ) -> list[GeoMatch]:
+        """The limit nearest hospitals, optionally within radius_km, nearest first."""
+        return self.nearest_many([(latitude, longitude)], limit, radius_km)[0]
+
+    def within(
+        self, latitude: float, longitude: float, radius_km: float
+    ) -> list[GeoMatch]:
+        """Every hospital within radius_km, nearest first."""
+        return self.nearest(latitude, longitude, len(self.__entries), radius_km)
+
+    def nearest_many(
+        self,
+        points: Sequence[GeoPoint],
+        limit: int = 10,
+        radius_km: float | None = None,
+    ) -> list[list[GeoMatch]]:
+        """Nearest hospitals of many points, in the order of the points.
+
+        Points falling in the same cell share a single walk over the
+        rings around it; each cell of a ring is then measured against
+        every point of the group that is not settled yet.
+        """
+        results: list[list[GeoMatch]] = [[] for _ in points]
+        if limit <= 0:
+            return results
+        groups: dict[tuple[int, int], list[int]] = {}
+        for point_idx, point in enumerate(points):
+            groups.setdefault(self.__cell_of(*point), []).append(point_idx)
+        for center, point_ids in groups.items():
+            best: dict[int, list[tuple[float, int]]] = {idx: [] for idx in point_ids}
+            for ring, cells in self.__rings(center):
+                point_ids = [
+                    idx
+                    for idx in point_ids
+                    if not self.__is_settled(
+                        points[idx], center, ring - 1, best[idx], limit, radius_km
+                    )
+                ]
+                if not point_ids:
+                    break
+                for point_idx in point_ids:
+                    self.__measure(
+                        points[point_idx], cells, best[point_idx], limit, radius_km
+                    )
+            for point_idx, heap in best.items():
+                results[point_idx] = [
+                    (self.__entries[position], -negative_distance)
+                    for negative_distance, position in sorted(heap, reverse=True)
+                ]
+        return results
+
+    @staticmethod
+    def __measure(
+        point: GeoPoint,
+        cells: list[GeoCell],
+        heap: list[tuple[float, int]],
+        limit: int,
+        radius_km: float | None,
+    ) -> None:
+        """Push the hospitals of the cells into the point's max heap."""
+        radians = (math.radians(point[0]), math.radians(point[1]))
+        for cell in cells:
+            for position, distance in zip(cell.positions, cell.distances(*radians)):
+                if radius_km is not None and distance > radius_km:
+                    continue
+                if len(heap) < limit:
+                    heapq.heappush(heap, (-distance, position))
+                elif distance < -heap[0][0]:
+                    heapq.heapreplace(heap, (-distance, position))
+
+    def __is_settled(
+        self,
+        point: GeoPoint,
+        center: tuple[int, int],
+        ring: int,
+        heap: list[tuple[float, int]],
+        limit: int,
+        radius_km: float | None,
+    ) -> bool:
+        """Whether no cell outside the rings up to ring can improve the result."""
+        lower_bound_km = self.__outside_bound_km(point, center, ring)
+        if radius_km is not None and radius_km < lower_bound_km:
+            return True
+        return len(heap) == limit and -heap[0][0] <= lower_bound_km
+
+    def __cell_of(self, latitude: float, longitude: float) -> tuple[int, int]:
+        latitude_cell = min(
+            int((latitude + 90) // self.cell_degrees), self.__latitude_cells - 1
+        )
+        longitude_cell = int(self.__wrap(longitude) // self.cell_degrees)
+        return latitude_cell, min(longitude_cell, self.__longitude_cells - 1)
+
+    @staticmethod
+    def __wrap(longitude: float) -> float:
+        """Degrees east of the antimeridian, in [0, 360)."""
+        return (longitude + 180) % 360
+
+    def __rings(self, center: tuple[int, int]) -> Iterator[tuple[int, list[GeoCell]]]:
+        """Rings of occupied cells around the center cell, innermost first."""
+        visited: set[tuple[int, int]] = set()
+        max_ring = max(self.__latitude_cells, self.__longitude_cells // 2)
+        for ring in range(max_ring + 1):
+            if len(visited) >= len(self.__cells):
+                return
+            cells = []
+            for cell_key in self.__ring_keys(center, ring):
+                if cell_key not in visited and (cell := self.__cells.get(cell_key)):
+                    visited.add(cell_key)
+                    cells.append(cell)
+            yield ring, cells
+            if 8 * ring > len(self.__cells):
+                # Sparse grid: sweep the remaining cells as one last ring.
+                yield ring + 1, [
+                    cell
+                    for cell_key, cell in self.__cells.items()
+                    if cell_key not in visited
+                ]
+                return
+
+    def __ring_keys(
+        self, center: tuple[int, int], ring: int
+    ) -> Iterator[tuple[int, int]]:
+        center_latitude, center_longitude = center
+        for latitude_cell in range(center_latitude - ring, center_latitude + ring + 1):
+            if not 0 <= latitude_cell < self.__latitude_cells:
+                continue
+            on_edge = abs(latitude_cell - center_latitude) == ring
+            step = 1 if on_edge else max(1, 2 * ring)
+            for longitude_cell in range(
+                center_longitude - ring, center_longitude + ring + 1, step
+            ):
+                yield latitude_cell, longitude_cell % self.__longitude_cells
+
+    def __outside_bound_km(
+        self, point: GeoPoint, center: tuple[int, int], ring: int
+    ) -> float:
+        """Lower bound of the distance to any cell outside the rings up to ring."""
+        latitude, longitude = point
+        center_latitude, center_longitude = center
+        if ring < 0:
+            return 0.0
+        south = (center_latitude - ring) * self.cell_degrees - 90
+        north = (center_latitude + ring + 1) * self.cell_degrees - 90
+        latitude_gap = min(
+            latitude - south if south > -90 else math.inf,
+            north - latitude if north < 90 else math.inf,
+        )
+        if 2 * ring + 1 >= self.__longitude_cells:
+            # The rings span every longitude.
+            return latitude_gap * KM_PER_DEGREE
+        # The cells outside the rings form one arc, from the west edge of
+        # the first to the east edge of the last; the last cell of the
+        # grid is narrower when cell_degrees does not divide 360.
+        arc_west = (
+            (center_longitude + ring + 1) % self.__longitude_cells * self.cell_degrees
+        )
+        arc_east = min(
+            ((center_longitude - ring - 1) % self.__longitude_cells + 1)
+            * self.cell_degrees,
+            360,
+        )
+        arc_degrees = (arc_east - arc_west) % 360
+        east_of_arc_west = (self.__wrap(longitude) - arc_west) % 360
+        longitude_gap = (
+            0.0
+            if east_of_arc_west <= arc_degrees
+            else min(360 - east_of_arc_west, east_of_arc_west - arc_degrees)
+        )
+        # The nearest point of a meridian longitude_gap away.
+        meridian_km = EARTH_RADIUS_KM * math.asin(
+            math.cos(math.radians(latitude))
+            * math.sin(math.radians(min(longitude_gap, 90)))
+        )
+        return min(latitude_gap * KM_PER_DEGREE, meridian_km)
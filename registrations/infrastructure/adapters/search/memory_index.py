@@ -0,0 +1,196 @@
+"""In-memory look ahead index over registered hospitals.
+
+Hospital name, city and state are split into tokens. A sorted token
+vocabulary answers prefix queries with a binary search, and a trigram
+index over the vocabulary catches misspelt tokens that match no prefix.
+Each token maps to the positions of the hospitals containing it.
+"""
+from __future__ import annotations
+
+import bisect
+import collections
+import heapq
+import re
+import uuid
+from typing import Iterable
+
+from registrations.domain.hospital import registration
+
+TOKEN_REGEX = re.compile(r"\w+")
+
+# Name matches rank above city and state matches.
+NAME_WEIGHT = 1.0
+CITY_WEIGHT = 0.6
+STATE_WEIGHT = 0.4
+
+EXACT_MATCH_SCORE = 1.0
+PREFIX_MATCH_SCORE = 0.8
+FUZZY_MATCH_SCORE = 0.6
+MIN_TRIGRAM_SIMILARITY = 0.4
+
+# Bounds keeping a lookup in the low milliseconds on large indexes.
+MAX_PREFIX_EXPANSIONS = 50
+MAX_FUZZY_EXPANSIONS = 10
+MAX_CANDIDATES = 2000
+
+
+def tokenize(text: str | None) -> list[str]:
+    return TOKEN_REGEX.findall(text.casefold()) if text else []
+
+
+def trigrams(token: str) -> set[str]:
+    padded = f"  {token} "
+    return {padded[idx : idx + 3] for idx in range(len(padded) - 2)}
+
+
+class InMemoryHospitalSearchIndex:
+    """Prefix and trigram index ranking hospitals for a search query."""
+
+    def __init__(self) -> None:
+        self.__entries: list[registration.HospitalEntityType] = []
+        self.__entry_tokens: list[dict[str, float]] = []
+        self.__name_lengths: list[int] = []
+        self.__positions: dict[uuid.UUID, int] = {}
+        self.__postings: dict[str, list[int]] = {}
+        self.__vocabulary: list[str] = []
+        self.__trigrams: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def add(self, hospital_entry: registration.HospitalEntityType) -> None:
+        self.extend((hospital_entry,))
+
+    def extend(
+        self, hospital_entries: Iterable[registration.HospitalEntityType]
+    ) -> None:
+        """Index hospitals, skipping ids already indexed."""
+        new_tokens: list[str] = []
+        for hospital_entry in hospital_entries:
+            if hospital_entry.hospital_id in self.__positions:
+                continue
+            position = len(self.__entries)
+            self.__positions[hospital_entry.hospital_id] = position
+            self.__entries.append(hospital_entry)
+            self.__name_lengths.append(len(hospital_entry.hospital_name))
+            entry_tokens = self.__weigh_tokens(hospital_entry)
+            self.__entry_tokens.append(entry_tokens)
+            for token in entry_tokens:
+                if (postings := self.__postings.get(token)) is None:
+                    self.__postings[token] = [position]
+                    new_tokens.append(token)
+                else:
+                    postings.append(position)
+        self.__add_to_vocabulary(new_tokens)
+
+    def search(
+        self, search_query: str, limit: int = 10
+    ) -> list[registration.HospitalEntityType]:
+        """Hospitals matching every query token, best matches first.
+
+        The query token with the fewest postings picks and scores the
+        candidates; the other query tokens then filter and add to them.
+        Ties go to the shorter name.
+        """
+        query_tokens = tokenize(search_query)
+        if not query_tokens or limit <= 0:
+            return []
+        token_matches = [self.__match_token(token) for token in query_tokens]
+        if not all(token_matches):
+            return []
+        driver = min(
+            token_matches,
+            key=lambda matches: sum(len(self.__postings[token]) for token in matches),
+        )
+        scores = self.__score_candidates(driver)
+        for matches in token_matches:
+            if matches is not driver:
+                scores = self.__rescore(scores, matches)
+        return [
+            self.__entries[position]
+            for _, _, position in heapq.nlargest(
+                limit,
+                (
+                    (score, -self.__name_lengths[position], position)
+                    for position, score in scores.items()
+                ),
+            )
+        ]
+
+    def __score_candidates(self, matches: dict[str, float]) -> dict[int, float]:
+        """Positions holding a matched token, best matches first."""
+        scores: dict[int, float] = {}
+        for token in sorted(matches, key=matches.__getitem__, reverse=True):
+            match_score = matches[token]
+            for position in self.__postings[token]:
+                score = match_score * self.__entry_tokens[position][token]
+                if score > scores.get(position, 0.0):
+                    scores[position] = score
+            if len(scores) >= MAX_CANDIDATES:
+                break
+        return scores
+
+    def __rescore(
+        self, scores: dict[int, float], matches: dict[str, float]
+    ) -> dict[int, float]:
+        """Keep the positions also holding a matched token, adding its score."""
+        rescored: dict[int, float] = {}
+        for position, score in scores.items():
+            best_score = 0.0
+            for token, weight in self.__entry_tokens[position].items():
+                if (match_score := matches.get(token)) and (
+                    match_score * weight > best_score
+                ):
+                    best_score = match_score * weight
+            if best_score:
+                rescored[position] = score + best_score
+        return rescored
+
+    def __match_token(self, query_token: str) -> dict[str, float]:
+        """Vocabulary tokens the query token may stand for, with a score."""
+        matches: dict[str, float] = {}
+        start = bisect.bisect_left(self.__vocabulary, query_token)
+        for token in self.__vocabulary[start : start + MAX_PREFIX_EXPANSIONS]:
+            if not token.startswith(query_token):
+                break
+            matches[token] = (
+                EXACT_MATCH_SCORE if token == query_token else PREFIX_MATCH_SCORE
+            )
+        if matches or len(query_token) < 3:
+            return matches
+        query_trigrams = trigrams(query_token)
+        shared_counts: collections.Counter[str] = collections.Counter()
+        for trigram in query_trigrams:
+            shared_counts.update(self.__trigrams.get(trigram, ()))
+        similarities = (
+            (shared / (len(query_trigrams) + len(token) + 1 - shared), token)
+            for token, shared in shared_counts.items()
+        )
+        for similarity, token in heapq.nlargest(MAX_FUZZY_EXPANSIONS, similarities):
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                matches[token] = similarity * FUZZY_MATCH_SCORE
+        return matches
+
+    def __add_to_vocabulary(self, new_tokens: list[str]) -> None:
+        if len(new_tokens) == 1:
+            bisect.insort(self.__vocabulary, new_tokens[0])
+        elif new_tokens:
+            self.__vocabulary = sorted(self.__vocabulary + new_tokens)
+        for token in new_tokens:
+            for trigram in trigrams(token):
+                self.__trigrams.setdefault(trigram, set()).add(token)
+
+    @staticmethod
+    def __weigh_tokens(
+        hospital_entry: registration.HospitalEntityType,
+    ) -> dict[str, float]:
+        """Tokens of the entry with the weight of the best field holding them."""
+        entry_tokens: dict[str, float] = {}
+        for text, weight in (
+            (hospital_entry.address.state, STATE_WEIGHT),
+            (hospital_entry.address.city, CITY_WEIGHT),
+            (hospital_entry.hospital_name, NAME_WEIGHT),
+        ):
+            for token in tokenize(text):
+                entry_tokens[token] = weight
+        return entry_tokens
@@ -0,0 +1,199 @@
+"""Email domain verification that never waits on DNS.
+
+Registrations only check the syntax of an email inline. Whether its
+domain accepts mail is looked up in a cache of domain verdicts; an
+unknown domain passes and gets its MX records resolved in the
+background, so the next registration with that domain sees the verdict.
+
+Background checks share one resolver and a bounded number of them
+resolve at a time. Past max_pending_checks, unknown domains are not
+checked, and stay unknown until a later registration finds room.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import time
+from typing import Optional
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+import email_validator  # type: ignore  # Does not have a PEP 561 compliant package.
+import pydantic
+from email_validator import EmailNotValidError
+
+from registrations.domain.services.hospital_registration_services import (
+    InterfaceEmailVerificationService,
+)
+from registrations.utils import log_utils, metrics
+
+EMAIL_VERIFICATION_LOGGER = log_utils.get_logger(__name__)
+
+EMAIL_DOMAIN_CHECKS_SKIPPED = metrics.Counter(
+    "registrations_email_domain_checks_skipped_total",
+    "Unknown email domains left unchecked as max_pending_checks were pending.",
+)
+
+
+class EmailVerificationSettings(
+    pydantic.BaseSettings, env_prefix="EMAIL_VERIFICATION_"
+):
+    """Settings of email domain checks, e.g. EMAIL_VERIFICATION_OFFLINE=true."""
+
+    # Air gapped nodes only check the syntax and never resolve domains.
+    offline: bool = False
+    positive_ttl_seconds: pydantic.PositiveFloat = 24 * 60 * 60
+    negative_ttl_seconds: pydantic.PositiveFloat = 60 * 60
+    resolve_timeout_seconds: pydantic.PositiveFloat = 2.0
+    cache_size: pydantic.PositiveInt = 10_000
+    max_concurrent_checks: pydantic.PositiveInt = 8
+    max_pending_checks: pydantic.PositiveInt = 1_000
+
+
+class DomainVerdictCache:
+    """Bounded cache of domain verdicts, each expiring after its ttl.
+
+    Domains accepting mail are kept for the positive ttl, the others
+    for the shorter negative ttl so a fixed domain recovers quickly.
+    """
+
+    def __init__(
+        self,
+        positive_ttl_seconds: float,
+        negative_ttl_seconds: float,
+        maxsize: int,
+    ) -> None:
+        self.positive_ttl_seconds = positive_ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.maxsize = maxsize
+        self.__verdicts: collections.OrderedDict[
+            str, tuple[bool, float]
+        ] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__verdicts)
+
+    def get(self, domain: str) -> Optional[bool]:
+        """The verdict of the domain, None when unknown or expired."""
+        if (cached := self.__verdicts.get(domain)) is None:
+            return None
+        verdict, expires_at = cached
+        if expires_at <= time.monotonic():
+            del self.__verdicts[domain]
+            return None
+        return verdict
+
+    def put(self, domain: str, verdict: bool) -> None:
+        ttl_seconds = (
+            self.positive_ttl_seconds if verdict else self.negative_ttl_seconds
+        )
+        self.__verdicts[domain] = (verdict, time.monotonic() + ttl_seconds)
+        self.__verdicts.move_to_end(domain)
+        if len(self.__verdicts) > self.maxsize:
+            self.__verdicts.popitem(last=False)
+
+    def clear(self) -> None:
+        self.__verdicts.clear()
+
+
+class EmailDomainVerificationService(InterfaceEmailVerificationService):
+    """Checks email syntax inline and email domains in the background."""
+
+    settings = EmailVerificationSettings()
+    domain_cache = DomainVerdictCache(
+        settings.positive_ttl_seconds,
+        settings.negative_ttl_seconds,
+        settings.cache_size,
+    )
+    # Background checks, referenced until done so they are not collected.
+    _domain_checks: dict[str, asyncio.Task] = {}
+    # Created on the first check, so importing does not read resolv.conf
+    # and the semaphore belongs to the running event loop.
+    _resolver: Optional[dns.asyncresolver.Resolver] = None
+    _resolve_slots: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def is_valid_domain(cls, email: pydantic.EmailStr) -> bool:
+        """Checks the syntax and the cached verdict of the domain.
+
+        Unknown domains are valid until a background check says otherwise.
+        """
+        try:
+            validated_email = email_validator.validate_email(
+                email, check_deliverability=False
+            )
+        except EmailNotValidError:
+            return False
+        domain = validated_email.ascii_domain
+        if (verdict := cls.domain_cache.get(domain)) is not None:
+            return verdict
+        cls.schedule_domain_check(domain)
+        return True
+
+    @classmethod
+    def schedule_domain_check(cls, domain: str) -> None:
+        """Check the domain on the running event loop, once at a time.
+
+        The domain is left unchecked when max_pending_checks are pending.
+        """
+        if cls.settings.offline or domain in cls._domain_checks:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if len(cls._domain_checks) >= cls.settings.max_pending_checks:
+            EMAIL_DOMAIN_CHECKS_SKIPPED.inc()
+            return
+        domain_check = loop.create_task(cls.check_domain(domain))
+        cls._domain_checks[domain] = domain_check
+        domain_check.add_done_callback(lambda _: cls._domain_checks.pop(domain, None))
+
+    @classmethod
+    async def check_domain(cls, domain: str) -> Optional[bool]:
+        """Resolve whether the domain accepts mail and cache the verdict.
+
+        Like email_validator, a domain without MX records may still
+        receive mail on its A or AAAA address; a null MX refuses it.
+        Resolver failures and timeouts leave the domain unknown. At most
+        max_concurrent_checks resolve at a time; the others wait.
+        """
+        if cls.settings.offline:
+            return None
+        if cls._resolver is None:
+            cls._resolver = dns.asyncresolver.Resolver()
+            cls._resolver.lifetime = cls.settings.resolve_timeout_seconds
+        if cls._resolve_slots is None:
+            cls._resolve_slots = asyncio.Semaphore(cls.settings.max_concurrent_checks)
+        try:
+            async with cls._resolve_slots:
+                verdict = await cls.__resolve_mail_domain(cls._resolver, domain)
+        except dns.exception.DNSException as e:
+            EMAIL_VERIFICATION_LOGGER.info(
+                "Could not check the email domain %s: %r", domain, e
+            )
+            return None
+        cls.domain_cache.put(domain, verdict)
+        return verdict
+
+    @staticmethod
+    async def __resolve_mail_domain(
+        resolver: dns.asyncresolver.Resolver, domain: str
+    ) -> bool:
+        try:
+            mx_answer = await resolver.resolve(domain, "MX")
+            return any(mx_record.exchange.to_text() != "." for mx_record in mx_answer)
+        except dns.resolver.NXDOMAIN:
+            return False
+        except dns.resolver.NoAnswer:
+            pass
+        for record_type in ("A", "AAAA"):
+            try:
+                await resolver.resolve(domain, record_type)
+                return True
+            except dns.resolver.NXDOMAIN:
+                return False
+            except dns.resolver.NoAnswer:
+                continue
+        return False
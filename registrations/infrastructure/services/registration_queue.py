@@ -0,0 +1,193 @@
+"""Registrations accepted up front and stored by background workers.
+
+A registration is validated while the client waits, then queued with
+a ticket and answered with 202 Accepted. Workers store the queued
+hospitals through the unit of work, so the client does not wait on
+the repo backend. The ticket reports pending until a worker is done
+with it, then created, duplicate or failed. While the backend is known
+to be down, workers wait for it rather than fail the tickets.
+
+Tickets are kept in the worker process that accepted them, so the
+launcher refuses to run the queue in several workers.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import uuid
+from typing import Optional, Sequence, Type
+
+import pydantic
+
+from registrations.domain import dto
+from registrations.domain.repo.registration_repo import (
+    HospitalUOWFactory,
+    InterfaceHospitalIndex,
+)
+from registrations.domain.services.application_services import (
+    InterfaceRegistrationService,
+)
+from registrations.domain.services.hospital_registration_services import (
+    HospitalEntityType,
+)
+from registrations.utils import log_utils, metrics
+from registrations.utils.errors import (
+    RecordAlreadyExistsError,
+    RegistrationQueueFullError,
+    ServiceUnavailableError,
+)
+
+REGISTRATION_QUEUE_LOGGER = log_utils.get_logger(__name__)
+
+QUEUED_REGISTRATIONS = metrics.Gauge(
+    "registrations_queued_registrations",
+    "Accepted registrations waiting for a background worker.",
+)
+
+
+class RegistrationQueueSettings(
+    pydantic.BaseSettings, env_prefix="REGISTRATION_QUEUE_"
+):
+    """Settings of the queue, e.g. REGISTRATION_QUEUE_ENABLED=true.
+
+    When enabled, /register-hospital answers 202 Accepted with a
+    ticket instead of 201 Created. A full queue answers 503.
+    """
+
+    enabled: bool = False
+    max_size: pydantic.conint(gt=0) = 1000  # type: ignore[valid-type]
+    workers: pydantic.conint(gt=0) = 4  # type: ignore[valid-type]
+    max_tickets: pydantic.conint(gt=0) = 100_000  # type: ignore[valid-type]
+    drain_timeout_seconds: pydantic.confloat(ge=0) = 30  # type: ignore[valid-type]
+
+
+class RegistrationQueue:
+    """Bounded queue of validated hospitals and the workers storing them."""
+
+    def __init__(
+        self,
+        registration_service: Type[InterfaceRegistrationService],
+        settings: RegistrationQueueSettings | None = None,
+    ) -> None:
+        self.registration_service = registration_service
+        self.settings = settings or RegistrationQueueSettings()
+        # Made by start, on the event loop its workers run on.
+        self.__queue: Optional[asyncio.Queue[tuple[str, HospitalEntityType]]] = None
+        # Oldest first, so the oldest tickets are forgotten first.
+        self.__tickets: collections.OrderedDict[
+            str, dto.RegistrationTicket
+        ] = collections.OrderedDict()
+        self.__workers: list[asyncio.Task[None]] = []
+        self.__hospital_uow_async: Optional[HospitalUOWFactory] = None
+        self.__hospital_indexes: Sequence[InterfaceHospitalIndex] = ()
+        QUEUED_REGISTRATIONS.set_function(lambda: {(): len(self)})
+
+    def __len__(self) -> int:
+        return 0 if self.__queue is None else self.__queue.qsize()
+
+    async def start(
+        self,
+        hospital_uow_async: HospitalUOWFactory,
+        hospital_indexes: Sequence[InterfaceHospitalIndex] = (),
+    ) -> None:
+        """Start the workers storing through the unit of work factory."""
+        self.__hospital_uow_async = hospital_uow_async
+        self.__hospital_indexes = hospital_indexes
+        self.__queue = asyncio.Queue(self.settings.max_size)
+        self.__workers = [
+            asyncio.create_task(self.__work(), name=f"registration-worker-{worker}")
+            for worker in range(self.settings.workers)
+        ]
+
+    def submit(self, hospital_entry: HospitalEntityType) -> dto.RegistrationTicket:
+        """Queue a validated hospital and return its pending ticket."""
+        if self.__queue is None or not self.__workers:
+            raise RegistrationQueueFullError("Registration queue is not running.")
+        ticket = dto.RegistrationTicket(
+            ticket=uuid.uuid4().hex,
+            status=dto.RegistrationTicketStatus.Pending,
+            hospital_id=str(hospital_entry.hospital_id),
+        )
+        try:
+            self.__queue.put_nowait((ticket.ticket, hospital_entry))
+        except asyncio.QueueFull as e:
+            raise RegistrationQueueFullError("Registration queue is full.") from e
+        self.__set_ticket(ticket)
+        return ticket
+
+    def ticket(self, ticket_id: str) -> Optional[dto.RegistrationTicket]:
+        return self.__tickets.get(ticket_id)
+
+    async def drain(self, timeout_seconds: Optional[float] = None) -> None:
+        """Store the queued hospitals, then stop the workers.
+
+        Hospitals still queued after the timeout are left unstored.
+        """
+        if self.__queue is None or not self.__workers:
+            return
+        timeout_seconds = (
+            self.settings.drain_timeout_seconds
+            if timeout_seconds is None
+            else timeout_seconds
+        )
+        try:
+            await asyncio.wait_for(self.__queue.join(), timeout_seconds)
+        except asyncio.TimeoutError:
+            REGISTRATION_QUEUE_LOGGER.error(
+                "Drain timed out with %d registrations left unstored.", len(self)
+            )
+        for worker in self.__workers:
+            worker.cancel()
+        await asyncio.gather(*self.__workers, return_exceptions=True)
+        self.__workers = []
+
+    async def __work(self) -> None:
+        if self.__queue is None:
+            raise AssertionError("Registration queue is not started.")
+        while True:
+            ticket_id, hospital_entry = await self.__queue.get()
+            try:
+                await self.__persist(ticket_id, hospital_entry)
+            finally:
+                self.__queue.task_done()
+
+    async def __persist(
+        self, ticket_id: str, hospital_entry: HospitalEntityType
+    ) -> None:
+        if self.__hospital_uow_async is None:
+            raise AssertionError("Registration queue is not started.")
+        status = dto.RegistrationTicketStatus.Created
+        error = None
+        try:
+            while True:
+                try:
+                    await self.registration_service.persist_hospital_entry(
+                        self.__hospital_uow_async,
+                        hospital_entry,
+                        self.__hospital_indexes,
+                    )
+                    break
+                except ServiceUnavailableError as e:
+                    # The ticket stays pending until the backend is back.
+                    await asyncio.sleep(e.retry_after_seconds)
+        except RecordAlreadyExistsError as e:
+            status, error = dto.RegistrationTicketStatus.Duplicate, str(e)
+        except Exception as e:  # pylint: disable=broad-except
+            # A worker outlives any one registration; the ticket reports the error.
+            REGISTRATION_QUEUE_LOGGER.error(
+                "Could not store registration %s: %s", ticket_id, e, exc_info=e
+            )
+            status, error = dto.RegistrationTicketStatus.Failed, str(e)
+        self.__set_ticket(
+            dto.RegistrationTicket(
+                ticket=ticket_id,
+                status=status,
+                hospital_id=str(hospital_entry.hospital_id),
+                error=error,
+            )
+        )
+
+    def __set_ticket(self, ticket: dto.RegistrationTicket) -> None:
+        self.__tickets[ticket.ticket] = ticket
+        while len(self.__tickets) > self.settings.max_tickets:
+            self.__tickets.popitem(last=False)
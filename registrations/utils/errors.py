@@ -33,3 +33,25 @@ class RecordAlreadyExistsError(Exception):
 
     def __init__(self, error_msg: str):
         super().__init__(error_msg)
+
+
+class RegistrationQueueFullError(Exception):
+    """Raised when the queue of accepted registrations is full."""
+
+    def __init__(self, error_msg: str):
+        super().__init__(error_msg)
+
+
+class ServiceUnavailableError(Exception):
+    """Raised when a backend is known to be down, to be retried after a while."""
+
+    def __init__(self, error_msg: str, retry_after_seconds: float):
+        super().__init__(error_msg)
+        self.retry_after_seconds = retry_after_seconds
+
+
+class InvalidExportCursorError(Exception):
+    """Raised when an export cursor was not issued by the repo read."""
+
+    def __init__(self, error_msg: str):
+        super().__init__(error_msg)
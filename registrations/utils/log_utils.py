@@ -0,0 +1,261 @@
+"""Loggers whose records are formatted and written off the event loop.
+
+A logger from get_logger hands its records to a bounded queue. One
+listener thread per process formats them, as JSON lines by default,
+and writes them out. So a call on the event loop only checks the
+level, the sampler and puts a record on the queue. Messages are
+%-style templates formatted on the listener thread, e.g.
+`LOGGER.error("Invalid entry %s: %s", hospital_name, e)`.
+
+Warnings and errors are sampled by signature: the logger, level,
+message template and exception type. Each signature is let through a
+burst of times per window. The records dropped meanwhile are counted
+on the next one let through, as `suppressed`. A full queue drops
+records rather than wait.
+"""
+from __future__ import annotations
+
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import pydantic
+
+from registrations.utils import metrics
+
+# Signatures kept by the sampler before expired windows are dropped.
+MAX_SAMPLED_SIGNATURES = 1024
+
+# Attributes every record has; any other attribute came in `extra`.
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", logging.INFO, "", 0, "", None, None).__dict__
+) | {"message", "asctime", "suppressed"}
+
+LOG_RECORDS_DROPPED = metrics.Counter(
+    "registrations_log_records_dropped_total",
+    "Log records dropped by reason: sampled or queue_full.",
+    ("reason",),
+)
+
+
+class LoggingSettings(pydantic.BaseSettings, env_prefix="LOG_"):
+    """Settings of the service loggers, e.g. LOG_LEVEL=DEBUG.
+
+    A sample burst of 0 lets every warning and error through.
+    """
+
+    level: str = "INFO"
+    json_format: bool = True
+    queue_size: pydantic.conint(gt=0) = 10_000  # type: ignore[valid-type]
+    sample_burst: pydantic.conint(ge=0) = 10  # type: ignore[valid-type]
+    sample_window_seconds: pydantic.confloat(gt=0) = 60  # type: ignore[valid-type]
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats a record as one line of JSON, with any `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.datetime.fromtimestamp(
+                record.created, datetime.timezone.utc
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if suppressed := getattr(record, "suppressed", 0):
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        formatted = super().format(record)
+        if suppressed := getattr(record, "suppressed", 0):
+            formatted += f" [{suppressed} similar suppressed]"
+        return formatted
+
+
+class SignatureSampler(logging.Filter):
+    """Lets a burst of warnings and errors per signature through per window."""
+
+    def __init__(
+        self,
+        burst: int,
+        window_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__()
+        self.burst = burst
+        self.window_seconds = window_seconds
+        self.__clock = clock
+        # Per signature: the window start, records let through and dropped.
+        self.__windows: dict[tuple[str, int, str, str], list[float]] = {}
+
+    @staticmethod
+    def signature(record: logging.LogRecord) -> tuple[str, int, str, str]:
+        template = record.msg if isinstance(record.msg, str) else type(record.msg)
+        exc_type = record.exc_info[0] if record.exc_info else None
+        return (
+            record.name,
+            record.levelno,
+            str(template),
+            getattr(exc_type, "__name__", ""),
+        )
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or not self.burst:
+            return True
+        signature = self.signature(record)
+        now = self.__clock()
+        window = self.__windows.get(signature)
+        if window is None or now - window[0] >= self.window_seconds:
+            if window is None and len(self.__windows) >= MAX_SAMPLED_SIGNATURES:
+                self.__drop_expired(now)
+            if window is not None and window[2]:
+                record.suppressed = int(window[2])
+            self.__windows[signature] = [now, 1, 0]
+            return True
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+        window[2] += 1
+        LOG_RECORDS_DROPPED.inc("sampled")
+        return False
+
+    def __drop_expired(self, now: float) -> None:
+        for signature, window in list(self.__windows.items()):
+            if now - window[0] >= self.window_seconds:
+                del self.__windows[signature]
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Puts records on the queue as they are, dropping them when it is full.
+
+    Unlike QueueHandler, records are not formatted before they are
+    queued, as the queue is only read by a thread of this process.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc("queue_full")
+
+
+class StandardStreamHandler(logging.StreamHandler):
+    """Writes to sys.stdout or sys.stderr as they are when a record is written."""
+
+    def __init__(self, stream_name: str) -> None:
+        super().__init__()
+        self.stream_name = stream_name
+
+    @property  # type: ignore[override]
+    def stream(self) -> Any:
+        return getattr(sys, self.stream_name)
+
+    @stream.setter
+    def stream(self, _stream: Any) -> None:
+        pass
+
+
+class _LogPipeline:
+    """The queue handler shared by the loggers and its listener thread."""
+
+    def __init__(self, settings: LoggingSettings) -> None:
+        self.settings = settings
+        self.queue: queue.Queue[logging.LogRecord] = queue.Queue(settings.queue_size)
+        self.queue_handler = NonBlockingQueueHandler(self.queue)
+        self.queue_handler.addFilter(
+            SignatureSampler(settings.sample_burst, settings.sample_window_seconds)
+        )
+        formatter = JSONFormatter() if settings.json_format else TextFormatter()
+        # Errors go to stderr, as before the loggers were queued.
+        stdout_handler = StandardStreamHandler("stdout")
+        stdout_handler.addFilter(lambda record: record.levelno < logging.ERROR)
+        stderr_handler = StandardStreamHandler("stderr")
+        stderr_handler.setLevel(logging.ERROR)
+        for handler in (stdout_handler, stderr_handler):
+            handler.setFormatter(formatter)
+        self.__handlers = (stdout_handler, stderr_handler)
+        self.__listener: Optional[logging.handlers.QueueListener] = None
+        self.__lock = threading.Lock()
+
+    def start(self) -> None:
+        with self.__lock:
+            if self.__listener is None:
+                self.__listener = logging.handlers.QueueListener(
+                    self.queue, *self.__handlers, respect_handler_level=True
+                )
+                self.__listener.start()
+
+    def stop(self) -> None:
+        """Write the queued records and stop the listener thread."""
+        with self.__lock:
+            if self.__listener is not None:
+                self.__listener.stop()
+                self.__listener = None
+
+    def restart_after_fork(self) -> None:
+        # A forked child has the queue but not the listener thread. The
+        # queue is replaced too: its lock may have been held by that
+        # thread, and the records left in it are the parent's to write.
+        self.__listener = None
+        self.__lock = threading.Lock()
+        self.queue = queue.Queue(self.settings.queue_size)
+        self.queue_handler.queue = self.queue
+        self.start()
+
+
+_pipeline: Optional[_LogPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def _get_pipeline() -> _LogPipeline:
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = _LogPipeline(LoggingSettings())
+            _pipeline.start()
+            atexit.register(_pipeline.stop)
+            os.register_at_fork(after_in_child=_pipeline.restart_after_fork)
+        return _pipeline
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger writing through the process wide queue, not to root's handlers."""
+    pipeline = _get_pipeline()
+    logger = logging.getLogger(name)
+    if pipeline.queue_handler not in logger.handlers:
+        logger.addHandler(pipeline.queue_handler)
+    logger.setLevel(pipeline.settings.level.upper())
+    logger.propagate = False
+    return logger
+
+
+def flush() -> None:
+    """Wait until every queued record is written, e.g. before a test asserts."""
+    if _pipeline is not None:
+        _pipeline.stop()
+        _pipeline.start()
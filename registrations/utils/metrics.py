@@ -0,0 +1,252 @@
+"""In process metrics served in the Prometheus text exposition format.
+
+Recording is a dict lookup and an addition, so it is cheap enough
+for the hot path. Values owned elsewhere, e.g. pool usage, are read
+by callbacks only when the metrics are rendered.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import time
+from types import TracebackType
+from typing import Callable, Iterator, Optional, Sequence, Type
+
+LabelValues = tuple[str, ...]
+SampleCallback = Callable[[], dict[LabelValues, float]]
+
+# Seconds, from a cache hit to a slow remote call.
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class MetricsRegistry:
+    """The metrics of the process, rendered together."""
+
+    def __init__(self) -> None:
+        self.__metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self.__metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self.__metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self.__metrics.values():
+            documentation = metric.documentation.replace("\\", r"\\").replace(
+                "\n", r"\n"
+            )
+            lines.append(f"# HELP {metric.name} {documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    label_pairs = ",".join(
+                        f'{label}="{_escape_label_value(label_value)}"'
+                        for label, label_value in labels
+                    )
+                    lines.append(f"{name}{{{label_pairs}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[MetricsRegistry] = REGISTRY,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[LabelValues, float] = {}
+        self._callback: Optional[SampleCallback] = None
+        if registry is not None:
+            registry.register(self)
+
+    def set_function(self, callback: SampleCallback) -> None:
+        """Read the values from callback whenever they are rendered."""
+        self._callback = callback
+
+    def value(self, *label_values: str) -> float:
+        return self._current_values().get(label_values, 0.0)
+
+    def samples(self) -> Iterator[tuple[str, tuple[tuple[str, str], ...], float]]:
+        for label_values, value in sorted(self._current_values().items()):
+            yield self.name, tuple(zip(self.labelnames, label_values)), value
+
+    def _current_values(self) -> dict[LabelValues, float]:
+        if self._callback is not None:
+            return self._callback()
+        return self._values
+
+
+class Counter(Metric):
+    """A total that only goes up, e.g. of requests."""
+
+    kind = "counter"
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+
+class Gauge(Metric):
+    """A value that goes up and down, e.g. of requests in flight."""
+
+    kind = "gauge"
+
+    def set(self, value: float, *label_values: str) -> None:
+        self._values[label_values] = value
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class _HistogramTimer:
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram: Histogram, label_values: LabelValues) -> None:
+        self.histogram = histogram
+        self.label_values = label_values
+        self.started = 0.0
+
+    def __enter__(self) -> _HistogramTimer:
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+
+
+class Histogram(Metric):
+    """Observations counted in cumulative buckets, e.g. of latencies."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[MetricsRegistry] = REGISTRY,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: a count per bucket and one past the last, then the sum.
+        self.__observations: dict[LabelValues, list[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        if (observations := self.__observations.get(label_values)) is None:
+            observations = self.__observations[label_values] = [0.0] * (
+                len(self.buckets) + 2
+            )
+        observations[bisect.bisect_left(self.buckets, value)] += 1
+        observations[-1] += value
+
+    def time(self, *label_values: str) -> _HistogramTimer:
+        """Observe the seconds spent in a with block."""
+        return _HistogramTimer(self, label_values)
+
+    def count(self, *label_values: str) -> int:
+        observations = self.__observations.get(label_values)
+        return int(sum(observations[:-1])) if observations else 0
+
+    def samples(self) -> Iterator[tuple[str, tuple[tuple[str, str], ...], float]]:
+        for label_values, observations in sorted(self.__observations.items()):
+            labels = tuple(zip(self.labelnames, label_values))
+            cumulative = 0.0
+            for upper_bound, bucket_count in zip(
+                (*self.buckets, math.inf), observations
+            ):
+                cumulative += bucket_count
+                yield (
+                    f"{self.name}_bucket",
+                    (*labels, ("le", _format_value(upper_bound))),
+                    cumulative,
+                )
+            yield f"{self.name}_sum", labels, observations[-1]
+            yield f"{self.name}_count", labels, cumulative
+
+
+# **************************************************** #
+# Metrics of the registrations service.
+# **************************************************** #
+REQUEST_LATENCY = Histogram(
+    "registrations_request_duration_seconds",
+    "Latency of http requests by handler.",
+    ("handler",),
+)
+RESPONSES = Counter(
+    "registrations_responses_total",
+    "Http responses by handler and status code.",
+    ("handler", "status"),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "registrations_requests_in_flight", "Http requests being handled."
+)
+STAGE_LATENCY = Histogram(
+    "registrations_stage_duration_seconds",
+    "Latency of the stages of a registration: validation, existence_check,"
+    " record_create and uow_commit.",
+    ("stage",),
+)
+DUPLICATES = Counter(
+    "registrations_duplicates_total",
+    "Registrations rejected as the hospital exists already.",
+)
+M3O_REQUESTS = Counter(
+    "registrations_m3o_requests_total",
+    "Requests to the M3O DB API by endpoint and status code.",
+    ("endpoint", "status"),
+)
+POOL_CONNECTIONS = Gauge(
+    "registrations_pool_connections",
+    "Connections of the repo backend pool by state: open, in_use and max.",
+    ("state",),
+)
+PHONE_NUMBER_CACHE_LOOKUPS = Counter(
+    "registrations_phone_number_cache_lookups_total",
+    "Phone number validations answered by the cache, by result hit or miss.",
+    ("result",),
+)
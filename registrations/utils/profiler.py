@@ -0,0 +1,182 @@
+"""Sampling profiler of a live worker, switched on and off at runtime.
+
+A background thread reads the stack of the event loop thread at a
+fixed interval and counts each distinct stack. The counts are served
+as collapsed stacks, one `frame;frame;frame count` line per stack,
+which flamegraph.pl, speedscope and inferno read as is. Nothing runs
+while the profiler is stopped.
+"""
+from __future__ import annotations
+
+import collections
+import os
+import random
+import sys
+import threading
+import time
+from types import FrameType
+from typing import Optional
+
+import pydantic
+
+from registrations.utils import log_utils
+
+PROFILER_LOGGER = log_utils.get_logger(__name__)
+
+
+class ProfilerSettings(pydantic.BaseSettings, env_prefix="PROFILER_"):
+    """Settings of the profiler, e.g. PROFILER_ADMIN_TOKEN=secret.
+
+    The profiler endpoints are only served when an admin token is set.
+    Each finished profile is written to the output directory.
+    """
+
+    admin_token: Optional[pydantic.SecretStr] = None
+    output_dir: str = "profiles"
+    interval_ms: pydantic.confloat(gt=0) = 5  # type: ignore[valid-type]
+    max_seconds: pydantic.confloat(gt=0) = 300  # type: ignore[valid-type]
+
+    @pydantic.validator("admin_token", pre=True)
+    @classmethod
+    def blank_token_disables(cls, value: Optional[str]) -> Optional[str]:
+        return value or None
+
+
+def frame_label(frame: FrameType) -> str:
+    # Code objects have a qualified name from python 3.11 on.
+    code_name = getattr(frame.f_code, "co_qualname", frame.f_code.co_name)
+    return f"{frame.f_globals.get('__name__', '?')}:{code_name}"
+
+
+def collapse_stack(frame: Optional[FrameType]) -> str:
+    """The stack from the outermost frame to the given one, `;` separated."""
+    labels: list[str] = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """Counts the stacks of one thread, sampled from a background thread.
+
+    With a request fraction, only that fraction of requests is sampled
+    and stacks are counted only while a sampled request is in flight.
+    Without it, the thread is sampled throughout, idle time included.
+    """
+
+    def __init__(self, settings: ProfilerSettings | None = None) -> None:
+        self.settings = settings or ProfilerSettings()
+        self.__stacks: collections.Counter[str] = collections.Counter()
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__sampler: Optional[threading.Thread] = None
+        self.__active = False
+        self.__request_fraction: Optional[float] = None
+        self.__sampled_requests = 0
+        self.__random = random.Random()
+        self.started_at: Optional[float] = None
+        self.sample_count = 0
+        self.last_output_path: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self.__active
+
+    def start(
+        self,
+        seconds: float,
+        interval_ms: Optional[float] = None,
+        request_fraction: Optional[float] = None,
+        thread_id: Optional[int] = None,
+    ) -> None:
+        """Sample the thread, the calling one by default, for the seconds.
+
+        Stacks of a previous profile are discarded.
+        """
+        if self.running:
+            raise RuntimeError("Profiler is already running.")
+        seconds = min(seconds, self.settings.max_seconds)
+        interval = (interval_ms or self.settings.interval_ms) / 1000
+        with self.__lock:
+            self.__stacks.clear()
+            self.sample_count = 0
+        self.__request_fraction = request_fraction
+        self.__sampled_requests = 0
+        self.__stopped.clear()
+        self.started_at = time.time()
+        self.__active = True
+        self.__sampler = threading.Thread(
+            target=self.__sample,
+            args=(thread_id or threading.get_ident(), interval, seconds),
+            name="sampling-profiler",
+            daemon=True,
+        )
+        self.__sampler.start()
+        PROFILER_LOGGER.info(
+            "Profiling for %ss every %sms, request fraction %s.",
+            seconds,
+            interval * 1000,
+            request_fraction,
+        )
+
+    def stop(self) -> Optional[str]:
+        """Stop sampling and return the path the profile was written to."""
+        if self.__sampler is None:
+            return self.last_output_path
+        self.__stopped.set()
+        self.__sampler.join()
+        self.__sampler = None
+        return self.last_output_path
+
+    def sample_request(self) -> bool:
+        """Whether a starting request is profiled, always False when stopped."""
+        if not self.__active or self.__request_fraction is None:
+            return False
+        return self.__random.random() < self.__request_fraction
+
+    def request_started(self) -> None:
+        self.__sampled_requests += 1
+
+    def request_finished(self) -> None:
+        self.__sampled_requests -= 1
+
+    def collapsed(self) -> str:
+        with self.__lock:
+            stacks = self.__stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def __sample(self, thread_id: int, interval: float, seconds: float) -> None:
+        deadline = time.monotonic() + seconds
+        while not self.__stopped.wait(interval) and time.monotonic() < deadline:
+            if self.__request_fraction is not None and self.__sampled_requests <= 0:
+                continue
+            if (frame := sys._current_frames().get(thread_id)) is None:
+                break
+            stack = collapse_stack(frame)
+            del frame
+            with self.__lock:
+                self.__stacks[stack] += 1
+                self.sample_count += 1
+        self.__active = False
+        self.__write()
+
+    def __write(self) -> None:
+        started = time.strftime("%Y%m%dT%H%M%S", time.gmtime(self.started_at))
+        output_path = os.path.join(
+            self.settings.output_dir, f"profile-{os.getpid()}-{started}.collapsed"
+        )
+        try:
+            os.makedirs(self.settings.output_dir, exist_ok=True)
+            with open(output_path, "w", encoding="utf-8") as output_file:
+                output_file.write(self.collapsed())
+        except OSError as e:
+            PROFILER_LOGGER.error("Error writing profile %s: %s", output_path, e)
+            return
+        self.last_output_path = output_path
+        PROFILER_LOGGER.info(
+            "Wrote %d profile samples to %s.", self.sample_count, output_path
+        )
+
+
+PROFILER = SamplingProfiler()
@@ -0,0 +1,143 @@
+"""Fail fast and bounded retries around calls to a remote backend.
+
+A circuit breaker opens after consecutive failures of a backend and
+then rejects calls at once, instead of each waiting on a backend that
+is down. After a cool off, one trial call is let through: its success
+closes the breaker, its failure opens it again.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional, Type, TypeVar
+
+from registrations.utils import enum_utils, metrics
+from registrations.utils.errors import ServiceUnavailableError
+
+T = TypeVar("T")
+
+# Breakers by name, for their state on /metrics.
+_BREAKERS: dict[str, CircuitBreaker] = {}
+
+BREAKER_OPEN = metrics.Gauge(
+    "registrations_circuit_breaker_open",
+    "1 while the circuit breaker of a backend rejects calls, else 0.",
+    ("breaker",),
+)
+BREAKER_OPEN.set_function(
+    lambda: {
+        (name,): float(breaker.state == CircuitState.Open)
+        for name, breaker in _BREAKERS.items()
+    }
+)
+CALL_RETRIES = metrics.Counter(
+    "registrations_call_retries_total",
+    "Retries of failed idempotent calls to a backend.",
+    ("breaker",),
+)
+
+
+class CircuitState(enum_utils.EnumWithItems):
+    Closed = "closed"
+    Open = "open"
+    HalfOpen = "half_open"
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures for reset_seconds."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        reset_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.__clock = clock
+        self.__failures = 0
+        self.__opened_at: Optional[float] = None
+        # When the trial call was let through, None when there is none.
+        self.__trial_started_at: Optional[float] = None
+        _BREAKERS[name] = self
+
+    @property
+    def state(self) -> CircuitState:
+        if self.__opened_at is None:
+            return CircuitState.Closed
+        if self.retry_after_seconds > 0:
+            return CircuitState.Open
+        return CircuitState.HalfOpen
+
+    @property
+    def retry_after_seconds(self) -> float:
+        """Seconds until a trial call is let through, 0 when not open."""
+        if self.__opened_at is None:
+            return 0.0
+        return max(0.0, self.__opened_at + self.reset_seconds - self.__clock())
+
+    def check(self) -> None:
+        """Let a call through or raise ServiceUnavailableError."""
+        state = self.state
+        if state == CircuitState.Closed:
+            return
+        # A trial that never reported back, e.g. cancelled, is retried.
+        if state == CircuitState.HalfOpen and (
+            self.__trial_started_at is None
+            or self.__clock() - self.__trial_started_at >= self.reset_seconds
+        ):
+            self.__trial_started_at = self.__clock()
+            return
+        raise ServiceUnavailableError(
+            f"{self.name} is unavailable.",
+            self.retry_after_seconds or self.reset_seconds,
+        )
+
+    def record_success(self) -> None:
+        self.__failures = 0
+        self.__opened_at = None
+        self.__trial_started_at = None
+
+    def record_failure(self) -> None:
+        self.__failures += 1
+        if (
+            self.__trial_started_at is not None
+            or self.__failures >= self.failure_threshold
+        ):
+            self.__opened_at = self.__clock()
+        self.__trial_started_at = None
+
+    def health(self) -> dict[str, object]:
+        return {
+            "circuit_breaker": self.state.value,
+            "retry_after_seconds": round(self.retry_after_seconds, 3),
+        }
+
+
+async def call_with_retries(
+    call: Callable[[], Awaitable[T]],
+    attempts: int,
+    base_delay_seconds: float,
+    max_delay_seconds: float,
+    retry_on: tuple[Type[BaseException], ...],
+    breaker_name: str = "",
+) -> T:
+    """Await call, retrying on the errors with jittered exponential backoff.
+
+    Only for idempotent calls. The wait before retry n is random up to
+    base_delay_seconds * 2 ** n, capped by max_delay_seconds.
+    """
+    for attempt in range(attempts - 1):
+        try:
+            return await call()
+        except retry_on:
+            CALL_RETRIES.inc(breaker_name)
+            await asyncio.sleep(
+                random.uniform(
+                    0, min(max_delay_seconds, base_delay_seconds * 2**attempt)
+                )
+            )
+    return await call()
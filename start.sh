@@ -4,5 +4,6 @@ if [ "$ENV" == "test" ];
 then
   python3 -m poetry run hypercorn -k uvloop --bind="0.0.0.0:${LOCAL_PORT}" --debug --reload registrations.infrastructure.adapters.api.app:app
 else
-  python3 -m poetry run hypercorn -k uvloop --bind="0.0.0.0:${LOCAL_PORT}" --reload registrations.infrastructure.adapters.api.app:app
+  # SERVER_WORKERS workers, warmed up before they listen and drained on SIGTERM.
+  exec python3 -m poetry run python -m registrations.infrastructure.adapters.api.launcher
 fi;
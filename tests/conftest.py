@@ -1,4 +1,5 @@
 import logging
+import os
 import random
 import uuid
 from typing import Any
@@ -16,6 +17,8 @@ from registrations.domain.hospital.registration import (
 from registrations.domain.location import location
 from registrations.domain.location.location import Address
 
+# The api bootstrapper picks its adapters from ENV at import time.
+os.environ.setdefault("ENV", "test")
 
 # ************************************************* #
 # Setup pytest anyio fixture.
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import json
+from typing import Any, AsyncIterator, Literal
+from unittest import mock
+
+import httpx
+import pytest
+
+from benchmarks.m3o_stand_in import M3OStandIn
+from registrations.domain.hospital.registration import (
+    HospitalEntryAggregate,
+    HospitalEntryDictType,
+    UnclaimedHospital,
+    UnverifiedRegisteredHospital,
+)
+from registrations.domain.repo.registration_repo import (
+    InterfaceHospitalRepo,
+    InterfaceHospitalUOW,
+    UOWSessionFlag,
+)
+from registrations.domain.services.application_services import (
+    BULK_MAX_LINE_BYTES,
+    HospitalRegistrationApplicationService,
+)
+from registrations.infrastructure.adapters.api import app as api_app
+from registrations.infrastructure.adapters.api import bootstrap
+from registrations.infrastructure.adapters.api.di_builder import (
+    BootStrapDI,
+    DIMapping,
+)
+from registrations.infrastructure.adapters.api.routers import (
+    register_hospital_router,
+)
+from registrations.infrastructure.adapters.repos.postgres_m3o import m3o_client
+from registrations.infrastructure.adapters.repos.postgres_m3o.repo import (
+    M3OHospitalUOWFactory,
+)
+from registrations.utils.errors import RecordAlreadyExistsError
+
+
+# **************************************************** #
+# A repo keeping committed hospital names in memory
+# to exercise the created and duplicate paths.
+# **************************************************** #
+class NameIndexedHospitalRepo(InterfaceHospitalRepo):
+    def __init__(self, committed_names: set[str]) -> None:
+        self.committed_names = committed_names
+        self.pending_names: list[str] = []
+
+    async def _save(self, **kwargs: HospitalEntryDictType) -> Any:
+        hospital_name = str(kwargs["hospital_name"])
+        if hospital_name in self.committed_names:
+            raise RecordAlreadyExistsError("Record already exists.")
+        self.pending_names.append(hospital_name)
+        return HospitalEntryAggregate.build_factory(**kwargs)
+
+    async def save_unverified_hospital(
+        self, **kwargs: HospitalEntryDictType
+    ) -> UnverifiedRegisteredHospital:
+        return await self._save(**kwargs)
+
+    async def save_unclaimed_hospital(
+        self, **kwargs: HospitalEntryDictType
+    ) -> UnclaimedHospital:
+        return await self._save(**kwargs)
+
+
+class NameIndexedHospitalUOW(InterfaceHospitalUOW):
+    def __init__(self, committed_names: set[str]) -> None:
+        self.hospital_repo = NameIndexedHospitalRepo(committed_names)
+        self.commits = 0
+
+    async def commit(self) -> Literal[UOWSessionFlag.COMMITTED]:
+        self.hospital_repo.committed_names.update(self.hospital_repo.pending_names)
+        self.hospital_repo.pending_names.clear()
+        return UOWSessionFlag.COMMITTED
+
+    async def rollback(self) -> Literal[UOWSessionFlag.ROLLED_BACK]:
+        self.hospital_repo.pending_names.clear()
+        return UOWSessionFlag.ROLLED_BACK
+
+    async def close(self) -> Literal[UOWSessionFlag.CLOSED]:
+        return UOWSessionFlag.CLOSED
+
+    async def __aenter__(self) -> NameIndexedHospitalUOW:
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        if exc_val:
+            await self.rollback()
+
+
+def ndjson_line(name: str) -> bytes:
+    return (
+        json.dumps(
+            {
+                "name": name,
+                "ownership_type": "private",
+                "hospital_contact_number": "+919425411234",
+                "verified_status": "verified",
+                "address": {
+                    "street": "Rajaji marg",
+                    "city": "Newark",
+                    "state": "MP",
+                    "country": "IN",
+                },
+            }
+        ).encode()
+        + b"\n"
+    )
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestBulkRegistrationRoute:
+    """Tests the streaming NDJSON bulk registration route."""
+
+    async def test_bulk_registration_streams_one_result_per_line(self) -> None:
+        committed_names = {"Already Listed"}
+        uow_factory = mock.Mock(
+            side_effect=lambda: NameIndexedHospitalUOW(committed_names)
+        )
+        bootstrapper = BootStrapDI(
+            mapping_di=DIMapping(
+                hospital_uow_async=uow_factory,
+                hospital_registration_application_service=HospitalRegistrationApplicationService,
+            )
+        )
+
+        async def request_body() -> AsyncIterator[bytes]:
+            yield ndjson_line("Hospital One")
+            yield b'{"name": "x"}\n\n'
+            # A line split across two chunks.
+            yield ndjson_line("Already Listed")[:20]
+            yield ndjson_line("Already Listed")[20:]
+            yield ndjson_line("Hospital Two").rstrip(b"\n")
+
+        with mock.patch.object(bootstrap, "bootstrapper", bootstrapper):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app.app),
+                base_url="http://test",
+            ) as client:
+                response = await client.post(
+                    "/register-hospitals:bulk?batch_size=2", content=request_body()
+                )
+        assert response.status_code == 200
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert [(result["line"], result["status"]) for result in results] == [
+            (1, "created"),
+            (2, "invalid"),
+            (4, "duplicate"),
+            (5, "created"),
+        ]
+        assert "error" in results[1]
+        assert committed_names == {"Already Listed", "Hospital One", "Hospital Two"}
+        assert uow_factory.call_count == 2
+
+    async def test_repeated_lines_of_a_batch_are_duplicates_on_m3o(self) -> None:
+        stand_in = M3OStandIn()
+        uow_factory = M3OHospitalUOWFactory(
+            "token",
+            http_settings=m3o_client.M3OHttpSettings(api_url="http://m3o.local/v1/db"),
+            transport=httpx.ASGITransport(app=stand_in.build_app()),
+        )
+        bootstrapper = BootStrapDI(
+            mapping_di=DIMapping(
+                hospital_uow_async=uow_factory,
+                hospital_registration_application_service=HospitalRegistrationApplicationService,
+            )
+        )
+        await bootstrapper.run()
+        with mock.patch.object(bootstrap, "bootstrapper", bootstrapper):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app.app),
+                base_url="http://test",
+            ) as client:
+                response = await client.post(
+                    "/register-hospitals:bulk",
+                    content=ndjson_line("Hospital One") * 3,
+                )
+        await bootstrapper.shutdown()
+        assert [json.loads(line)["status"] for line in response.text.splitlines()] == [
+            "created",
+            "duplicate",
+            "duplicate",
+        ]
+        assert len(stand_in.tables["unclaimed_hospital"]) == 1
+
+    async def test_oversized_line_is_invalid_without_being_buffered(self) -> None:
+        committed_names: set[str] = set()
+        bootstrapper = BootStrapDI(
+            mapping_di=DIMapping(
+                hospital_uow_async=lambda: NameIndexedHospitalUOW(committed_names),
+                hospital_registration_application_service=HospitalRegistrationApplicationService,
+            )
+        )
+
+        async def request_body() -> AsyncIterator[bytes]:
+            # Four times the longest line, sent without a newline in 1 KiB chunks.
+            for _ in range(BULK_MAX_LINE_BYTES // 256):
+                yield b"x" * 1024
+            yield b"\n" + ndjson_line("Hospital One")
+
+        with mock.patch.object(bootstrap, "bootstrapper", bootstrapper):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app.app),
+                base_url="http://test",
+            ) as client:
+                response = await client.post(
+                    "/register-hospitals:bulk", content=request_body()
+                )
+        results = [json.loads(line) for line in response.text.splitlines()]
+        assert [(result["line"], result["status"]) for result in results] == [
+            (1, "invalid"),
+            (2, "created"),
+        ]
+        assert str(BULK_MAX_LINE_BYTES) in results[0]["error"]
+        assert committed_names == {"Hospital One"}
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 64])
+    async def test_lines_are_split_and_capped_across_chunks(
+        self, chunk_size: int
+    ) -> None:
+        body = b"ab\n\nabcdefgh\nabcd\nabcdefghij"
+
+        async def chunks() -> AsyncIterator[bytes]:
+            for chunk_start in range(0, len(body), chunk_size):
+                yield body[chunk_start : chunk_start + chunk_size]
+
+        assert [
+            line
+            async for line in register_hospital_router.iter_ndjson_lines(
+                chunks(), max_line_bytes=4
+            )
+        ] == [b"ab", b"", b"abcde", b"abcd", b"abcde"]
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Iterator
+from unittest import mock
+
+import dns.exception
+import dns.resolver
+import pytest
+
+from registrations.domain import dto
+from registrations.domain.services.application_services import (
+    HospitalRegistrationApplicationService,
+)
+from registrations.infrastructure.services import email_verification
+from registrations.infrastructure.services.email_verification import (
+    DomainVerdictCache,
+    EmailDomainVerificationService,
+    EmailVerificationSettings,
+)
+from registrations.utils.errors import InvalidRegistrationEntryError
+
+
+@pytest.fixture
+def verification_service() -> Iterator[type[EmailDomainVerificationService]]:
+    with mock.patch.multiple(
+        EmailDomainVerificationService,
+        settings=EmailVerificationSettings(offline=False),
+        domain_cache=DomainVerdictCache(60, 10, 100),
+        _domain_checks={},
+        _resolver=None,
+        _resolve_slots=None,
+    ):
+        yield EmailDomainVerificationService
+
+
+def mx_record(exchange: str) -> mock.Mock:
+    return mock.Mock(exchange=mock.Mock(to_text=mock.Mock(return_value=exchange)))
+
+
+def patch_resolver(**answers: object) -> mock._patch:
+    """Patch the async resolver to answer or raise per record type."""
+
+    async def resolve(_domain: str, record_type: str) -> object:
+        answer = answers.get(record_type, dns.resolver.NoAnswer())
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    return mock.patch.object(
+        email_verification.dns.asyncresolver,
+        "Resolver",
+        return_value=mock.Mock(resolve=resolve),
+    )
+
+
+@pytest.mark.fast
+class TestDomainVerdictCache:
+    """Tests the ttl'd cache of domain verdicts."""
+
+    def test_verdicts_expire_after_their_ttl(self) -> None:
+        domain_cache = DomainVerdictCache(
+            positive_ttl_seconds=60, negative_ttl_seconds=10, maxsize=2
+        )
+        with mock.patch.object(email_verification.time, "monotonic", return_value=0):
+            domain_cache.put("good.org", True)
+            domain_cache.put("bad.org", False)
+        with mock.patch.object(email_verification.time, "monotonic", return_value=30):
+            assert domain_cache.get("good.org") is True
+            assert domain_cache.get("bad.org") is None
+        domain_cache.put("other.org", True)
+        domain_cache.put("another.org", True)
+        assert len(domain_cache) == 2
+        assert domain_cache.get("good.org") is None
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestEmailDomainVerificationService:
+    """Tests inline syntax checks and background domain checks."""
+
+    async def test_unknown_domain_passes_and_is_checked_in_background(
+        self, verification_service: type[EmailDomainVerificationService]
+    ) -> None:
+        assert verification_service.is_valid_domain("not an email") is False
+        with patch_resolver(MX=dns.resolver.NXDOMAIN()):
+            assert verification_service.is_valid_domain("admin@nowhere.example")
+            await verification_service._domain_checks["nowhere.example"]
+        assert verification_service.is_valid_domain("admin@nowhere.example") is False
+        assert not verification_service._domain_checks
+
+    @pytest.mark.parametrize(
+        "answers, verdict",
+        [
+            ({"MX": [mx_record("mx.hospital.org.")]}, True),
+            ({"MX": [mx_record(".")]}, False),
+            ({"A": [mock.Mock()]}, True),
+            ({"A": dns.resolver.NXDOMAIN()}, False),
+            ({}, False),
+        ],
+    )
+    async def test_check_domain_caches_the_verdict(
+        self,
+        verification_service: type[EmailDomainVerificationService],
+        answers: dict,
+        verdict: bool,
+    ) -> None:
+        with patch_resolver(**answers):
+            assert await verification_service.check_domain("hospital.org") is verdict
+        assert verification_service.domain_cache.get("hospital.org") is verdict
+
+    async def test_resolver_failures_and_offline_leave_domain_unknown(
+        self, verification_service: type[EmailDomainVerificationService]
+    ) -> None:
+        with patch_resolver(MX=dns.exception.Timeout()):
+            assert await verification_service.check_domain("slow.org") is None
+        assert verification_service.domain_cache.get("slow.org") is None
+        verification_service.settings = EmailVerificationSettings(offline=True)
+        with patch_resolver() as resolver_mock:
+            assert verification_service.is_valid_domain("admin@slow.org")
+            assert await verification_service.check_domain("slow.org") is None
+        resolver_mock.assert_not_called()
+        assert not verification_service._domain_checks
+
+    async def test_checks_share_a_resolver_and_bounded_slots(
+        self, verification_service: type[EmailDomainVerificationService]
+    ) -> None:
+        verification_service.settings = EmailVerificationSettings(
+            offline=False, max_concurrent_checks=2
+        )
+        resolving, most_resolving = 0, 0
+        release = asyncio.Event()
+
+        async def resolve(_domain: str, _record_type: str) -> object:
+            nonlocal resolving, most_resolving
+            resolving += 1
+            most_resolving = max(most_resolving, resolving)
+            await release.wait()
+            resolving -= 1
+            return [mx_record("mx.hospital.org.")]
+
+        with mock.patch.object(
+            email_verification.dns.asyncresolver,
+            "Resolver",
+            return_value=mock.Mock(resolve=resolve),
+        ) as resolver_mock:
+            checks = [
+                asyncio.create_task(
+                    verification_service.check_domain(f"hospital{idx}.org")
+                )
+                for idx in range(5)
+            ]
+            await asyncio.sleep(0.01)
+            release.set()
+            assert await asyncio.gather(*checks) == [True] * 5
+        resolver_mock.assert_called_once()
+        assert most_resolving == 2
+
+    async def test_unknown_domains_over_the_pending_cap_are_not_checked(
+        self, verification_service: type[EmailDomainVerificationService]
+    ) -> None:
+        verification_service.settings = EmailVerificationSettings(
+            offline=False, max_pending_checks=1
+        )
+        skipped = email_verification.EMAIL_DOMAIN_CHECKS_SKIPPED.value()
+        with patch_resolver(MX=[mx_record("mx.hospital.org.")]):
+            assert verification_service.is_valid_domain("admin@first.org")
+            assert verification_service.is_valid_domain("admin@second.org")
+            assert list(verification_service._domain_checks) == ["first.org"]
+            await verification_service._domain_checks["first.org"]
+        assert verification_service.domain_cache.get("second.org") is None
+        assert email_verification.EMAIL_DOMAIN_CHECKS_SKIPPED.value() == skipped + 1
+
+    async def test_registration_rejects_domain_refusing_mail(
+        self,
+        verification_service: type[EmailDomainVerificationService],
+        registration_entry_manual_verification: dto.ToHospitalRegistrationEntry,
+    ) -> None:
+        verification_service.domain_cache.put("nowhere.example", False)
+        registration_entry = registration_entry_manual_verification.copy(
+            update={
+                "key_contact": dto.RegisterKeyContact(
+                    name="Radhe Shyam",
+                    mobile="+919425416789",
+                    email="admin@nowhere.example",
+                )
+            }
+        )
+        with pytest.raises(InvalidRegistrationEntryError, match="nowhere.example"):
+            await HospitalRegistrationApplicationService.register_hospital(
+                mock.Mock(), registration_entry, (), verification_service
+            )
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import csv
+import datetime
+import io
+import pathlib
+from unittest import mock
+
+import httpx
+import pytest
+import ujson
+
+from registrations.domain.hospital.registration import (
+    HospitalEntityType,
+    HospitalEntryAggregate,
+)
+from registrations.domain.repo.registration_repo import HospitalUOWFactory
+from registrations.domain.services.application_services import (
+    HospitalExportApplicationService,
+    HospitalRegistrationApplicationService,
+)
+from registrations.infrastructure.adapters.api import app as api_app
+from registrations.infrastructure.adapters.api import bootstrap
+from registrations.infrastructure.adapters.api.di_builder import (
+    BootStrapDI,
+    DIMapping,
+)
+from registrations.infrastructure.adapters.repos.memory.repo import (
+    InMemoryHospitalUOWFactory,
+)
+from registrations.infrastructure.adapters.repos.sqlite.repo import (
+    SQLiteHospitalUOWFactory,
+    SQLiteSettings,
+)
+from registrations.utils.errors import InvalidExportCursorError
+
+
+def build_hospitals(
+    valid_unverified_hospital: dict, valid_unclaimed_hospital: dict
+) -> list[HospitalEntityType]:
+    """Three unverified then two unclaimed hospitals, added a day apart."""
+    hospital_entries = []
+    for hospital_no, hospital_dict in enumerate(
+        [valid_unverified_hospital] * 3 + [valid_unclaimed_hospital] * 2
+    ):
+        hospital_dict = {
+            **hospital_dict,
+            "hospital_name": f"Hospital {hospital_no}",
+            "added_since": datetime.datetime(2022, 1, 1 + hospital_no),
+        }
+        hospital_dict.pop("hospital_id")
+        hospital_entries.append(HospitalEntryAggregate.build_factory(**hospital_dict))
+    return hospital_entries
+
+
+async def store_hospitals(
+    uow_factory: HospitalUOWFactory, hospital_entries: list[HospitalEntityType]
+) -> None:
+    async with uow_factory() as uow_ctx:
+        for hospital_entry in hospital_entries:
+            await uow_ctx.hospital_repo.save_hospital(hospital_entry)
+        await uow_ctx.commit()
+
+
+def export_bootstrapper(uow_factory: HospitalUOWFactory) -> BootStrapDI:
+    return BootStrapDI(
+        mapping_di=DIMapping(
+            hospital_uow_async=uow_factory,
+            hospital_registration_application_service=HospitalRegistrationApplicationService,
+            hospital_export_application_service=HospitalExportApplicationService,
+        )
+    )
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestHospitalPages:
+    """Tests the repos read their hospitals page by page from a cursor."""
+
+    @pytest.mark.parametrize("backend", ["memory", "sqlite"])
+    async def test_read_resumes_after_each_cursor(
+        self,
+        backend: str,
+        tmp_path: pathlib.Path,
+        valid_unverified_hospital: dict,
+        valid_unclaimed_hospital: dict,
+    ) -> None:
+        uow_factory = (
+            InMemoryHospitalUOWFactory()
+            if backend == "memory"
+            else SQLiteHospitalUOWFactory(
+                SQLiteSettings(path=str(tmp_path / "registrations.db"))
+            )
+        )
+        if backend == "sqlite":
+            await uow_factory.startup()
+        hospital_entries = build_hospitals(
+            valid_unverified_hospital, valid_unclaimed_hospital
+        )
+        await store_hospitals(uow_factory, hospital_entries)
+        async with uow_factory() as uow_ctx:
+            hospital_repo = uow_ctx.hospital_repo
+            pages = [page async for page in hospital_repo.iter_hospital_pages(2)]
+            # Pages do not span tables, so each table ends in a short page.
+            assert [len(page) for page in pages] == [2, 1, 2]
+            read_entries = [entry for page in pages for entry in page]
+            assert [entry for entry, _ in read_entries] == hospital_entries
+            for entry_no, (_, cursor) in enumerate(read_entries):
+                resumed_entries = [
+                    entry
+                    async for page in hospital_repo.iter_hospital_pages(2, cursor)
+                    for entry, _ in page
+                ]
+                assert resumed_entries == hospital_entries[entry_no + 1 :]
+            for cursor in ("unknown_table:1", "unclaimed_hospital:nan"):
+                with pytest.raises(InvalidExportCursorError):
+                    async for _ in hospital_repo.iter_hospital_pages(2, cursor):
+                        pass
+        if backend == "sqlite":
+            await uow_factory.shutdown()
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestHospitalExport:
+    """Tests the export service and its streaming route."""
+
+    async def test_export_streams_ndjson_and_resumes_from_cursor(
+        self, valid_unverified_hospital: dict, valid_unclaimed_hospital: dict
+    ) -> None:
+        uow_factory = InMemoryHospitalUOWFactory()
+        hospital_entries = build_hospitals(
+            valid_unverified_hospital, valid_unclaimed_hospital
+        )
+        await store_hospitals(uow_factory, hospital_entries)
+        with mock.patch.object(
+            bootstrap, "bootstrapper", export_bootstrapper(uow_factory)
+        ):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app.app),
+                base_url="http://test",
+            ) as client:
+                response = await client.get(
+                    "/hospitals/export", params={"page_size": 2}
+                )
+                rows = [ujson.loads(line) for line in response.text.splitlines()]
+                resumed_response = await client.get(
+                    "/hospitals/export", params={"cursor": rows[1]["cursor"]}
+                )
+                since_response = await client.get(
+                    "/hospitals/export", params={"since": "2022-01-04T00:00:00"}
+                )
+                invalid_response = await client.get(
+                    "/hospitals/export", params={"cursor": "unknown_table:0"}
+                )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert [row["hospital_id"] for row in rows] == [
+            str(hospital_entry.hospital_id) for hospital_entry in hospital_entries
+        ]
+        assert [row["verified_status"] for row in rows] == ["unverified"] * 3 + [
+            "verified"
+        ] * 2
+        # The key contact of a registration is left out of the export.
+        assert "key_contact_registrar" not in rows[0]
+        assert [
+            ujson.loads(line)["name"] for line in resumed_response.text.splitlines()
+        ] == ["Hospital 2", "Hospital 3", "Hospital 4"]
+        assert [
+            ujson.loads(line)["name"] for line in since_response.text.splitlines()
+        ] == ["Hospital 3", "Hospital 4"]
+        assert invalid_response.status_code == 400
+
+    async def test_export_streams_csv_with_header(
+        self, valid_unverified_hospital: dict, valid_unclaimed_hospital: dict
+    ) -> None:
+        uow_factory = InMemoryHospitalUOWFactory()
+        await store_hospitals(
+            uow_factory,
+            build_hospitals(valid_unverified_hospital, valid_unclaimed_hospital),
+        )
+        with mock.patch.object(
+            bootstrap, "bootstrapper", export_bootstrapper(uow_factory)
+        ):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app.app),
+                base_url="http://test",
+            ) as client:
+                response = await client.get(
+                    "/hospitals/export", params={"format": "csv"}
+                )
+                empty_response = await client.get(
+                    "/hospitals/export",
+                    params={"format": "csv", "since": "2030-01-01T00:00:00"},
+                )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [row["name"] for row in rows] == [
+            f"Hospital {hospital_no}" for hospital_no in range(5)
+        ]
+        assert rows[0]["street2"] == ""
+        assert rows[0]["added_since"] == "2022-01-01T00:00:00"
+        assert empty_response.text.splitlines() == [response.text.splitlines()[0]]
+
+    async def test_export_of_an_unreadable_repo_is_unavailable(self) -> None:
+        uow_factory = mock.Mock(return_value=mock.Mock(hospital_repo=object()))
+        with mock.patch.object(
+            bootstrap, "bootstrapper", export_bootstrapper(uow_factory)
+        ):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app.app),
+                base_url="http://test",
+            ) as client:
+                response = await client.get("/hospitals/export")
+        assert response.status_code == 503
+        assert response.json() == {"detail": "Exports are not available."}
+
+    async def test_export_since_yields_every_page_read(
+        self, valid_unverified_hospital: dict, valid_unclaimed_hospital: dict
+    ) -> None:
+        uow_factory = InMemoryHospitalUOWFactory()
+        await store_hospitals(
+            uow_factory,
+            build_hospitals(valid_unverified_hospital, valid_unclaimed_hospital),
+        )
+        pages = [
+            page
+            async for page in HospitalExportApplicationService.export_hospitals(
+                uow_factory, since=datetime.datetime(2022, 1, 5), page_size=2
+            )
+        ]
+        # Pages are per table, and only the last hospital was added since.
+        assert [[row.name for row in page] for page in pages] == [
+            [],
+            [],
+            ["Hospital 4"],
+        ]
+
+    async def test_closed_export_stops_reading_ahead(
+        self, valid_unverified_hospital: dict, valid_unclaimed_hospital: dict
+    ) -> None:
+        uow_factory = InMemoryHospitalUOWFactory()
+        await store_hospitals(
+            uow_factory,
+            build_hospitals(valid_unverified_hospital, valid_unclaimed_hospital),
+        )
+        pages = HospitalExportApplicationService.export_hospitals(
+            uow_factory, page_size=1, buffered_pages=1
+        )
+        with mock.patch.object(
+            uow_factory.store, "delay", wraps=uow_factory.store.delay
+        ) as store_delay:
+            first_page = await pages.__anext__()
+            await pages.aclose()
+            page_reads = store_delay.await_count
+        assert [row.name for row in first_page] == ["Hospital 0"]
+        # The page sent, the one buffered and the one waiting to be put.
+        assert page_reads <= 3
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import random
+from unittest import mock
+
+import httpx
+import pytest
+
+from registrations.domain.hospital.registration import (
+    HospitalEntityType,
+    HospitalEntryAggregate,
+)
+from registrations.domain.location.location import AddressGeoLocation
+from registrations.domain.services.application_services import (
+    HospitalGeoApplicationService,
+    HospitalRegistrationApplicationService,
+)
+from registrations.infrastructure.adapters.api import app as api_app
+from registrations.infrastructure.adapters.api import bootstrap
+from registrations.infrastructure.adapters.api.di_builder import (
+    BootStrapDI,
+    DIMapping,
+)
+from registrations.infrastructure.adapters.search.geo_index import (
+    GeoHospitalIndex,
+    haversine_km,
+)
+
+
+def build_hospital(
+    valid_unclaimed_hospital: dict,
+    hospital_name: str,
+    geo_location: tuple[float, float] | None,
+) -> HospitalEntityType:
+    hospital_dict = {**valid_unclaimed_hospital, "hospital_name": hospital_name}
+    hospital_dict.pop("hospital_id")
+    if geo_location is not None:
+        latitude, longitude = geo_location
+        hospital_dict["geo_location"] = AddressGeoLocation(
+            latitude=latitude, longitude=longitude
+        )
+    return HospitalEntryAggregate.build_factory(**hospital_dict)
+
+
+@pytest.fixture
+def geo_index(valid_unclaimed_hospital: dict) -> GeoHospitalIndex:
+    geo_index = GeoHospitalIndex()
+    geo_index.extend(
+        build_hospital(valid_unclaimed_hospital, hospital_name, geo_location)
+        for hospital_name, geo_location in (
+            ("AIIMS Delhi", (28.5672, 77.2100)),
+            ("Safdarjung Hospital", (28.5500, 77.2000)),
+            ("Fortis Gurgaon", (28.4595, 77.0727)),
+            ("Apollo Chennai", (13.0635, 80.2519)),
+            ("No Location Clinic", None),
+        )
+    )
+    return geo_index
+
+
+def names_of(nearby_hospitals: list[tuple[HospitalEntityType, float]]) -> list[str]:
+    return [hospital_entry.hospital_name for hospital_entry, _ in nearby_hospitals]
+
+
+@pytest.mark.fast
+class TestGeoHospitalIndex:
+    """Tests the grid index for nearest and within radius queries."""
+
+    def test_nearest_first_with_haversine_distances(
+        self, geo_index: GeoHospitalIndex
+    ) -> None:
+        nearby_hospitals = geo_index.nearest(28.6139, 77.2090, 3)
+        assert names_of(nearby_hospitals) == [
+            "AIIMS Delhi",
+            "Safdarjung Hospital",
+            "Fortis Gurgaon",
+        ]
+        for hospital_entry, distance_km in nearby_hospitals:
+            geo_location = hospital_entry.geo_location
+            assert distance_km == pytest.approx(
+                haversine_km(
+                    (28.6139, 77.2090), (geo_location.latitude, geo_location.longitude)
+                )
+            )
+
+    def test_within_radius_and_unlocated_hospitals(
+        self, geo_index: GeoHospitalIndex
+    ) -> None:
+        assert len(geo_index) == 4
+        assert names_of(geo_index.within(28.6139, 77.2090, 10)) == [
+            "AIIMS Delhi",
+            "Safdarjung Hospital",
+        ]
+        assert names_of(geo_index.nearest(28.6139, 77.2090, 10, radius_km=50)) == [
+            "AIIMS Delhi",
+            "Safdarjung Hospital",
+            "Fortis Gurgaon",
+        ]
+        # The nearest hospital is over 1700 km away, across many cells.
+        assert names_of(geo_index.nearest(8.5241, 76.9366, 1)) == ["Apollo Chennai"]
+
+    @pytest.mark.parametrize("cell_degrees", [0.1, 1.0, 10.0])
+    def test_matches_brute_force_across_the_antimeridian_and_poles(
+        self, valid_unclaimed_hospital: dict, cell_degrees: float
+    ) -> None:
+        rng = random.Random(cell_degrees)
+        hospital_entries = [
+            build_hospital(
+                valid_unclaimed_hospital,
+                f"Hospital {idx}",
+                (rng.uniform(-90, 90), rng.uniform(-180, 180)),
+            )
+            for idx in range(200)
+        ]
+        geo_index = GeoHospitalIndex(cell_degrees)
+        geo_index.extend(hospital_entries)
+        points = [(89.9, 179.9), (-89.9, -179.9), (0.0, 180.0)] + [
+            (rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(20)
+        ]
+        for point, nearby_hospitals in zip(points, geo_index.nearest_many(points, 5)):
+            expected = sorted(
+                haversine_km(
+                    point,
+                    (
+                        hospital_entry.geo_location.latitude,
+                        hospital_entry.geo_location.longitude,
+                    ),
+                )
+                for hospital_entry in hospital_entries
+            )[:5]
+            assert [distance for _, distance in nearby_hospitals] == pytest.approx(
+                expected
+            )
+
+    @pytest.mark.parametrize("cell_degrees", [1.0, 7.0, 25.0])
+    def test_matches_brute_force_at_the_antimeridian(
+        self, valid_unclaimed_hospital: dict, cell_degrees: float
+    ) -> None:
+        # Coarse cells, some not dividing 360 degrees, so the last cell
+        # is narrower than the others.
+        rng = random.Random(cell_degrees)
+        hospital_entries = [
+            build_hospital(
+                valid_unclaimed_hospital,
+                f"Hospital {idx}",
+                (
+                    rng.uniform(-5, 5),
+                    (180 + rng.uniform(-15, 15) + 180) % 360 - 180,
+                ),
+            )
+            for idx in range(100)
+        ]
+        geo_index = GeoHospitalIndex(cell_degrees)
+        geo_index.extend(hospital_entries)
+        points = [
+            (latitude, longitude)
+            for latitude in (-2.01, 0.0, 3.3)
+            for longitude in (-180.0, -179.5, 179.5, 180.0)
+        ]
+        for point, nearby_hospitals in zip(points, geo_index.nearest_many(points, 3)):
+            expected = sorted(
+                haversine_km(
+                    point,
+                    (
+                        hospital_entry.geo_location.latitude,
+                        hospital_entry.geo_location.longitude,
+                    ),
+                )
+                for hospital_entry in hospital_entries
+            )[:3]
+            assert [distance for _, distance in nearby_hospitals] == pytest.approx(
+                expected
+            )
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestHospitalGeoService:
+    """Tests the nearby lookup service and its route."""
+
+    async def test_registered_hospitals_are_indexed(
+        self, valid_unclaimed_hospital: dict
+    ) -> None:
+        geo_index = GeoHospitalIndex()
+        registration_entry = mock.Mock()
+        hospital_entry = build_hospital(
+            valid_unclaimed_hospital, "AIIMS Delhi", (28.5672, 77.2100)
+        )
+        registration_entry.build_hospital_entity_dict.return_value = {}
+        with mock.patch(
+            "registrations.domain.services.hospital_registration_services"
+            ".RegisterHospitalService",
+            build_hospital_factory=mock.Mock(return_value=hospital_entry),
+            register_hospital=mock.AsyncMock(),
+        ):
+            await HospitalRegistrationApplicationService.register_hospital(
+                mock.Mock(), registration_entry, (geo_index,)
+            )
+        assert await HospitalGeoApplicationService.lookup_nearby(
+            geo_index, 28.6, 77.2
+        ) == geo_index.nearest(28.6, 77.2)
+        assert len(geo_index) == 1
+
+    async def test_nearby_route(self, geo_index: GeoHospitalIndex) -> None:
+        bootstrapper = BootStrapDI(
+            mapping_di=DIMapping(
+                hospital_uow_async=mock.Mock(),
+                hospital_registration_application_service=HospitalRegistrationApplicationService,
+                hospital_geo_application_service=HospitalGeoApplicationService,
+                hospital_geo_index=geo_index,
+            )
+        )
+        with mock.patch.object(bootstrap, "bootstrapper", bootstrapper):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app.app),
+                base_url="http://test",
+            ) as client:
+                response = await client.get(
+                    "/hospitals/nearby",
+                    params={"lat": 28.6139, "lon": 77.2090, "radius_km": 10},
+                )
+                invalid_response = await client.get(
+                    "/hospitals/nearby", params={"lat": 91, "lon": 77.2}
+                )
+        assert response.status_code == 200
+        result, other_result = response.json()
+        assert result["name"] == "AIIMS Delhi"
+        assert result["distance_km"] < other_result["distance_km"] < 10
+        assert (result["latitude"], result["longitude"]) == (28.5672, 77.21)
+        assert "phone_number" not in result
+        assert invalid_response.status_code == 422
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import asyncio
+import pathlib
+from unittest import mock
+
+import httpx
+import pytest
+
+from registrations.domain.hospital.registration import (
+    HospitalEntityType,
+    HospitalEntryAggregate,
+)
+from registrations.domain.services.application_services import (
+    HospitalLookAheadApplicationService,
+    HospitalRegistrationApplicationService,
+)
+from registrations.infrastructure.adapters.api import app as api_app
+from registrations.infrastructure.adapters.api import bootstrap
+from registrations.infrastructure.adapters.api.di_builder import (
+    BootStrapDI,
+    DIMapping,
+)
+from registrations.infrastructure.adapters.repos.sqlite.repo import (
+    SQLiteHospitalUOWFactory,
+    SQLiteSettings,
+)
+from registrations.infrastructure.adapters.search.memory_index import (
+    InMemoryHospitalSearchIndex,
+)
+
+
+def build_hospital(
+    valid_unclaimed_hospital: dict, hospital_name: str, city: str = "Newark"
+) -> HospitalEntityType:
+    hospital_dict = {**valid_unclaimed_hospital, "hospital_name": hospital_name}
+    hospital_dict.pop("hospital_id")
+    hospital_dict["address"] = hospital_dict["address"].copy(update={"city": city})
+    return HospitalEntryAggregate.build_factory(**hospital_dict)
+
+
+@pytest.fixture
+def search_index(valid_unclaimed_hospital: dict) -> InMemoryHospitalSearchIndex:
+    search_index = InMemoryHospitalSearchIndex()
+    search_index.extend(
+        build_hospital(valid_unclaimed_hospital, hospital_name, city)
+        for hospital_name, city in (
+            ("Apollo Hospital", "Chennai"),
+            ("Apollo Children Clinic", "Delhi"),
+            ("City Care Hospital", "Apollonia"),
+            ("Fortis Memorial Hospital", "Gurgaon"),
+        )
+    )
+    return search_index
+
+
+def names_of(hospital_entries: list[HospitalEntityType]) -> list[str]:
+    return [hospital_entry.hospital_name for hospital_entry in hospital_entries]
+
+
+@pytest.mark.fast
+class TestInMemoryHospitalSearchIndex:
+    """Tests the prefix and trigram look ahead index."""
+
+    def test_prefix_ranks_name_matches_first(
+        self, search_index: InMemoryHospitalSearchIndex
+    ) -> None:
+        assert names_of(search_index.search("apol", 10)) == [
+            "Apollo Hospital",
+            "Apollo Children Clinic",
+            "City Care Hospital",
+        ]
+
+    def test_every_query_token_must_match(
+        self, search_index: InMemoryHospitalSearchIndex
+    ) -> None:
+        assert names_of(search_index.search("apollo chi", 10)) == [
+            "Apollo Children Clinic"
+        ]
+        assert names_of(search_index.search("hosp gurg", 10)) == [
+            "Fortis Memorial Hospital"
+        ]
+        assert search_index.search("apollo fortis", 10) == []
+
+    def test_misspelt_token_matches_by_trigrams(
+        self, search_index: InMemoryHospitalSearchIndex
+    ) -> None:
+        assert names_of(search_index.search("fortsi memorial", 10)) == [
+            "Fortis Memorial Hospital"
+        ]
+
+    def test_incremental_add_skips_indexed_ids(
+        self,
+        search_index: InMemoryHospitalSearchIndex,
+        valid_unclaimed_hospital: dict,
+    ) -> None:
+        hospital_entry = build_hospital(valid_unclaimed_hospital, "Zydus Hospital")
+        search_index.add(hospital_entry)
+        search_index.add(hospital_entry)
+        assert len(search_index) == 5
+        assert search_index.search("zyd", 10) == [hospital_entry]
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestHospitalLookAheadService:
+    """Tests the look ahead service and its search route."""
+
+    async def test_index_is_built_from_repo(
+        self, tmp_path: pathlib.Path, valid_unclaimed_hospital: dict
+    ) -> None:
+        uow_factory = SQLiteHospitalUOWFactory(
+            SQLiteSettings(path=str(tmp_path / "registrations.db"))
+        )
+        await uow_factory.startup()
+        hospital_entries = [
+            build_hospital(valid_unclaimed_hospital, hospital_name)
+            for hospital_name in ("Apollo Hospital", "Fortis Hospital")
+        ]
+        async with uow_factory() as uow_ctx:
+            for hospital_entry in hospital_entries:
+                await uow_ctx.hospital_repo.save_hospital(hospital_entry)
+            await uow_ctx.commit()
+        search_index = InMemoryHospitalSearchIndex()
+        with mock.patch(
+            "registrations.domain.services.application_services.INDEX_LOAD_PAGE_SIZE",
+            1,
+        ), mock.patch.object(
+            search_index, "extend", wraps=search_index.extend
+        ) as index_extend:
+            await HospitalRegistrationApplicationService.load_hospital_indexes(
+                uow_factory, (search_index,)
+            )
+        await uow_factory.shutdown()
+        # Each page is indexed as it is read.
+        assert [call.args[0] for call in index_extend.call_args_list] == [
+            [hospital_entry] for hospital_entry in hospital_entries
+        ]
+        assert search_index.search("apollo", 10) == hospital_entries[:1]
+
+    async def test_reload_only_reads_hospitals_stored_since(
+        self,
+        tmp_path: pathlib.Path,
+        valid_unclaimed_hospital: dict,
+        valid_unverified_hospital: dict,
+    ) -> None:
+        uow_factory = SQLiteHospitalUOWFactory(
+            SQLiteSettings(path=str(tmp_path / "registrations.db"))
+        )
+        await uow_factory.startup()
+        first_entry, second_entry = [
+            build_hospital(valid_unclaimed_hospital, hospital_name)
+            for hospital_name in ("Apollo Hospital", "Fortis Hospital")
+        ]
+        unverified_entry = HospitalEntryAggregate.build_factory(
+            **valid_unverified_hospital
+        )
+        search_index = InMemoryHospitalSearchIndex()
+        cursors: dict[str, str] = {}
+        async with uow_factory() as uow_ctx:
+            await uow_ctx.hospital_repo.save_hospital(first_entry)
+            await uow_ctx.commit()
+        await HospitalRegistrationApplicationService.load_hospital_indexes(
+            uow_factory, (search_index,), cursors
+        )
+        # Another worker stores one in each table, one of them empty so far.
+        async with uow_factory() as uow_ctx:
+            await uow_ctx.hospital_repo.save_hospital(second_entry)
+            await uow_ctx.hospital_repo.save_hospital(unverified_entry)
+            await uow_ctx.commit()
+        with mock.patch.object(
+            search_index, "extend", wraps=search_index.extend
+        ) as index_extend:
+            await HospitalRegistrationApplicationService.load_hospital_indexes(
+                uow_factory, (search_index,), cursors
+            )
+            await HospitalRegistrationApplicationService.load_hospital_indexes(
+                uow_factory, (search_index,), cursors
+            )
+        await uow_factory.shutdown()
+        assert [call.args[0] for call in index_extend.call_args_list] == [
+            [unverified_entry],
+            [second_entry],
+        ]
+        assert len(search_index) == 3
+
+    async def test_workers_refresh_their_indexes(
+        self, tmp_path: pathlib.Path, valid_unclaimed_hospital: dict
+    ) -> None:
+        settings = SQLiteSettings(path=str(tmp_path / "registrations.db"))
+        uow_factories = [SQLiteHospitalUOWFactory(settings) for _ in range(2)]
+        search_indexes = [InMemoryHospitalSearchIndex() for _ in range(2)]
+        bootstrappers = [
+            BootStrapDI(
+                mapping_di=DIMapping(
+                    hospital_uow_async=uow_factory,
+                    hospital_registration_application_service=HospitalRegistrationApplicationService,
+                    hospital_search_index=search_index,
+                    hospital_index_refresh_seconds=0.01,
+                )
+            )
+            for uow_factory, search_index in zip(uow_factories, search_indexes)
+        ]
+        for bootstrapper in bootstrappers:
+            await bootstrapper.run()
+        first_index, second_index = search_indexes
+        hospital_entry = build_hospital(valid_unclaimed_hospital, "Apollo Hospital")
+        await HospitalRegistrationApplicationService.persist_hospital_entry(
+            uow_factories[0], hospital_entry, (first_index,)
+        )
+        for _ in range(100):
+            if second_index.search("apollo", 10):
+                break
+            await asyncio.sleep(0.01)
+        for bootstrapper in bootstrappers:
+            await bootstrapper.shutdown()
+        assert second_index.search("apollo", 10) == [hospital_entry]
+
+    async def test_search_route_hides_contact_details(
+        self, search_index: InMemoryHospitalSearchIndex
+    ) -> None:
+        bootstrapper = BootStrapDI(
+            mapping_di=DIMapping(
+                hospital_uow_async=mock.Mock(),
+                hospital_registration_application_service=HospitalRegistrationApplicationService,
+                hospital_lookahead_application_service=HospitalLookAheadApplicationService,
+                hospital_search_index=search_index,
+            )
+        )
+        with mock.patch.object(bootstrap, "bootstrapper", bootstrapper):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app.app),
+                base_url="http://test",
+            ) as client:
+                response = await client.get(
+                    "/hospitals/search", params={"q": "apollo ch", "limit": 5}
+                )
+                empty_response = await client.get("/hospitals/search?q=")
+        assert response.status_code == 200
+        # "ch" prefixes the name Children above the city Chennai.
+        result, city_result = response.json()
+        assert result["name"] == "Apollo Children Clinic"
+        assert result["city"] == "Delhi"
+        assert city_result["city"] == "Chennai"
+        assert set(result) == {
+            "hospital_id",
+            "name",
+            "ownership_type",
+            "city",
+            "state",
+            "country",
+        }
+        assert empty_response.status_code == 422
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from unittest import mock
+
+import httpx
+import pytest
+
+from registrations.domain.services.application_services import (
+    HospitalRegistrationApplicationService,
+)
+from registrations.infrastructure.adapters.api import app as api_app
+from registrations.infrastructure.adapters.api import bootstrap
+from registrations.infrastructure.adapters.api.di_builder import (
+    BootStrapDI,
+    DIMapping,
+)
+from registrations.infrastructure.adapters.api.idempotency_middleware import (
+    IdempotentResponseCache,
+    StoredResponse,
+)
+from registrations.infrastructure.adapters.repos.memory.repo import (
+    InMemoryHospitalUOWFactory,
+    InMemorySettings,
+)
+from registrations.utils import metrics
+
+
+@pytest.mark.fast
+class TestIdempotentResponseCache:
+    """Tests stored responses expire and the least recently used go first."""
+
+    def test_ttl_and_lru_eviction(self) -> None:
+        response = StoredResponse(201, [], b"{}")
+        cache = IdempotentResponseCache(ttl_seconds=60, maxsize=2)
+        cache.put("a", "fingerprint", response)
+        cache.put("b", "fingerprint", response)
+        assert cache.get("a") == ("fingerprint", response)
+        cache.put("c", "fingerprint", response)
+        assert cache.get("b") is None and len(cache) == 2
+        with mock.patch.object(time, "monotonic", return_value=time.monotonic() + 60):
+            assert cache.get("a") is None
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestIdempotencyKey:
+    """Tests retries with an Idempotency-Key replay the first response."""
+
+    async def test_retries_replay_and_coalesce(self) -> None:
+        registration_body = {
+            "name": "Idempotent Hospital",
+            "ownership_type": "private",
+            "hospital_contact_number": "+919425411234",
+            "verified_status": "verified",
+            "address": {
+                "street": "Rajaji marg",
+                "city": "Newark",
+                "state": "MP",
+                "country": "IN",
+            },
+        }
+        uow_factory = InMemoryHospitalUOWFactory(InMemorySettings(latency_ms=20))
+        bootstrapper = BootStrapDI(
+            mapping_di=DIMapping(
+                hospital_uow_async=uow_factory,
+                hospital_registration_application_service=HospitalRegistrationApplicationService,
+            )
+        )
+        headers = {"Idempotency-Key": uuid.uuid4().hex}
+        commits_before = metrics.STAGE_LATENCY.count("uow_commit")
+        with mock.patch.object(bootstrap, "bootstrapper", bootstrapper):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app.app),
+                base_url="http://test",
+            ) as client:
+                concurrent_responses = await asyncio.gather(
+                    *(
+                        client.post(
+                            "/register-hospital",
+                            json=registration_body,
+                            headers=headers,
+                        )
+                        for _ in range(3)
+                    )
+                )
+                retried_response = await client.post(
+                    "/register-hospital", json=registration_body, headers=headers
+                )
+                mismatched_response = await client.post(
+                    "/register-hospital",
+                    json={**registration_body, "name": "Other Hospital"},
+                    headers=headers,
+                )
+                echo_response = await client.post(
+                    "/register-hospital",
+                    params={"echo": "true"},
+                    json=registration_body,
+                    headers=headers,
+                )
+                unkeyed_response = await client.post(
+                    "/register-hospital", json=registration_body
+                )
+        assert [response.status_code for response in concurrent_responses] == [201] * 3
+        assert [
+            response.headers.get("idempotent-replayed")
+            for response in concurrent_responses
+        ] == [None, "true", "true"]
+        assert retried_response.status_code == 201
+        assert retried_response.headers["idempotent-replayed"] == "true"
+        assert retried_response.content == concurrent_responses[0].content
+        assert metrics.STAGE_LATENCY.count("uow_commit") - commits_before == 1
+        assert len(uow_factory.store) == 1
+        assert mismatched_response.status_code == 422
+        # The same body asking for another response is a different request.
+        assert echo_response.status_code == 422
+        assert unkeyed_response.status_code == 409
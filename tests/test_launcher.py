@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import pathlib
+import signal
+import socket
+import subprocess
+import sys
+import time
+from unittest import mock
+
+import httpx
+import pytest
+
+from registrations.domain.services.application_services import (
+    HospitalRegistrationApplicationService,
+)
+from registrations.infrastructure.adapters.api import app as api_app
+from registrations.infrastructure.adapters.api import bootstrap, launcher
+from registrations.infrastructure.adapters.api.di_builder import (
+    BootStrapDI,
+    DIMapping,
+)
+from registrations.infrastructure.adapters.repos.memory.repo import (
+    InMemoryHospitalUOWFactory,
+)
+
+
+def memory_bootstrapper() -> BootStrapDI:
+    return BootStrapDI(
+        mapping_di=DIMapping(
+            hospital_uow_async=InMemoryHospitalUOWFactory(),
+            hospital_registration_application_service=HospitalRegistrationApplicationService,
+        )
+    )
+
+
+@pytest.mark.fast
+class TestLauncherSettings:
+    """Tests the workers are sized from the settings and the CPU count."""
+
+    @pytest.mark.parametrize(
+        "settings, cpu_count, workers",
+        [
+            ({}, 8, 1),
+            ({"workers": 3}, 8, 3),
+            ({"workers_per_core": 2}, 4, 8),
+            ({"workers_per_core": 0.25}, 2, 1),
+            ({"workers_per_core": 1, "max_workers": 4}, 16, 4),
+        ],
+    )
+    def test_worker_count(self, settings: dict, cpu_count: int, workers: int) -> None:
+        assert (
+            launcher.worker_count(launcher.LauncherSettings(**settings), cpu_count)
+            == workers
+        )
+
+    def test_several_workers_need_a_shared_backend(self) -> None:
+        launcher.check_shared_backend(1, "memory")
+        launcher.check_shared_backend(4, "sqlite")
+        with pytest.raises(ValueError, match="REPO_BACKEND=memory"):
+            launcher.check_shared_backend(2, "memory")
+        with pytest.raises(ValueError, match="REPO_BACKEND=memory"):
+            launcher.serve(launcher.LauncherSettings(workers=2))
+
+    def test_several_workers_refuse_an_authoritative_dedup_index(self) -> None:
+        launcher.check_shared_backend(4, "m3o")
+        with mock.patch.dict(os.environ, {"M3O_DEDUP_AUTHORITATIVE": "true"}):
+            launcher.check_shared_backend(1, "m3o")
+            with pytest.raises(ValueError, match="M3O_DEDUP_AUTHORITATIVE"):
+                launcher.check_shared_backend(2, "m3o")
+
+    def test_several_workers_refuse_the_registration_queue(self) -> None:
+        with mock.patch.dict(os.environ, {"REGISTRATION_QUEUE_ENABLED": "true"}):
+            launcher.check_shared_backend(1, "sqlite")
+            with pytest.raises(ValueError, match="REGISTRATION_QUEUE_ENABLED"):
+                launcher.check_shared_backend(2, "sqlite")
+
+    def test_worker_writes_its_logs_before_exiting(self) -> None:
+        with mock.patch.object(launcher.signal, "signal"), mock.patch.object(
+            launcher, "load_application"
+        ), mock.patch.object(launcher, "worker_serve", mock.Mock()), mock.patch.object(
+            launcher.asyncio, "run", side_effect=RuntimeError("worker failed")
+        ), mock.patch.object(
+            launcher.log_utils, "flush"
+        ) as log_flush:
+            with pytest.raises(RuntimeError, match="worker failed"):
+                launcher.run_worker(
+                    mock.Mock(), mock.Mock(), mock.Mock(), mock.Mock(), os.getpid()
+                )
+        log_flush.assert_called_once_with()
+
+    def test_builds_hypercorn_config(self) -> None:
+        config = launcher.build_config(
+            launcher.LauncherSettings(
+                bind="127.0.0.1:9000", workers=2, graceful_timeout_seconds=12
+            )
+        )
+        assert config.application_path == launcher.APPLICATION_PATH
+        assert config.bind == ["127.0.0.1:9000"]
+        assert config.workers == 2
+        assert config.graceful_timeout == 12
+        assert not config.use_reloader
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestProbes:
+    """Tests the liveness and readiness probes over a worker's lifetime."""
+
+    async def test_ready_once_warmed_up_until_draining(self) -> None:
+        bootstrapper = memory_bootstrapper()
+        with mock.patch.object(bootstrap, "bootstrapper", bootstrapper):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app.app),
+                base_url="http://test",
+            ) as client:
+                starting = await client.get("/health/ready")
+                await bootstrapper.run()
+                ready = await client.get("/health/ready")
+                bootstrapper.begin_drain()
+                draining = await client.get("/health/ready")
+                live = await client.get("/health/live")
+                await bootstrapper.shutdown()
+        assert starting.status_code == 503
+        assert starting.json() == {"status": "starting", "ready": False}
+        assert ready.status_code == 200
+        assert ready.json() == {"status": "ok", "ready": True}
+        assert draining.status_code == 503
+        assert draining.json() == {"status": "draining", "ready": False}
+        assert live.status_code == 200
+
+    async def test_worker_drains_until_shut_down(self) -> None:
+        bootstrapper = memory_bootstrapper()
+        drain_event, shutdown_event = multiprocessing.Event(), multiprocessing.Event()
+        await bootstrapper.run()
+        with mock.patch.object(bootstrap, "bootstrapper", bootstrapper):
+            shutdown_trigger = asyncio.create_task(
+                launcher.wait_for_shutdown(drain_event, shutdown_event, os.getppid())
+            )
+            drain_event.set()
+            await asyncio.sleep(launcher.POLL_INTERVAL_SECONDS * 2)
+            assert bootstrapper.draining
+            assert not shutdown_trigger.done()
+            shutdown_event.set()
+            await asyncio.wait_for(shutdown_trigger, 1)
+        await bootstrapper.shutdown()
+
+
+@pytest.mark.slow
+class TestLauncher:
+    """Tests the launched workers serve, then drain on SIGTERM."""
+
+    def test_workers_report_draining_then_exit(self, tmp_path: pathlib.Path) -> None:
+        with socket.socket() as free_socket:
+            free_socket.bind(("127.0.0.1", 0))
+            port = free_socket.getsockname()[1]
+        env = {
+            **os.environ,
+            "ENV": "production",
+            "REPO_BACKEND": "sqlite",
+            "SQLITE_PATH": str(tmp_path / "registrations.db"),
+            "SERVER_BIND": f"127.0.0.1:{port}",
+            "SERVER_WORKERS": "2",
+            "SERVER_DRAIN_DELAY_SECONDS": "1",
+        }
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "registrations.infrastructure.adapters.api.launcher",
+            ],
+            env=env,
+        )
+        try:
+            url = f"http://127.0.0.1:{port}/health/ready"
+            deadline = time.monotonic() + 20
+            while True:
+                try:
+                    ready = httpx.get(url)
+                    break
+                except httpx.TransportError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.1)
+            server.send_signal(signal.SIGTERM)
+            time.sleep(0.5)
+            draining = httpx.get(url)
+            assert server.wait(20) == 0
+        finally:
+            server.kill()
+        assert ready.status_code == 200
+        assert draining.status_code == 503
+        assert draining.json()["status"] == "draining"
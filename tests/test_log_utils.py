@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+
+import pytest
+
+from registrations.utils import log_utils
+
+
+def make_record(
+    msg: str, *args: object, level: int = logging.ERROR, **extra: object
+) -> logging.LogRecord:
+    record = logging.LogRecord("tests", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+@pytest.mark.fast
+class TestLogUtils:
+    """Tests records are sampled, queued without blocking and JSON formatted."""
+
+    def test_repeated_signatures_are_sampled_per_window(self) -> None:
+        now = [0.0]
+        sampler = log_utils.SignatureSampler(
+            burst=2, window_seconds=60, clock=lambda: now[0]
+        )
+        let_through = [
+            sampler.filter(make_record("Invalid entry %s", name))
+            for name in ("a", "b", "c", "d")
+        ]
+        assert let_through == [True, True, False, False]
+        assert sampler.filter(make_record("Other error"))
+        assert sampler.filter(make_record("Invalid entry %s", "e", level=logging.INFO))
+        now[0] = 60
+        record = make_record("Invalid entry %s", "f")
+        assert sampler.filter(record) and record.suppressed == 2
+
+    def test_json_lines_are_formatted_lazily(self) -> None:
+        try:
+            raise ValueError("bad number")
+        except ValueError as e:
+            record = make_record("Error: %s Parameters are %s", e, {"name": "x"})
+            record.exc_info = (type(e), e, e.__traceback__)
+        record.hospital_name = "Rajaji"
+        record.suppressed = 3
+        entry = json.loads(log_utils.JSONFormatter().format(record))
+        assert entry["message"] == "Error: bad number Parameters are {'name': 'x'}"
+        assert entry["level"] == "ERROR" and entry["logger"] == "tests"
+        assert entry["hospital_name"] == "Rajaji" and entry["suppressed"] == 3
+        assert entry["exception"].endswith("ValueError: bad number")
+
+    def test_full_queue_drops_without_blocking(self) -> None:
+        handler = log_utils.NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        dropped_before = log_utils.LOG_RECORDS_DROPPED.value("queue_full")
+        for name in ("a", "b"):
+            handler.handle(make_record("Invalid entry %s", name))
+        assert log_utils.LOG_RECORDS_DROPPED.value("queue_full") - dropped_before == 1
+        # The record is queued as is, to be formatted by the listener.
+        assert handler.queue.get_nowait().args == ("a",)
+
+    def test_logger_writes_through_the_listener(self, capsys) -> None:
+        logger = log_utils.get_logger("tests.test_log_utils")
+        logger.debug("Not written at INFO level.")
+        logger.info("Registered %s.", "Rajaji")
+        logger.error("Could not register %s.", "Rajaji")
+        log_utils.flush()
+        captured = capsys.readouterr()
+        assert [json.loads(line)["message"] for line in captured.out.splitlines()] == [
+            "Registered Rajaji."
+        ]
+        assert json.loads(captured.err)["message"] == "Could not register Rajaji."
+        assert not logger.propagate
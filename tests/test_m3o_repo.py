@@ -0,0 +1,616 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from unittest import mock
+
+import httpx
+import pytest
+
+from benchmarks.m3o_stand_in import M3OStandIn, parse_query
+from registrations.domain import dto
+from registrations.domain.hospital import registration
+from registrations.domain.hospital.registration import HospitalEntryAggregate
+from registrations.domain.services.application_services import (
+    HospitalRegistrationApplicationService,
+)
+from registrations.infrastructure.adapters.api import app as api_app
+from registrations.infrastructure.adapters.api import bootstrap
+from registrations.infrastructure.adapters.api.di_builder import (
+    BootStrapDI,
+    DIMapping,
+)
+from registrations.infrastructure.adapters.api.routers.register_hospital_router import (
+    register_hospital_center,
+)
+from registrations.infrastructure.adapters.repos.postgres_m3o import (
+    dedup_index,
+    id_migration,
+    m3o_client,
+    m3o_dto,
+)
+from registrations.infrastructure.adapters.repos.postgres_m3o.repo import (
+    M3OHospitalRepoImpl,
+    M3OHospitalUOWFactory,
+)
+from registrations.utils import resilience
+from registrations.utils.errors import (
+    InvalidExportCursorError,
+    RecordAlreadyExistsError,
+    ServiceUnavailableError,
+)
+
+
+# **************************************************** #
+# A fake M3O DB API served through httpx's mock
+# transport so no request leaves the process.
+# **************************************************** #
+class FakeM3OApi:
+    """Records calls and answers Read/Create like the M3O DB API."""
+
+    def __init__(
+        self, existing_records: list[dict] | None = None, latency: float = 0
+    ) -> None:
+        self.existing_records = existing_records or []
+        self.latency = latency
+        self.calls: list[tuple[str, dict]] = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        self.calls.append((request.url.path, payload))
+        await asyncio.sleep(self.latency)
+        if request.url.path.endswith("/Read"):
+            offset = payload.get("offset") or 0
+            limit = payload.get("limit") or len(self.existing_records)
+            records = self.existing_records[offset : offset + limit]
+            return httpx.Response(200, json={"records": records})
+        if request.url.path.endswith("/Create"):
+            return httpx.Response(200, json={"id": payload["record"]["id"]})
+        return httpx.Response(200, json={})
+
+    def build_client(self) -> httpx.AsyncClient:
+        return m3o_client.build_async_client(transport=httpx.MockTransport(self))
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestM3OHospitalRepo:
+    """Tests the M3O repo over a pooled async http client."""
+
+    async def test_save_and_commit_unverified_hospital(
+        self, valid_unverified_hospital: dict
+    ) -> None:
+        fake_api = FakeM3OApi()
+        repo = M3OHospitalRepoImpl("token", fake_api.build_client())
+        hospital_entry = HospitalEntryAggregate.build_factory(
+            **valid_unverified_hospital
+        )
+        await repo.save_unverified_hospital(**hospital_entry.dict())
+        await repo.set_executable()
+        assert [path for path, _ in fake_api.calls] == ["/v1/db/Read", "/v1/db/Create"]
+        _, create_payload = fake_api.calls[1]
+        assert create_payload["table"] == "unverified_hospital"
+        assert create_payload["record"]["id"] == hospital_entry.hospital_id.hex
+        assert not repo.pending_transaction
+
+    async def test_save_existing_hospital_raises(
+        self, valid_unclaimed_hospital: dict
+    ) -> None:
+        fake_api = FakeM3OApi(existing_records=[{"id": "abc"}])
+        repo = M3OHospitalRepoImpl("token", fake_api.build_client())
+        hospital_entry = HospitalEntryAggregate.build_factory(
+            **valid_unclaimed_hospital
+        )
+        with pytest.raises(RecordAlreadyExistsError):
+            await repo.save_unclaimed_hospital(**hospital_entry.dict())
+        assert not repo.pending_transaction
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestM3OStandIn:
+    """Tests the repo against the local stand-in of the M3O DB API."""
+
+    def test_parses_identity_queries(self) -> None:
+        assert parse_query("name == 'St. Mary\\'s' and address.city != 'Pune'") == [
+            ("name", "==", "St. Mary's"),
+            ("address.city", "!=", "Pune"),
+        ]
+
+    async def test_existence_query_finds_stored_hospital(
+        self, valid_unverified_hospital: dict
+    ) -> None:
+        stand_in = M3OStandIn()
+        uow_factory = M3OHospitalUOWFactory(
+            "token",
+            http_settings=m3o_client.M3OHttpSettings(api_url="http://m3o.local/v1/db"),
+            transport=httpx.ASGITransport(app=stand_in.build_app()),
+        )
+        await uow_factory.startup()
+        async with uow_factory() as uow_ctx:
+            await uow_ctx.hospital_repo.save_unverified_hospital(
+                **valid_unverified_hospital
+            )
+            await uow_ctx.commit()
+        assert len(stand_in.tables["unverified_hospital"]) == 1
+        with pytest.raises(RecordAlreadyExistsError):
+            async with uow_factory() as uow_ctx:
+                await uow_ctx.hospital_repo.save_unverified_hospital(
+                    **{**valid_unverified_hospital, "hospital_id": uuid.uuid1()}
+                )
+        await uow_factory.shutdown()
+
+
+@pytest.mark.fast
+class TestHospitalDedupIndex:
+    """Tests the local index answering "known to be stored"."""
+
+    def test_only_a_warm_authoritative_index_reports_new(self) -> None:
+        hospital_index = dedup_index.HospitalDedupIndex()
+        hospital_index.add("table", "key")
+        hospital_index.mark_warm()
+        assert hospital_index.is_known("table", "key")
+        assert not hospital_index.is_known("other_table", "key")
+        assert not hospital_index.is_new("table", "new key")
+        authoritative_index = dedup_index.HospitalDedupIndex(authoritative=True)
+        authoritative_index.add("table", "key")
+        assert not authoritative_index.is_new("table", "new key")
+        authoritative_index.mark_warm()
+        assert authoritative_index.is_new("table", "new key")
+        assert not authoritative_index.is_new("table", "key")
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestM3OHospitalRepoWithDedupIndex:
+    """Tests the index skips the remote query where it can."""
+
+    async def test_known_hospital_skips_read(
+        self, valid_unclaimed_hospital: dict
+    ) -> None:
+        fake_api = FakeM3OApi()
+        uow_factory = M3OHospitalUOWFactory(
+            "token", transport=httpx.MockTransport(fake_api)
+        )
+        await uow_factory.startup()
+        assert not fake_api.calls
+        async with uow_factory() as uow_ctx:
+            await uow_ctx.hospital_repo.save_unclaimed_hospital(
+                **valid_unclaimed_hospital
+            )
+            await uow_ctx.commit()
+        assert [path for path, _ in fake_api.calls] == [
+            "/v1/db/Read",
+            "/v1/db/Create",
+        ]
+        _, read_payload = fake_api.calls[0]
+        assert read_payload["query"].startswith("name == 'Rajajayah Paramvir'")
+        fake_api.calls.clear()
+        with pytest.raises(RecordAlreadyExistsError):
+            async with uow_factory() as uow_ctx:
+                await uow_ctx.hospital_repo.save_unclaimed_hospital(
+                    **valid_unclaimed_hospital
+                )
+        assert not fake_api.calls
+        await uow_factory.shutdown()
+
+    async def test_authoritative_index_skips_read_of_new_hospital(
+        self, valid_unclaimed_hospital: dict
+    ) -> None:
+        fake_api = FakeM3OApi()
+        uow_factory = M3OHospitalUOWFactory(
+            "token",
+            transport=httpx.MockTransport(fake_api),
+            hospital_index=dedup_index.HospitalDedupIndex(authoritative=True),
+        )
+        await uow_factory.startup()
+        assert uow_factory.hospital_index.is_warm
+        fake_api.calls.clear()
+        async with uow_factory() as uow_ctx:
+            await uow_ctx.hospital_repo.save_unclaimed_hospital(
+                **valid_unclaimed_hospital
+            )
+            await uow_ctx.commit()
+        assert [path for path, _ in fake_api.calls] == ["/v1/db/Create"]
+        await uow_factory.shutdown()
+
+    async def test_hospital_stored_by_another_writer_is_a_duplicate(
+        self, valid_unclaimed_hospital: dict
+    ) -> None:
+        stand_in = M3OStandIn()
+        uow_factories = [
+            M3OHospitalUOWFactory(
+                "token",
+                http_settings=m3o_client.M3OHttpSettings(
+                    api_url="http://m3o.local/v1/db"
+                ),
+                transport=httpx.ASGITransport(app=stand_in.build_app()),
+            )
+            for _ in range(2)
+        ]
+        for uow_factory in uow_factories:
+            await uow_factory.startup()
+        first_factory, second_factory = uow_factories
+        async with first_factory() as uow_ctx:
+            await uow_ctx.hospital_repo.save_unclaimed_hospital(
+                **valid_unclaimed_hospital
+            )
+            await uow_ctx.commit()
+        # The second index never saw it, so it reads M3O.
+        assert not second_factory.hospital_index.is_known(
+            "unclaimed_hospital",
+            HospitalEntryAggregate.build_factory(
+                **valid_unclaimed_hospital
+            ).identity_key,
+        )
+        with pytest.raises(RecordAlreadyExistsError):
+            async with second_factory() as uow_ctx:
+                await uow_ctx.hospital_repo.save_unclaimed_hospital(
+                    **{**valid_unclaimed_hospital, "hospital_id": uuid.uuid1()}
+                )
+        assert len(stand_in.tables["unclaimed_hospital"]) == 1
+        for uow_factory in uow_factories:
+            await uow_factory.shutdown()
+
+    async def test_reads_back_stored_records(
+        self, valid_unverified_hospital: dict, valid_unclaimed_hospital: dict
+    ) -> None:
+        hospital_entries = [
+            HospitalEntryAggregate.build_factory(**valid_unverified_hospital),
+            HospitalEntryAggregate.build_factory(**valid_unclaimed_hospital),
+        ]
+        fake_api = FakeM3OApi(
+            existing_records=[
+                m3o_dto.parse_to_dict(table, hospital_entry)
+                for table, hospital_entry in zip(
+                    ("unverified_hospital", "unclaimed_hospital"), hospital_entries
+                )
+            ]
+        )
+        repo = M3OHospitalRepoImpl("token", fake_api.build_client())
+        stored_entries = [stored_entry async for stored_entry in repo.iter_hospitals()]
+        # The fake answers every table with all records, and
+        # added_since is stored to the millisecond.
+        assert [
+            stored_entry.dict(exclude={"added_since"})
+            for stored_entry in stored_entries[:2]
+        ] == [
+            hospital_entry.dict(exclude={"added_since"})
+            for hospital_entry in hospital_entries
+        ]
+
+    async def test_reads_pages_from_cursor_offset(
+        self, valid_unclaimed_hospital: dict
+    ) -> None:
+        valid_unclaimed_hospital.pop("hospital_id")
+        fake_api = FakeM3OApi(
+            existing_records=[
+                m3o_dto.parse_to_dict(
+                    "unclaimed_hospital",
+                    HospitalEntryAggregate.build_factory(
+                        **{**valid_unclaimed_hospital, "hospital_name": name}
+                    ),
+                )
+                for name in ("First Hospital", "Second Hospital", "Third Hospital")
+            ]
+        )
+        repo = M3OHospitalRepoImpl("token", fake_api.build_client())
+        pages = [
+            page async for page in repo.iter_hospital_pages(2, "unclaimed_hospital:1")
+        ]
+        assert [
+            (hospital_entry.hospital_name, cursor)
+            for page in pages
+            for hospital_entry, cursor in page
+        ] == [
+            ("Second Hospital", "unclaimed_hospital:2"),
+            ("Third Hospital", "unclaimed_hospital:3"),
+        ]
+        assert [
+            (payload["table"], payload["offset"]) for _, payload in fake_api.calls
+        ] == [("unclaimed_hospital", 1), ("unclaimed_hospital", 3)]
+        with pytest.raises(InvalidExportCursorError):
+            async for _ in repo.iter_hospital_pages(2, "unclaimed_hospital:-1"):
+                pass
+        with pytest.raises(InvalidExportCursorError):
+            async for _ in repo.iter_hospital_pages(
+                2, "unclaimed_hospital:1", "unverified_hospital"
+            ):
+                pass
+
+    async def test_warms_from_stored_records(
+        self, valid_unverified_hospital: dict
+    ) -> None:
+        hospital_entry = HospitalEntryAggregate.build_factory(
+            **valid_unverified_hospital
+        )
+        stored_record = m3o_dto.parse_to_dict("unverified_hospital", hospital_entry)
+        fake_api = FakeM3OApi(existing_records=[stored_record])
+        uow_factory = M3OHospitalUOWFactory(
+            "token",
+            transport=httpx.MockTransport(fake_api),
+            hospital_index=dedup_index.HospitalDedupIndex(authoritative=True),
+        )
+        await uow_factory.startup()
+        assert uow_factory.hospital_index.is_known(
+            "unverified_hospital", hospital_entry.identity_key
+        )
+        assert not uow_factory.hospital_index.is_known(
+            "unverified_hospital", f"new {hospital_entry.identity_key}"
+        )
+        await uow_factory.shutdown()
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestContentAddressedIds:
+    """Tests the opt in uuid5 hospital ids."""
+
+    async def test_existence_check_reads_by_id(
+        self, valid_unclaimed_hospital: dict
+    ) -> None:
+        valid_unclaimed_hospital.pop("hospital_id")
+        with mock.patch.object(
+            registration, "HOSPITAL_ID_MODE", registration.HospitalIdMode.Content
+        ):
+            hospital_entry = HospitalEntryAggregate.build_factory(
+                **valid_unclaimed_hospital
+            )
+            duplicate_entry = HospitalEntryAggregate.build_factory(
+                **{**valid_unclaimed_hospital, "hospital_name": " rajajayah paramvir"}
+            )
+        assert hospital_entry.hospital_id.version == 5
+        assert hospital_entry.hospital_id == duplicate_entry.hospital_id
+        fake_api = FakeM3OApi(existing_records=[{"id": "abc"}])
+        repo = M3OHospitalRepoImpl("token", fake_api.build_client())
+        with pytest.raises(RecordAlreadyExistsError):
+            await repo.save_unclaimed_hospital(**duplicate_entry.dict())
+        _, read_payload = fake_api.calls[-1]
+        assert read_payload == {
+            "table": "unclaimed_hospital",
+            "id": hospital_entry.hospital_id.hex,
+        }
+
+    async def test_migration_moves_uuid1_records(
+        self, valid_unclaimed_hospital: dict
+    ) -> None:
+        hospital_entry = HospitalEntryAggregate.build_factory(
+            **valid_unclaimed_hospital
+        )
+        stored_record = m3o_dto.parse_to_dict("unclaimed_hospital", hospital_entry)
+        fake_api = FakeM3OApi(existing_records=[stored_record])
+        repo = M3OHospitalRepoImpl("token", fake_api.build_client())
+        dry_run_report = await id_migration.migrate_table(repo, "unclaimed_hospital")
+        assert dry_run_report.migrated == 1
+        assert [path for path, _ in fake_api.calls] == ["/v1/db/Read"]
+        report = await id_migration.migrate_table(
+            repo, "unclaimed_hospital", apply=True
+        )
+        assert report.migrated == 1 and not report.duplicate_ids
+        (_, create_payload), (_, delete_payload) = fake_api.calls[-2:]
+        assert create_payload["record"]["id"] == hospital_entry.content_id.hex
+        assert delete_payload["id"] == hospital_entry.hospital_id.hex
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestM3OHospitalUOWConcurrency:
+    """Tests overlapping requests get isolated units of work."""
+
+    async def test_overlapping_registrations_commit_once(
+        self, registration_entry_unclaimed: dto.ToHospitalRegistrationEntry
+    ) -> None:
+        fake_api = FakeM3OApi(latency=0.01)
+        bootstrapper = BootStrapDI(
+            mapping_di=DIMapping(
+                hospital_uow_async=M3OHospitalUOWFactory(
+                    "token", transport=httpx.MockTransport(fake_api)
+                ),
+                hospital_registration_application_service=HospitalRegistrationApplicationService,
+            )
+        )
+        registration_entries = [
+            registration_entry_unclaimed.copy(update={"name": f"Hospital {idx}"})
+            for idx in range(25)
+        ]
+        await bootstrapper.run()
+        with mock.patch.object(bootstrap, "bootstrapper", bootstrapper):
+            await asyncio.gather(
+                *(register_hospital_center(entry) for entry in registration_entries)
+            )
+        await bootstrapper.shutdown()
+        created_names = [
+            payload["record"]["name"]
+            for path, payload in fake_api.calls
+            if path.endswith("/Create")
+        ]
+        assert sorted(created_names) == sorted(
+            entry.name for entry in registration_entries
+        )
+
+
+@pytest.mark.fast
+class TestCircuitBreaker:
+    """Tests the breaker opens, lets one trial through and closes."""
+
+    def test_opens_after_consecutive_failures(self) -> None:
+        now = [0.0]
+        breaker = resilience.CircuitBreaker(
+            "test", failure_threshold=2, reset_seconds=10, clock=lambda: now[0]
+        )
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.check()
+        breaker.record_failure()
+        assert breaker.state == resilience.CircuitState.Open
+        now[0] = 4
+        with pytest.raises(ServiceUnavailableError) as exc_info:
+            breaker.check()
+        assert exc_info.value.retry_after_seconds == 6
+        now[0] = 10
+        breaker.check()
+        with pytest.raises(ServiceUnavailableError):
+            breaker.check()
+        breaker.record_failure()
+        assert breaker.state == resilience.CircuitState.Open
+        now[0] = 20
+        breaker.check()
+        breaker.record_success()
+        assert breaker.state == resilience.CircuitState.Closed
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestM3OResilience:
+    """Tests M3O calls get deadlines, read retries and fail fast when down."""
+
+    async def test_reads_are_retried_and_a_failed_check_raises(
+        self, valid_unverified_hospital: dict
+    ) -> None:
+        statuses = [503, 200]
+
+        async def flaky_api(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(statuses.pop(0) if statuses else 500, json={})
+
+        repo = M3OHospitalRepoImpl(
+            "token",
+            m3o_client.build_async_client(transport=httpx.MockTransport(flaky_api)),
+            resilience_settings=m3o_client.M3OResilienceSettings(
+                retry_base_delay_seconds=0.001
+            ),
+        )
+        hospital_entry = HospitalEntryAggregate.build_factory(
+            **valid_unverified_hospital
+        )
+        assert not await repo._record_exists("unverified_hospital", hospital_entry)
+        with pytest.raises(ServiceUnavailableError):
+            await repo._record_exists("unverified_hospital", hospital_entry)
+
+    async def test_deadline_bounds_a_hanging_call(self) -> None:
+        repo = M3OHospitalRepoImpl(
+            "token",
+            FakeM3OApi(latency=1).build_client(),
+            resilience_settings=m3o_client.M3OResilienceSettings(deadline_seconds=0.02),
+        )
+        with pytest.raises(ServiceUnavailableError) as exc_info:
+            await repo.create_record("unverified_hospital", {"id": "1"})
+        assert isinstance(exc_info.value.__cause__, httpx.TimeoutException)
+
+    async def test_open_breaker_answers_503_and_degrades_health(self) -> None:
+        async def failing_api(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(500, json={})
+
+        uow_factory = M3OHospitalUOWFactory(
+            "token",
+            transport=httpx.MockTransport(failing_api),
+            resilience_settings=m3o_client.M3OResilienceSettings(
+                read_attempts=1, breaker_failure_threshold=1
+            ),
+        )
+        bootstrapper = BootStrapDI(
+            mapping_di=DIMapping(
+                hospital_uow_async=uow_factory,
+                hospital_registration_application_service=HospitalRegistrationApplicationService,
+            )
+        )
+        registration_body = {
+            "name": "Breaker Hospital",
+            "ownership_type": "private",
+            "hospital_contact_number": "+919425411234",
+            "verified_status": "verified",
+            "address": {
+                "street": "Rajaji marg",
+                "city": "Newark",
+                "state": "MP",
+                "country": "IN",
+            },
+        }
+        # The registration's check fails and opens the breaker.
+        await bootstrapper.run()
+        with mock.patch.object(bootstrap, "bootstrapper", bootstrapper):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app.app),
+                base_url="http://test",
+            ) as client:
+                failed_response, response = [
+                    await client.post("/register-hospital", json=registration_body)
+                    for _ in range(2)
+                ]
+                health = (await client.get("/health")).json()
+        await bootstrapper.shutdown()
+        assert failed_response.status_code == 503
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "10"
+        assert response.json() == {"message": "m3o is unavailable."}
+        assert health["status"] == "degraded"
+        assert health["repo"]["circuit_breaker"] == "open"
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestM3OUOWDrain:
+    """Tests draining commits or rejects every open unit of work."""
+
+    @staticmethod
+    def build_factory(
+        fake_api: FakeM3OApi, drain_timeout_seconds: float
+    ) -> M3OHospitalUOWFactory:
+        return M3OHospitalUOWFactory(
+            "token",
+            transport=httpx.MockTransport(fake_api),
+            resilience_settings=m3o_client.M3OResilienceSettings(
+                drain_timeout_seconds=drain_timeout_seconds
+            ),
+        )
+
+    async def test_drain_rejects_uncommitted_and_refuses_new(
+        self, valid_unclaimed_hospital: dict
+    ) -> None:
+        fake_api = FakeM3OApi()
+        uow_factory = self.build_factory(fake_api, drain_timeout_seconds=0.05)
+        await uow_factory.startup()
+        hospital_entry = HospitalEntryAggregate.build_factory(
+            **valid_unclaimed_hospital
+        )
+        uow = await uow_factory().__aenter__()
+        await uow.hospital_repo.save_unclaimed_hospital(**hospital_entry.dict())
+        await uow_factory.drain()
+        with pytest.raises(ServiceUnavailableError):
+            await uow.commit()
+        with pytest.raises(ServiceUnavailableError):
+            async with uow_factory():
+                pass
+        await uow_factory.shutdown()
+        assert not uow.hospital_repo.pending_transaction
+        assert not [path for path, _ in fake_api.calls if path.endswith("/Create")]
+
+    async def test_drain_flushes_commits_of_cancelled_requests(
+        self, valid_unclaimed_hospital: dict
+    ) -> None:
+        fake_api = FakeM3OApi(latency=0.05)
+        uow_factory = self.build_factory(fake_api, drain_timeout_seconds=0)
+        await uow_factory.startup()
+        hospital_entry = HospitalEntryAggregate.build_factory(
+            **valid_unclaimed_hospital
+        )
+
+        async def register() -> None:
+            async with uow_factory() as uow_ctx:
+                await uow_ctx.hospital_repo.save_unclaimed_hospital(
+                    **hospital_entry.dict()
+                )
+                await uow_ctx.commit()
+
+        request = asyncio.create_task(register())
+        # Cancelled while its commit waits on the Create call.
+        while not any(path.endswith("/Create") for path, _ in fake_api.calls):
+            await asyncio.sleep(0.01)
+        request.cancel()
+        await uow_factory.drain()
+        await uow_factory.shutdown()
+        assert request.cancelled()
+        create_calls = [path for path, _ in fake_api.calls if path.endswith("/Create")]
+        assert len(create_calls) == 1
+        assert len(uow_factory.hospital_index) == 1
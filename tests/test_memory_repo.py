@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from registrations.domain import dto
+from registrations.domain.hospital.registration import HospitalEntryAggregate
+from registrations.domain.services.application_services import (
+    HospitalRegistrationApplicationService,
+)
+from registrations.infrastructure.adapters.repos.memory.repo import (
+    UNCLAIMED_TABLE,
+    UNVERIFIED_TABLE,
+    InMemoryHospitalUOWFactory,
+    InMemorySettings,
+)
+from registrations.utils.errors import RecordAlreadyExistsError
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestInMemoryHospitalUOW:
+    """Tests the in-memory adapter stores, rejects and rolls back."""
+
+    async def test_commit_stores_and_duplicate_conflicts(
+        self, valid_unverified_hospital: dict
+    ) -> None:
+        uow_factory = InMemoryHospitalUOWFactory()
+        hospital_entry = HospitalEntryAggregate.build_factory(
+            **valid_unverified_hospital
+        )
+        async with uow_factory() as uow_ctx:
+            await uow_ctx.hospital_repo.save_hospital(hospital_entry)
+            await uow_ctx.commit()
+        duplicate_entry = hospital_entry.dict()
+        duplicate_entry.pop("hospital_id")
+        duplicate_entry["hospital_name"] = "  rajajayah PARAMVIR "
+        with pytest.raises(RecordAlreadyExistsError):
+            async with uow_factory() as uow_ctx:
+                await uow_ctx.hospital_repo.save_unverified_hospital(**duplicate_entry)
+        assert list(uow_factory.store.tables[UNVERIFIED_TABLE].values()) == [
+            hospital_entry
+        ]
+        async with uow_factory() as uow_ctx:
+            assert [
+                stored_entry
+                async for stored_entry in uow_ctx.hospital_repo.iter_hospitals()
+            ] == [hospital_entry]
+
+    async def test_uncommitted_and_conflicting_commits_store_nothing(
+        self, valid_unclaimed_hospital: dict
+    ) -> None:
+        uow_factory = InMemoryHospitalUOWFactory()
+        async with uow_factory() as uow_ctx:
+            await uow_ctx.hospital_repo.save_unclaimed_hospital(
+                **valid_unclaimed_hospital
+            )
+        assert not uow_factory.store.tables[UNCLAIMED_TABLE]
+        # Both stage the hospital before either commits; the last loses.
+        first_uow, second_uow = uow_factory(), uow_factory()
+        for uow_ctx in (first_uow, second_uow):
+            await uow_ctx.hospital_repo.save_unclaimed_hospital(
+                **valid_unclaimed_hospital
+            )
+        await first_uow.commit()
+        with pytest.raises(RecordAlreadyExistsError):
+            await second_uow.commit()
+        assert len(uow_factory.store) == 1
+        assert not second_uow.hospital_repo.pending_hospitals
+
+    async def test_latency_is_awaited_without_blocking(
+        self,
+        registration_entry_manual_verification: dto.ToHospitalRegistrationEntry,
+        registration_entry_unclaimed: dto.ToHospitalRegistrationEntry,
+    ) -> None:
+        uow_factory = InMemoryHospitalUOWFactory(InMemorySettings(latency_ms=50))
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                HospitalRegistrationApplicationService.register_hospital(
+                    uow_factory, registration_entry
+                )
+                for registration_entry in (
+                    registration_entry_manual_verification,
+                    registration_entry_unclaimed,
+                )
+            )
+        )
+        # A stage and a commit each wait 50ms, overlapping across registrations.
+        assert time.perf_counter() - started < 0.19
+        assert len(uow_factory.store) == 2
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import httpx
+import pytest
+
+from registrations.domain.services.application_services import (
+    HospitalRegistrationApplicationService,
+)
+from registrations.infrastructure.adapters.api import app as api_app
+from registrations.infrastructure.adapters.api import bootstrap
+from registrations.infrastructure.adapters.api.di_builder import (
+    BootStrapDI,
+    DIMapping,
+)
+from registrations.infrastructure.adapters.repos.memory.repo import (
+    InMemoryHospitalUOWFactory,
+)
+from registrations.utils import metrics
+
+
+@pytest.mark.fast
+class TestMetricsRegistry:
+    """Tests the text exposition of counters, gauges and histograms."""
+
+    def test_renders_samples_by_label(self) -> None:
+        registry = metrics.MetricsRegistry()
+        counter = metrics.Counter(
+            "calls_total", "Calls.", ("endpoint",), registry=registry
+        )
+        histogram = metrics.Histogram(
+            "wait_seconds", "Waits.", buckets=(0.1, 1.0), registry=registry
+        )
+        gauge = metrics.Gauge("pool", "Pool.", ("state",), registry=registry)
+        counter.inc('say "hi"')
+        counter.inc('say "hi"', amount=2)
+        for seconds in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(seconds)
+        gauge.set_function(lambda: {("open",): 3})
+        assert registry.render().splitlines() == [
+            "# HELP calls_total Calls.",
+            "# TYPE calls_total counter",
+            'calls_total{endpoint="say \\"hi\\""} 3',
+            "# HELP wait_seconds Waits.",
+            "# TYPE wait_seconds histogram",
+            'wait_seconds_bucket{le="0.1"} 2',
+            'wait_seconds_bucket{le="1"} 3',
+            'wait_seconds_bucket{le="+Inf"} 4',
+            "wait_seconds_sum 3.65",
+            "wait_seconds_count 4",
+            "# HELP pool Pool.",
+            "# TYPE pool gauge",
+            'pool{state="open"} 3',
+        ]
+        with pytest.raises(ValueError):
+            metrics.Counter("calls_total", "Again.", registry=registry)
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestMetricsEndpoint:
+    """Tests registrations are measured and served from /metrics."""
+
+    async def test_registration_outcomes_and_stages(self) -> None:
+        bootstrapper = BootStrapDI(
+            mapping_di=DIMapping(
+                hospital_uow_async=InMemoryHospitalUOWFactory(),
+                hospital_registration_application_service=HospitalRegistrationApplicationService,
+            )
+        )
+        registration_body = {
+            "name": "Metrics Hospital",
+            "ownership_type": "private",
+            "hospital_contact_number": "+919425411234",
+            "verified_status": "verified",
+            "address": {
+                "street": "Rajaji marg",
+                "city": "Newark",
+                "state": "MP",
+                "country": "IN",
+            },
+        }
+        handler = "register_hospital_center"
+        responses_before = {
+            status: metrics.RESPONSES.value(handler, status)
+            for status in ("201", "400", "409", "422")
+        }
+        duplicates_before = metrics.DUPLICATES.value()
+        commits_before = metrics.STAGE_LATENCY.count("uow_commit")
+        with mock.patch.object(bootstrap, "bootstrapper", bootstrapper):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app.app),
+                base_url="http://test",
+            ) as client:
+                for body in (
+                    registration_body,
+                    registration_body,
+                    {"name": "x"},
+                    {"name": "x", "verified_status": "verified"},
+                ):
+                    await client.post("/register-hospital", json=body)
+                response = await client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert {
+            status: metrics.RESPONSES.value(handler, status) - responses_before[status]
+            for status in responses_before
+        } == {"201": 1, "400": 1, "409": 1, "422": 1}
+        assert metrics.DUPLICATES.value() - duplicates_before == 1
+        assert metrics.STAGE_LATENCY.count("uow_commit") - commits_before == 1
+        assert metrics.REQUESTS_IN_FLIGHT.value() == 0
+        assert (
+            'registrations_stage_duration_seconds_count{stage="validation"}'
+            in response.text
+        )
+        assert 'registrations_phone_number_cache_lookups_total{result="hit"}' in (
+            response.text
+        )
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import os
+from typing import AsyncIterator
+
+import pytest
+
+from registrations.domain.hospital.registration import HospitalEntryAggregate
+from registrations.domain.services.hospital_registration_services import (
+    RegisterHospitalService,
+)
+from registrations.utils.errors import RecordAlreadyExistsError
+
+# **************************************************** #
+# These tests run against a disposable local Postgres,
+# e.g. POSTGRES_TEST_DSN=postgresql://postgres@localhost/test
+# Its hospital tables are truncated by every test.
+# **************************************************** #
+POSTGRES_TEST_DSN = os.getenv("POSTGRES_TEST_DSN")
+
+pytestmark = pytest.mark.skipif(
+    not POSTGRES_TEST_DSN, reason="POSTGRES_TEST_DSN is not set."
+)
+
+if POSTGRES_TEST_DSN:
+    from registrations.infrastructure.adapters.repos.postgres import pg_schema
+    from registrations.infrastructure.adapters.repos.postgres.pg_pool import (
+        PostgresSettings,
+    )
+    from registrations.infrastructure.adapters.repos.postgres.repo import (
+        PostgresHospitalUOWFactory,
+    )
+
+
+@pytest.fixture
+async def uow_factory() -> AsyncIterator[PostgresHospitalUOWFactory]:
+    factory = PostgresHospitalUOWFactory(
+        PostgresSettings(dsn=POSTGRES_TEST_DSN, pool_min_size=1, pool_max_size=4)
+    )
+    await factory.startup()
+    async with factory() as uow_ctx:
+        await uow_ctx.hospital_repo.connection.execute(
+            f"TRUNCATE {pg_schema.UNVERIFIED_TABLE}, {pg_schema.UNCLAIMED_TABLE}"
+        )
+        await uow_ctx.commit()
+    yield factory
+    await factory.shutdown()
+
+
+async def count_rows(factory: PostgresHospitalUOWFactory, table: str) -> int:
+    async with factory() as uow_ctx:
+        cursor = await uow_ctx.hospital_repo.connection.execute(
+            f"SELECT count(*) FROM {table}"
+        )
+        (row_count,) = await cursor.fetchone()
+        return row_count
+
+
+@pytest.mark.slow
+@pytest.mark.usefixtures("anyio_backend")
+class TestPostgresHospitalUOW:
+    """Tests the PostgreSQL adapter against a local database."""
+
+    async def test_commit_persists_and_duplicate_conflicts(
+        self, uow_factory: PostgresHospitalUOWFactory, valid_unverified_hospital: dict
+    ) -> None:
+        hospital_entry = HospitalEntryAggregate.build_factory(
+            **valid_unverified_hospital
+        )
+        async with uow_factory() as uow_ctx:
+            await uow_ctx.hospital_repo.save_unverified_hospital(
+                **hospital_entry.dict()
+            )
+            await uow_ctx.commit()
+        duplicate_entry = hospital_entry.dict()
+        duplicate_entry.pop("hospital_id")
+        duplicate_entry["hospital_name"] = "  rajajayah PARAMVIR "
+        with pytest.raises(RecordAlreadyExistsError):
+            async with uow_factory() as uow_ctx:
+                await uow_ctx.hospital_repo.save_unverified_hospital(**duplicate_entry)
+        assert await count_rows(uow_factory, pg_schema.UNVERIFIED_TABLE) == 1
+
+    async def test_duplicates_match_the_domain_identity_key(
+        self, uow_factory: PostgresHospitalUOWFactory, valid_unclaimed_hospital: dict
+    ) -> None:
+        valid_unclaimed_hospital.pop("hospital_id")
+        async with uow_factory() as uow_ctx:
+            await uow_ctx.hospital_repo.save_unclaimed_hospital(
+                **{**valid_unclaimed_hospital, "hospital_name": "Straße Hospital"}
+            )
+            await uow_ctx.commit()
+        # Case folded and stripped of any whitespace, as the domain does.
+        with pytest.raises(RecordAlreadyExistsError):
+            async with uow_factory() as uow_ctx:
+                await uow_ctx.hospital_repo.save_unclaimed_hospital(
+                    **{
+                        **valid_unclaimed_hospital,
+                        "hospital_name": "\tSTRASSE hospital\n",
+                    }
+                )
+        assert await count_rows(uow_factory, pg_schema.UNCLAIMED_TABLE) == 1
+
+    async def test_uncommitted_work_is_rolled_back(
+        self, uow_factory: PostgresHospitalUOWFactory, valid_unclaimed_hospital: dict
+    ) -> None:
+        async with uow_factory() as uow_ctx:
+            await uow_ctx.hospital_repo.save_unclaimed_hospital(
+                **valid_unclaimed_hospital
+            )
+        assert await count_rows(uow_factory, pg_schema.UNCLAIMED_TABLE) == 0
+
+    async def test_copy_bulk_insert_skips_duplicates(
+        self, uow_factory: PostgresHospitalUOWFactory, valid_unclaimed_hospital: dict
+    ) -> None:
+        valid_unclaimed_hospital.pop("hospital_id")
+        hospital_entries = [
+            RegisterHospitalService.build_hospital_factory(
+                **{**valid_unclaimed_hospital, "hospital_name": name}
+            )
+            for name in ("First Hospital", "Second Hospital", "first hospital")
+        ]
+        created_flags = await RegisterHospitalService.register_hospitals_batch(
+            uow_factory, hospital_entries
+        )
+        assert created_flags == [True, True, False]
+        assert await count_rows(uow_factory, pg_schema.UNCLAIMED_TABLE) == 2
+
+    async def test_reads_back_stored_hospitals(
+        self, uow_factory: PostgresHospitalUOWFactory, valid_unverified_hospital: dict
+    ) -> None:
+        hospital_entry = HospitalEntryAggregate.build_factory(
+            **valid_unverified_hospital
+        )
+        async with uow_factory() as uow_ctx:
+            await uow_ctx.hospital_repo.save_unverified_hospital(
+                **hospital_entry.dict()
+            )
+            await uow_ctx.commit()
+        async with uow_factory() as uow_ctx:
+            stored_entries = [
+                stored_entry
+                async for stored_entry in uow_ctx.hospital_repo.iter_hospitals()
+            ]
+        # timestamptz reads back timezone aware.
+        assert [
+            stored_entry.dict(exclude={"added_since"})
+            for stored_entry in stored_entries
+        ] == [hospital_entry.dict(exclude={"added_since"})]
+
+    async def test_reads_pages_after_cursor_in_insertion_order(
+        self, uow_factory: PostgresHospitalUOWFactory, valid_unclaimed_hospital: dict
+    ) -> None:
+        valid_unclaimed_hospital.pop("hospital_id")
+        hospital_entries = [
+            RegisterHospitalService.build_hospital_factory(
+                **{**valid_unclaimed_hospital, "hospital_name": name}
+            )
+            for name in ("First Hospital", "Second Hospital", "Third Hospital")
+        ]
+        await RegisterHospitalService.register_hospitals_batch(
+            uow_factory, hospital_entries
+        )
+        async with uow_factory() as uow_ctx:
+            hospital_repo = uow_ctx.hospital_repo
+            pages = [page async for page in hospital_repo.iter_hospital_pages(2)]
+            resumed_ids = [
+                hospital_entry.hospital_id
+                async for page in hospital_repo.iter_hospital_pages(2, pages[0][0][1])
+                for hospital_entry, _ in page
+            ]
+        assert [len(page) for page in pages] == [2, 1]
+        read_ids = [
+            hospital_entry.hospital_id for page in pages for hospital_entry, _ in page
+        ]
+        assert read_ids == [
+            hospital_entry.hospital_id for hospital_entry in hospital_entries
+        ]
+        assert resumed_ids == read_ids[1:]
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import os
+import time
+from unittest import mock
+
+import fastapi
+import httpx
+import pytest
+
+from registrations.infrastructure.adapters.api.profiler_middleware import (
+    ProfilerMiddleware,
+)
+from registrations.infrastructure.adapters.api.routers import profiler_router
+from registrations.utils.profiler import ProfilerSettings, SamplingProfiler
+
+
+def spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.mark.fast
+class TestSamplingProfiler:
+    """Tests stacks are sampled, collapsed and written out."""
+
+    def test_profile_written_when_time_is_up(self, tmp_path) -> None:
+        profiler = SamplingProfiler(
+            ProfilerSettings(output_dir=str(tmp_path), interval_ms=1)
+        )
+        assert not profiler.sample_request()
+        profiler.start(seconds=0.1)
+        spin(0.2)
+        assert not profiler.running
+        output_path = profiler.stop()
+        assert output_path is not None and os.path.dirname(output_path) == str(tmp_path)
+        with open(output_path, encoding="utf-8") as output_file:
+            collapsed = output_file.read()
+        assert collapsed == profiler.collapsed()
+        stack, count = collapsed.splitlines()[0].rsplit(" ", 1)
+        assert stack.endswith(f"{__name__}:spin") and int(count) > 0
+        assert profiler.sample_count >= int(count)
+
+    def test_request_fraction_samples_in_flight_requests_only(self, tmp_path) -> None:
+        profiler = SamplingProfiler(
+            ProfilerSettings(output_dir=str(tmp_path), interval_ms=1)
+        )
+        profiler.start(seconds=10, request_fraction=1)
+        with pytest.raises(RuntimeError):
+            profiler.start(seconds=10)
+        spin(0.05)
+        assert profiler.sample_count == 0
+        assert profiler.sample_request()
+        profiler.request_started()
+        spin(0.05)
+        profiler.request_finished()
+        profiler.stop()
+        assert profiler.sample_count > 0
+        assert not profiler.sample_request()
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestProfilerEndpoints:
+    """Tests the admin guarded profiler endpoints of a worker."""
+
+    async def test_guarded_profile_of_sampled_requests(self, tmp_path) -> None:
+        profiler = SamplingProfiler(
+            ProfilerSettings(
+                admin_token="secret", output_dir=str(tmp_path), interval_ms=1
+            )
+        )
+        app = fastapi.FastAPI()
+        app.include_router(profiler_router.router)
+        app.add_middleware(ProfilerMiddleware, profiler=profiler)
+
+        @app.get("/busy")
+        async def busy_endpoint() -> None:
+            spin(0.1)
+
+        admin_headers = {"Authorization": "Bearer secret"}
+        with mock.patch.object(profiler_router, "PROFILER", profiler):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                response = await client.post("/admin/profiler/start")
+                assert response.status_code == 401
+                response = await client.post(
+                    "/admin/profiler/start",
+                    params={"seconds": 10, "request_fraction": 1},
+                    headers=admin_headers,
+                )
+                assert response.status_code == 202 and response.json()["running"]
+                response = await client.post(
+                    "/admin/profiler/start", headers=admin_headers
+                )
+                assert response.status_code == 409
+                await client.get("/busy")
+                response = await client.post(
+                    "/admin/profiler/stop", headers=admin_headers
+                )
+                status = response.json()
+                collapsed = await client.get(
+                    "/admin/profiler/collapsed", headers=admin_headers
+                )
+            profiler.settings.admin_token = None
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                response = await client.get("/admin/profiler", headers=admin_headers)
+                assert response.status_code == 404
+        assert not status["running"] and status["sample_count"] > 0
+        assert os.path.exists(status["output_path"])
+        assert "busy_endpoint;" in collapsed.text
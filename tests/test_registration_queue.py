@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import httpx
+import pytest
+
+from registrations.domain import dto
+from registrations.domain.services.application_services import (
+    HospitalRegistrationApplicationService,
+)
+from registrations.infrastructure.adapters.api import app as api_app
+from registrations.infrastructure.adapters.api import bootstrap
+from registrations.infrastructure.adapters.api.di_builder import (
+    BootStrapDI,
+    DIMapping,
+)
+from registrations.infrastructure.adapters.repos.memory.repo import (
+    InMemoryHospitalUOWFactory,
+    InMemorySettings,
+)
+from registrations.infrastructure.services.registration_queue import (
+    RegistrationQueue,
+    RegistrationQueueSettings,
+)
+from registrations.utils.errors import RegistrationQueueFullError
+
+
+class FailingRegistrationService(HospitalRegistrationApplicationService):
+    @classmethod
+    async def persist_hospital_entry(cls, *_args: object, **_kwargs: object) -> None:
+        raise RuntimeError("Backend is down.")
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestRegistrationQueue:
+    """Tests accepted registrations are stored by the background workers."""
+
+    async def test_tickets_report_created_duplicate_and_failed(
+        self,
+        registration_entry_manual_verification: dto.ToHospitalRegistrationEntry,
+    ) -> None:
+        uow_factory = InMemoryHospitalUOWFactory()
+        registration_queue = RegistrationQueue(HospitalRegistrationApplicationService)
+        with pytest.raises(RegistrationQueueFullError):
+            registration_queue.submit(
+                HospitalRegistrationApplicationService.build_hospital_entry(
+                    registration_entry_manual_verification
+                )
+            )
+        await registration_queue.start(uow_factory)
+        tickets = [
+            registration_queue.submit(
+                HospitalRegistrationApplicationService.build_hospital_entry(
+                    registration_entry_manual_verification
+                )
+            )
+            for _ in range(2)
+        ]
+        assert [ticket.status for ticket in tickets] == [
+            dto.RegistrationTicketStatus.Pending
+        ] * 2
+        await registration_queue.drain()
+        assert [
+            registration_queue.ticket(ticket.ticket).status for ticket in tickets
+        ] == [
+            dto.RegistrationTicketStatus.Created,
+            dto.RegistrationTicketStatus.Duplicate,
+        ]
+        assert len(uow_factory.store) == 1
+
+        failing_queue = RegistrationQueue(FailingRegistrationService)
+        await failing_queue.start(uow_factory)
+        ticket = failing_queue.submit(
+            HospitalRegistrationApplicationService.build_hospital_entry(
+                registration_entry_manual_verification
+            )
+        )
+        await failing_queue.drain()
+        failed_ticket = failing_queue.ticket(ticket.ticket)
+        assert failed_ticket.status == dto.RegistrationTicketStatus.Failed
+        assert failed_ticket.error == "Backend is down."
+
+    async def test_full_queue_rejects_and_drain_times_out(
+        self,
+        registration_entry_manual_verification: dto.ToHospitalRegistrationEntry,
+        registration_entry_unclaimed: dto.ToHospitalRegistrationEntry,
+    ) -> None:
+        uow_factory = InMemoryHospitalUOWFactory(InMemorySettings(latency_ms=100))
+        registration_queue = RegistrationQueue(
+            HospitalRegistrationApplicationService,
+            RegistrationQueueSettings(max_size=1, workers=1),
+        )
+        await registration_queue.start(uow_factory)
+        ticket = registration_queue.submit(
+            HospitalRegistrationApplicationService.build_hospital_entry(
+                registration_entry_manual_verification
+            )
+        )
+        with pytest.raises(RegistrationQueueFullError):
+            registration_queue.submit(
+                HospitalRegistrationApplicationService.build_hospital_entry(
+                    registration_entry_unclaimed
+                )
+            )
+        await registration_queue.drain(timeout_seconds=0.01)
+        assert (
+            registration_queue.ticket(ticket.ticket).status
+            == dto.RegistrationTicketStatus.Pending
+        )
+        assert len(uow_factory.store) == 0
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestAcceptedRegistrationEndpoints:
+    """Tests the 202 Accepted mode of /register-hospital."""
+
+    async def test_accept_poll_and_backpressure(
+        self, valid_unverified_hospital: dict
+    ) -> None:
+        registration_body = {
+            "name": "Queued Hospital",
+            "ownership_type": "private",
+            "hospital_contact_number": "+919425411234",
+            "verified_status": "verified",
+            "address": {
+                "street": "Rajaji marg",
+                "city": "Newark",
+                "state": "MP",
+                "country": "IN",
+            },
+        }
+        uow_factory = InMemoryHospitalUOWFactory(InMemorySettings(latency_ms=20))
+        bootstrapper = BootStrapDI(
+            mapping_di=DIMapping(
+                hospital_uow_async=uow_factory,
+                hospital_registration_application_service=HospitalRegistrationApplicationService,
+                hospital_registration_queue=RegistrationQueue(
+                    HospitalRegistrationApplicationService,
+                    RegistrationQueueSettings(max_size=1, workers=1),
+                ),
+            )
+        )
+        await bootstrapper.run()
+        with mock.patch.object(bootstrap, "bootstrapper", bootstrapper):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app.app),
+                base_url="http://test",
+            ) as client:
+                response = await client.post(
+                    "/register-hospital", json=registration_body
+                )
+                assert response.status_code == 202
+                ticket = response.json()
+                assert ticket["status"] == "pending"
+                assert (
+                    response.headers["location"] == f"/registrations/{ticket['ticket']}"
+                )
+                response = await client.post(
+                    "/register-hospital", json=registration_body
+                )
+                assert response.status_code == 503
+                assert response.headers["retry-after"] == "1"
+                response = await client.post("/register-hospital", json={"name": "x"})
+                assert response.status_code == 400
+                await bootstrapper.shutdown()
+                response = await client.get(f"/registrations/{ticket['ticket']}")
+                assert response.status_code == 200
+                assert response.json()["status"] == "created"
+                response = await client.get("/registrations/unknown")
+                assert response.status_code == 404
+        assert len(uow_factory.store) == 0  # Cleared by the shutdown after draining.
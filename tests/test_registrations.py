@@ -11,13 +11,17 @@ from concurrent.futures import Future
 from typing import Any, Literal, Optional
 from unittest import mock
 
+import httpx
 import pydantic
 import pytest
 
 from registrations.domain import dto
 from registrations.domain.hospital.registration import (
+    ContactPerson,
     HospitalEntryAggregate,
     HospitalEntryDictType,
+    PhoneNumber,
+    PhoneNumberCache,
     UnclaimedHospital,
     UnverifiedRegisteredHospital,
 )
@@ -33,6 +37,15 @@ from registrations.domain.services.hospital_registration_services import (
     HospitalEntityType,
     RegisterHospitalService,
 )
+from registrations.infrastructure.adapters.api import app as api_app
+from registrations.infrastructure.adapters.api import bootstrap
+from registrations.infrastructure.adapters.api.di_builder import (
+    BootStrapDI,
+    DIMapping,
+)
+from registrations.infrastructure.adapters.repos.memory.repo import (
+    InMemoryHospitalUOWFactory,
+)
 from registrations.utils.errors import (
     MissingRegistrationFieldError,
     ValidationModelType,
@@ -78,7 +91,7 @@ class FakeDBSession:
             return time.sleep(sec)
 
         with concurrent.futures.ThreadPoolExecutor() as t_executor:
-            return t_executor.submit(_sleep, 2)
+            return t_executor.submit(_sleep, 0)
 
 
 class FakeHospitalRepoImpl(InterfaceHospitalRepo):
@@ -156,7 +169,7 @@ class FakeHospitalUOWAsyncImpl(InterfaceHospitalUOW):
     async def close(self) -> Literal[UOWSessionFlag.CLOSED]:
         """Close the unit of work."""
         print("Closing UOW repo session")
-        await asyncio.sleep(2)
+        await asyncio.sleep(0)
         return UOWSessionFlag.CLOSED
 
     async def __aenter__(self) -> FakeHospitalUOWAsyncImpl:
@@ -376,4 +389,188 @@ class TestHospitalRegistrationApplicationService:
             assert repo_instance.is_successful is True
 
 
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestRegisterHospitalResponse:
+    """Tests the lean and echoed responses of /register-hospital."""
+
+    async def test_lean_response_and_echo_flag(self) -> None:
+        registration_body = {
+            "name": "Lean Hospital",
+            "ownership_type": "private",
+            "hospital_contact_number": "+919425411234",
+            "verified_status": "verified",
+            "address": {
+                "street": "Rajaji marg",
+                "city": "Newark",
+                "state": "MP",
+                "country": "IN",
+            },
+            "added_since": "2022-01-01",
+        }
+        uow_factory = InMemoryHospitalUOWFactory()
+        bootstrapper = BootStrapDI(
+            mapping_di=DIMapping(
+                hospital_uow_async=uow_factory,
+                hospital_registration_application_service=HospitalRegistrationApplicationService,
+            )
+        )
+        with mock.patch.object(bootstrap, "bootstrapper", bootstrapper):
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api_app.app),
+                base_url="http://test",
+            ) as client:
+                response = await client.post(
+                    "/register-hospital", json=registration_body
+                )
+                echo_response = await client.post(
+                    "/register-hospital",
+                    params={"echo": "true"},
+                    json={**registration_body, "name": "Echo Hospital"},
+                )
+        (hospital_entry,) = [
+            hospital_entry
+            for hospital_entry in uow_factory.store.tables[
+                "unclaimed_hospital"
+            ].values()
+            if hospital_entry.hospital_name == "Lean Hospital"
+        ]
+        assert response.status_code == 201
+        assert response.json() == {
+            "hospital_id": str(hospital_entry.hospital_id),
+            "status": "created",
+            "added_since": "2022-01-01T00:00:00",
+        }
+        assert echo_response.status_code == 201
+        assert echo_response.json() == {
+            **registration_body,
+            "name": "Echo Hospital",
+            "address": {**registration_body["address"], "street2": None},
+            "key_contact": None,
+            "geo_location": None,
+        }
+
+
+@pytest.mark.fast
+class TestParseDatetime:
+    """Tests each date time format accepted for added_since."""
+
+    @pytest.mark.parametrize(
+        "added_since, expected",
+        [
+            ("2022-01-01", datetime.datetime(2022, 1, 1)),
+            ("2022-01-01 10:30:00", datetime.datetime(2022, 1, 1, 10, 30)),
+            (
+                "2022-01-01 10:30:00 +0530",
+                datetime.datetime(
+                    2022,
+                    1,
+                    1,
+                    10,
+                    30,
+                    tzinfo=datetime.timezone(datetime.timedelta(hours=5, minutes=30)),
+                ),
+            ),
+            ("2022-01-01T10:30:00Z", datetime.datetime(2022, 1, 1, 10, 30)),
+        ],
+    )
+    def test_supported_formats(
+        self, added_since: str, expected: datetime.datetime
+    ) -> None:
+        assert dto.ToHospitalRegistrationEntry._parse_datetime(added_since) == expected
+
+    def test_invalid_format(self) -> None:
+        with pytest.raises(ValueError, match="Invalid date time format"):
+            dto.ToHospitalRegistrationEntry._parse_datetime("01/01/2022")
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestValidateOncePipeline:
+    """Tests a registration builds and validates its hospital once."""
+
+    async def test_entity_repo_gets_the_validated_hospital(
+        self,
+        registration_entry_manual_verification: dto.ToHospitalRegistrationEntry,
+    ) -> None:
+        saved_entries: list[HospitalEntityType] = []
+
+        class EntityHospitalRepo(FakeHospitalRepoImpl):
+            async def save_hospital(
+                self, hospital_entry: HospitalEntityType
+            ) -> HospitalEntityType:
+                saved_entries.append(hospital_entry)
+                return hospital_entry
+
+        class EntityHospitalUOW(FakeHospitalUOWAsyncImpl):
+            def __init__(self) -> None:
+                super().__init__()
+                self.hospital_repo = EntityHospitalRepo(FakeDBSession())
+
+        with mock.patch.object(
+            HospitalEntryAggregate,
+            "build_factory",
+            wraps=HospitalEntryAggregate.build_factory,
+        ) as build_factory_mock, mock.patch.object(
+            EntityHospitalRepo, "save_unverified_hospital"
+        ) as save_fields_mock:
+            await HospitalRegistrationApplicationService.register_hospital(
+                EntityHospitalUOW, registration_entry_manual_verification
+            )
+        build_factory_mock.assert_called_once()
+        save_fields_mock.assert_not_called()
+        (hospital_entry,) = saved_entries
+        assert isinstance(hospital_entry, UnverifiedRegisteredHospital)
+        assert hospital_entry.key_contact_registrar.mobile_number == PhoneNumber(
+            number="+919425416789"
+        )
+
+    def test_trusted_contact_person_needs_a_phone_number(self) -> None:
+        contact_person = ContactPerson.build_trusted(
+            name="Radhe Shyam",
+            mobile_number=PhoneNumber(number="+919425416789"),
+            email="radhe@hospital.org",
+        )
+        assert contact_person == ContactPerson(
+            name="Radhe Shyam",
+            mobile_number=PhoneNumber(number="+919425416789"),
+            email="radhe@hospital.org",
+        )
+        with pytest.raises(TypeError):
+            ContactPerson.build_trusted(
+                name="Radhe Shyam", mobile_number="+919425416789", email=None
+            )
+
+
+@pytest.mark.fast
+class TestPhoneNumberCache:
+    """Tests the phone number validation cache."""
+
+    def test_normalizes_to_e164_and_counts_hits(self) -> None:
+        phone_number_cache = PhoneNumberCache(maxsize=10)
+        assert phone_number_cache.normalize("+91 94254 11234") == "+919425411234"
+        assert phone_number_cache.normalize("+91 94254 11234") == "+919425411234"
+        # The E.164 form is cached along with the raw number.
+        assert phone_number_cache.normalize("+919425411234") == "+919425411234"
+        assert phone_number_cache.normalize("+91 12345") is None
+        assert phone_number_cache.normalize("+91 12345") is None
+        assert (phone_number_cache.hits, phone_number_cache.misses) == (3, 2)
+
+    def test_evicts_least_recently_used(self) -> None:
+        phone_number_cache = PhoneNumberCache(maxsize=2)
+        phone_number_cache.normalize("+919425411234")
+        phone_number_cache.normalize("+14155552671")
+        phone_number_cache.normalize("+919425411234")
+        phone_number_cache.normalize("+442079460958")
+        assert len(phone_number_cache) == 2
+        phone_number_cache.normalize("+919425411234")
+        phone_number_cache.normalize("+14155552671")
+        assert (phone_number_cache.hits, phone_number_cache.misses) == (2, 4)
+
+    def test_phone_number_keeps_e164_form(self) -> None:
+        assert PhoneNumber(number="+91 94254-11234").number == "+919425411234"
+        with pytest.raises(pydantic.ValidationError, match="Invalid number format"):
+            PhoneNumber(number="+91 12345")
+
+
 # TODO: add tests for bootstrapper and m30 repo, uow
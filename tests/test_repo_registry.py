@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+
+from registrations.infrastructure.adapters.api import startup_check
+from registrations.infrastructure.adapters.repos import registry
+from registrations.infrastructure.adapters.repos.memory.repo import (
+    InMemoryHospitalUOWFactory,
+)
+
+IMPORTTIME_STDERR = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _io
+import time:       300 |        420 |   io
+import time:      1000 |       1420 | registrations
+import time:        50 |         50 | ujson
+"""
+
+
+@pytest.mark.fast
+class TestRepoBackendRegistry:
+    """Tests repo backends are resolved by name when selected."""
+
+    def test_builtin_and_entry_point_backends(self) -> None:
+        assert registry.load_backend("memory") is InMemoryHospitalUOWFactory
+        with mock.patch.object(
+            registry,
+            "entry_point_backends",
+            return_value={"plugged": registry.REPO_BACKENDS["memory"]},
+        ) as entry_point_backends:
+            registry.load_backend("sqlite")
+            entry_point_backends.assert_not_called()
+            assert registry.load_backend("plugged") is InMemoryHospitalUOWFactory
+            with pytest.raises(ValueError, match="Unknown REPO_BACKEND: nosql."):
+                registry.load_backend("nosql")
+
+    def test_parses_importtime_report(self) -> None:
+        assert startup_check.parse_importtime(IMPORTTIME_STDERR) == [
+            startup_check.ImportTime("_io", 120, 120, 2),
+            startup_check.ImportTime("io", 300, 420, 1),
+            startup_check.ImportTime("registrations", 1000, 1420, 0),
+            startup_check.ImportTime("ujson", 50, 50, 0),
+        ]
+
+
+@pytest.mark.slow
+class TestStartupCheck:
+    """Tests a worker imports no other backend than its own."""
+
+    def test_only_selected_backend_is_imported(self) -> None:
+        report = startup_check.measure_startup("memory")
+        assert "registrations.infrastructure.adapters.repos.memory.repo" in (
+            report.modules
+        )
+        assert startup_check.unselected_backend_modules(report, "memory") == []
+        assert "psycopg" not in report.modules
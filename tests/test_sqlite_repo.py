@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import pathlib
+import sqlite3
+from typing import AsyncIterator
+from unittest import mock
+
+import pytest
+
+from registrations.domain.hospital.registration import HospitalEntryAggregate
+from registrations.domain.repo.registration_repo import UOWSessionFlag
+from registrations.domain.services.hospital_registration_services import (
+    RegisterHospitalService,
+)
+from registrations.infrastructure.adapters.repos.sqlite import sqlite_schema
+from registrations.infrastructure.adapters.repos.sqlite.repo import (
+    SQLiteHospitalUOWAsyncImpl,
+    SQLiteHospitalUOWFactory,
+    SQLiteSettings,
+)
+from registrations.utils.errors import RecordAlreadyExistsError
+
+
+@pytest.fixture
+async def uow_factory(
+    tmp_path: pathlib.Path,
+) -> AsyncIterator[SQLiteHospitalUOWFactory]:
+    factory = SQLiteHospitalUOWFactory(
+        SQLiteSettings(path=str(tmp_path / "registrations.db"))
+    )
+    await factory.startup()
+    yield factory
+    await factory.shutdown()
+
+
+def count_rows(db_path: pathlib.Path, table: str) -> int:
+    with sqlite3.connect(db_path) as connection:
+        return connection.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+
+@pytest.mark.fast
+@pytest.mark.usefixtures("anyio_backend")
+class TestSQLiteHospitalUOW:
+    """Tests the SQLite adapter on a temporary database file."""
+
+    async def test_commit_persists_and_duplicate_conflicts(
+        self,
+        tmp_path: pathlib.Path,
+        uow_factory: SQLiteHospitalUOWFactory,
+        valid_unverified_hospital: dict,
+    ) -> None:
+        hospital_entry = HospitalEntryAggregate.build_factory(
+            **valid_unverified_hospital
+        )
+        async with uow_factory() as uow_ctx:
+            await uow_ctx.hospital_repo.save_unverified_hospital(
+                **hospital_entry.dict()
+            )
+            await uow_ctx.commit()
+        duplicate_entry = hospital_entry.dict()
+        duplicate_entry.pop("hospital_id")
+        duplicate_entry["hospital_name"] = "  rajajayah PARAMVIR "
+        with pytest.raises(RecordAlreadyExistsError):
+            async with uow_factory() as uow_ctx:
+                await uow_ctx.hospital_repo.save_unverified_hospital(**duplicate_entry)
+        db_path = tmp_path / "registrations.db"
+        assert count_rows(db_path, sqlite_schema.UNVERIFIED_TABLE) == 1
+        with sqlite3.connect(db_path) as connection:
+            assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    async def test_uncommitted_rows_are_discarded(
+        self,
+        tmp_path: pathlib.Path,
+        uow_factory: SQLiteHospitalUOWFactory,
+        valid_unclaimed_hospital: dict,
+    ) -> None:
+        async with uow_factory() as uow_ctx:
+            await uow_ctx.hospital_repo.save_unclaimed_hospital(
+                **valid_unclaimed_hospital
+            )
+            with pytest.raises(RecordAlreadyExistsError):
+                await uow_ctx.hospital_repo.save_unclaimed_hospital(
+                    **valid_unclaimed_hospital
+                )
+        db_path = tmp_path / "registrations.db"
+        assert count_rows(db_path, sqlite_schema.UNCLAIMED_TABLE) == 0
+
+    async def test_racing_commit_of_a_duplicate_fails(
+        self,
+        tmp_path: pathlib.Path,
+        uow_factory: SQLiteHospitalUOWFactory,
+        valid_unclaimed_hospital: dict,
+    ) -> None:
+        first_uow, racing_uow = uow_factory(), uow_factory()
+        async with first_uow, racing_uow:
+            # Both pass the existence check before either commits.
+            for uow_ctx in (first_uow, racing_uow):
+                await uow_ctx.hospital_repo.save_unclaimed_hospital(
+                    **valid_unclaimed_hospital
+                )
+            await first_uow.commit()
+            with pytest.raises(RecordAlreadyExistsError):
+                await racing_uow.commit()
+        db_path = tmp_path / "registrations.db"
+        assert count_rows(db_path, sqlite_schema.UNCLAIMED_TABLE) == 1
+
+    async def test_batch_raced_by_a_writer_reports_its_duplicate(
+        self,
+        tmp_path: pathlib.Path,
+        uow_factory: SQLiteHospitalUOWFactory,
+        valid_unverified_hospital: dict,
+        valid_unclaimed_hospital: dict,
+    ) -> None:
+        raced_entry = HospitalEntryAggregate.build_factory(**valid_unclaimed_hospital)
+        new_entry = HospitalEntryAggregate.build_factory(**valid_unverified_hospital)
+        commit = SQLiteHospitalUOWAsyncImpl.commit
+
+        async def commit_after_racing_writer(
+            uow_ctx: SQLiteHospitalUOWAsyncImpl,
+        ) -> UOWSessionFlag:
+            if not count_rows(tmp_path / "registrations.db", raced_entry_table):
+                async with uow_factory() as racing_uow:
+                    await racing_uow.hospital_repo.save_hospital(raced_entry)
+                    await commit(racing_uow)
+            return await commit(uow_ctx)
+
+        raced_entry_table = sqlite_schema.table_of(raced_entry)
+        with mock.patch.object(
+            SQLiteHospitalUOWAsyncImpl, "commit", commit_after_racing_writer
+        ):
+            created_flags = await RegisterHospitalService.register_hospitals_batch(
+                uow_factory, [raced_entry, new_entry]
+            )
+        assert created_flags == [False, True]
+        db_path = tmp_path / "registrations.db"
+        assert count_rows(db_path, sqlite_schema.UNCLAIMED_TABLE) == 1
+        assert count_rows(db_path, sqlite_schema.UNVERIFIED_TABLE) == 1